@@ -1,24 +1,41 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form
-from fastapi.responses import StreamingResponse
+import base64
+import gzip
+import json
+import time
+
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 import os
-from threading import Lock
+import logging
+import threading
 import re
 from typing import List, Set, Optional
-from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
 import psycopg2
 import psycopg2.extras
-from psycopg2.pool import SimpleConnectionPool
-from pgvector.psycopg2 import register_vector
 import jwt
 import bcrypt
 from datetime import datetime, timedelta
 import uuid
 
+try:
+    from . import blob_store, db, embeddings, keyword_extractor, llm, llm_cache, llm_scheduler, migrations
+except Exception:
+    import blob_store
+    import db
+    import embeddings
+    import keyword_extractor
+    import llm
+    import llm_cache
+    import llm_scheduler
+    import migrations
+
 
 class SimilarityRequest(BaseModel):
     resume_text: str
@@ -32,6 +49,11 @@ class SimilarityResponse(BaseModel):
     missing_words: List[str]
 
 
+try:
+    import brotli  # optional: br-encoded /bootstrap responses
+except ImportError:
+    brotli = None
+
 app = FastAPI(title="ApplyEase Embeddings Service", version="0.2.0")
 try:
     from fastapi.middleware.cors import CORSMiddleware
@@ -40,7 +62,8 @@ try:
         allow_origins=["*"],
         allow_credentials=False,  # allow wildcard origin for content-script fetches
         allow_methods=["*"],
-        allow_headers=["*"]
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-LLM-Cache"],  # /jobs pagination, completion cache hit/miss
     )
 except Exception:
     pass
@@ -63,30 +86,81 @@ if cover_router is not None:
     app.include_router(cover_router)
 
 
+# uvicorn configures this logger, so startup timings show up next to its own lines
+logger = logging.getLogger("uvicorn.error")
+
+dim = embeddings.DIM
+_startup_timings: dict = {}
+_startup_error: Optional[str] = None
+_ready = threading.Event()
+
+
+def _timed_phase(name: str, fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    ms = round((time.perf_counter() - t0) * 1000.0, 1)
+    _startup_timings[name] = ms
+    logger.info("startup phase %s took %.1f ms", name, ms)
+    return out
+
+
 @app.on_event("startup")
 def startup():
-    # Load a compact, high-quality general-purpose model
-    # Cached locally by sentence-transformers after first download
-    global model, dim
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    dim = 384  # all-MiniLM-L6-v2 embedding size
-
-    # Init Postgres connection pool
-    _init_db()
-    _ensure_schema()
-    # Include additional routers (job tracker, cover letters)
+    _startup_timings["imports"] = round((time.perf_counter() - _import_started) * 1000.0, 1)
+    # Init Postgres connection pool + pending migrations; cheap compared to the model
+    _timed_phase("db_pool", _init_db)
+    if os.getenv("MIGRATE_ON_STARTUP", "1").lower() in {"1", "true", "on"}:
+        _timed_phase("migrations", migrations.migrate)
+    embeddings.configure_cache(get_conn=_conn, put_conn=_put_conn)
+    llm_cache.configure(get_conn=_conn, put_conn=_put_conn)
+    # Model load + warm-up run off the event loop: /healthz answers right away (liveness)
+    # while /readyz stays 503 until the first encode has gone through.
+    if os.getenv("STARTUP_BLOCKING", "0").lower() in {"1", "true", "on"}:
+        _warm_up()
+    else:
+        threading.Thread(target=_warm_up, name="startup-warmup", daemon=True).start()
+
+
+def _warm_up():
+    global _startup_error
     try:
-        from .routes.job_tracker import router as job_router
-        from .routes.cover_letters import router as cover_router
-    except Exception:
-        from routes.job_tracker import router as job_router
-        from routes.cover_letters import router as cover_router
-    app.include_router(job_router)
-    app.include_router(cover_router)
+        _timed_phase("model_load", embeddings.load_model)
+        _timed_phase("model_warmup", embeddings.warm_up)
+        _timed_phase("keyword_tables", keyword_extractor.default_extractor)
+    except Exception as e:
+        _startup_error = f"{type(e).__name__}: {e}"
+        logger.exception("startup warm-up failed")
+        return
+    _startup_timings["total"] = round((time.perf_counter() - _import_started) * 1000.0, 1)
+    logger.info("ready after %.1f ms (%s)", _startup_timings["total"], _startup_timings)
+    _ready.set()
+
+
+@app.exception_handler(embeddings.NotReadyError)
+def _not_ready_handler(request, exc):
+    return JSONResponse(status_code=503, content={"detail": "Embedding model is still loading"}, headers={"Retry-After": "5"})
+
+
+@app.exception_handler(db.PoolTimeoutError)
+def _pool_timeout_handler(request, exc):
+    return JSONResponse(status_code=503, content={"detail": "Database busy, try again"}, headers={"Retry-After": "1"})
+
+
+@app.exception_handler(llm_scheduler.QueueFullError)
+def _llm_busy_handler(request, exc):
+    return JSONResponse(status_code=429, content={"detail": "Too many generation requests, try again shortly"}, headers={"Retry-After": str(exc.retry_after)})
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await llm.aclose()
+    await run_in_threadpool(embeddings.shutdown)
+    db.close()
 
 
 def _embed(text: str) -> np.ndarray:
-    return np.asarray(model.encode(text), dtype=np.float32)
+    # Routed through the micro-batcher so concurrent requests share a forward pass
+    return np.asarray(embeddings.embed(text), dtype=np.float32)
 
 
 def _normalize(vec: np.ndarray) -> np.ndarray:
@@ -98,253 +172,66 @@ def _normalize(vec: np.ndarray) -> np.ndarray:
     return v / norm
 
 
-def _db_dsn() -> str:
-    host = os.getenv("PGHOST", "localhost")
-    port = os.getenv("PGPORT", "5432")
-    user = os.getenv("PGUSER", os.getenv("USER", "postgres"))
-    password = os.getenv("PGPASSWORD", "")
-    dbname = os.getenv("PGDATABASE", "applyease")
-    # psycopg2 DSN
-    if password:
-        return f"host={host} port={port} dbname={dbname} user={user} password={password}"
-    else:
-        return f"host={host} port={port} dbname={dbname} user={user}"
-
-
-_pool: Optional[SimpleConnectionPool] = None
-_pool_lock = Lock()
+def _normalize_rows(mat: np.ndarray) -> np.ndarray:
+    m = np.asarray(mat, dtype=np.float32)
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0.0] = 1.0
+    return m / norms
 
 
 def _init_db():
-    global _pool
-    with _pool_lock:
-        if _pool is None:
-            dsn = _db_dsn()
-            _pool = SimpleConnectionPool(minconn=1, maxconn=5, dsn=dsn)
+    db.get_pool()
 
 
 def _conn():
-    assert _pool is not None
-    conn = _pool.getconn()
-    # Enable autocommit before any operations that might open a transaction
-    conn.autocommit = True
-    try:
-        register_vector(conn)
-    except Exception:
-        # safe to ignore if already registered
-        pass
-    return conn
+    # Autocommit and the pgvector adapter are set up once per physical connection (db.py)
+    return db.getconn()
 
 
 def _put_conn(conn):
-    assert _pool is not None
-    _pool.putconn(conn)
+    db.putconn(conn)
 
 
-def _ensure_schema():
-    conn = _conn()
-    try:
-        with conn.cursor() as cur:
-            cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
-            cur.execute(
-                f"""
-                CREATE TABLE IF NOT EXISTS resumes (
-                    user_id text PRIMARY KEY,
-                    resume_text text NOT NULL,
-                    embedding vector({dim}) NOT NULL,
-                    resume_keywords text[] NOT NULL,
-                    updated_at timestamptz NOT NULL DEFAULT now()
-                );
-                """
-            )
-            # Add blob columns for storing original resume file
-            cur.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS resume_blob bytea;")
-            cur.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS resume_mime text;")
-            cur.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS resume_filename text;")
-            # Users table for migrated Node backend
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS users (
-                    id text PRIMARY KEY,
-                    first_name text NOT NULL,
-                    last_name text NOT NULL,
-                    email text UNIQUE NOT NULL,
-                    password_hash text NOT NULL,
-                    phone text,
-                    location text,
-                    urls jsonb DEFAULT '[]'::jsonb,
-                    eeo jsonb DEFAULT '[]'::jsonb,
-                    created_at timestamptz NOT NULL DEFAULT now(),
-                    updated_at timestamptz NOT NULL DEFAULT now()
-                );
-                """
-            )
-            # Optional ANN index for later nearest-neighbor queries
-            try:
-                cur.execute(
-                    "CREATE INDEX IF NOT EXISTS resumes_embedding_idx ON resumes USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);"
-                )
-            except Exception:
-                # Older pgvector may not support vector_cosine_ops; ignore
-                pass
-            # Tailored resumes history (optional persistence)
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS tailored_resumes (
-                    id text PRIMARY KEY,
-                    user_id text NOT NULL,
-                    job_description text NOT NULL,
-                    resume_text text NOT NULL,
-                    resume_blob bytea,
-                    resume_mime text,
-                    resume_filename text,
-                    created_at timestamptz NOT NULL DEFAULT now()
-                );
-                """
-            )
-    finally:
-        _put_conn(conn)
-
+# ===== Conditional GET =====
+# The extension refetches profile and resume on every job page. Responses carry a strong ETag
+# (content hash for stored files, row version otherwise) and must be revalidated, so unchanged
+# data costs a 304 and, where possible, never leaves Postgres.
+_CACHE_HEADERS = {"Cache-Control": "private, no-cache", "Vary": "Authorization"}
 
-_TOKEN_RE = re.compile(r"[a-zA-Z0-9][a-zA-Z0-9+.#\-]*")
-_EXTRA_STOP = {
-    "experience",
-    "experiences",
-    "responsibility",
-    "responsibilities",
-    "requirements",
-    "requirement",
-    "work",
-    "works",
-    "company",
-    "role",
-    "roles",
-    "candidate",
-    "candidates",
-    "job",
-    "jobs",
-    "team",
-    "teams",
-    "developer",
-    "developers",
-    "engineer",
-    "engineers",
-    "backend",
-    "front-end",
-    "frontend",
-    "fullstack",
-    "full-stack",
-    "experienced",
-    "looking",
-    "opportunity",
-    "position",
-    "applicant",
-    "applicants",
-    "employee",
-    "employees",
-    "employer",
-    "employers",
-    "candidate",
-    "candidates",
-    "culture",
-    "stakeholder",
-    "stakeholders",
-    "collaborate",
-    "collaboration",
-    "communication",
-    "communications",
-    "benefits",
-    "salary",
-    # Generic JD adjectives/phrases we don't want as tech terms
-    "consumer-facing",
-    "customer-obsessed",
-    "results-driven",
-    "revenue-generating",
-    "self-directed",
-    "self-starter",
-    "people-first",
-    "world-class",
-    "in-house",
-    "event-driven",
-    "well-being",
-    "know-how",
-    "unit-testing",
-}
-
-# Curated technical terms and acronyms to keep
-_TECH_TERMS = {
-    # Languages
-    "python", "java", "javascript", "typescript", "go", "golang", "ruby", "rust", "scala", "kotlin", "c", "c++", "c#",
-    # Web/Frameworks
-    "node", "nodejs", "express", "django", "flask", "fastapi", "spring", "springboot", "rails", "react", "vue", "angular", "nextjs", "nuxt", "svelte",
-    # Cloud/DevOps
-    "aws", "azure", "gcp", "kubernetes", "k8s", "docker", "terraform", "ansible", "helm", "serverless", "lambda", "ec2", "s3", "rds", "eks", "ecs", "cloudformation",
-    # Databases/Queues/Caches
-    "postgres", "postgresql", "mysql", "mariadb", "mongodb", "dynamodb", "redis", "elastic", "elasticsearch", "kafka", "rabbitmq", "sqs", "sns",
-    # Data/ML
-    "pandas", "numpy", "scikit-learn", "sklearn", "pytorch", "tensorflow", "keras", "spark", "hadoop", "airflow", "dbt", "snowflake", "databricks",
-    # Testing/Build/Tools
-    "pytest", "unittest", "junit", "maven", "gradle", "webpack", "vite", "babel", "eslint", "prettier", "git", "github", "gitlab", "jenkins", "circleci", "travisci",
-    # APIs/Protocols
-    "grpc", "graphql", "rest", "soap", "http", "https", "websocket", "oauth", "oidc",
-    # Concepts
-    "microservices", "monolith", "ci", "cd", "cicd", "oop", "tdd", "redux", "rxjs", "asyncio", "multithreading", "concurrency", "distributed",
-}
-
-
-def _normalize_token(tok: str) -> str:
-    # Trim common trailing punctuation and quotes
-    t = tok.strip(".,;:!?()[]{}\"'`)“”’“”")
-    t = t.lower()
-    # Collapse common hyphenated variants to canonical tokens
-    hyphen_map = {
-        "back-end": "backend",
-        "front-end": "frontend",
-        "full-stack": "fullstack",
-    }
-    t = hyphen_map.get(t, t)
-    return t
 
+def _if_none_match(request: Request) -> List[str]:
+    header = request.headers.get("if-none-match") or ""
+    # Weak comparison (RFC 9110 13.1.2): W/"x" matches "x"
+    return [t.strip()[2:] if t.strip().startswith("W/") else t.strip() for t in header.split(",") if t.strip()]
 
-def _is_tech_term(tok: str) -> bool:
-    # Explicit allow
-    if tok in _TECH_TERMS:
-        return True
 
-    # Block pure numbers or mostly numeric tokens
-    if tok.isdigit() or re.fullmatch(r"\d+(?:\.\d+)?", tok):
-        return False
+def _version_etag(prefix: str, version: int) -> str:
+    return f'"{prefix}-{version:x}"'
 
-    # Allow specific digit-bearing tech tokens
-    if tok in {"s3", "ec2", "rds", "sqs", "sns", "k8s"}:
-        return True
 
-    # Drop other digit-mixed tokens
-    if any(ch.isdigit() for ch in tok):
-        return False
+def _cached_versions(request: Request, prefix: str) -> List[int]:
+    """Row versions the client already holds for ``prefix`` ETags (to compare in SQL)."""
+    out = []
+    for tag in _if_none_match(request):
+        if tag.startswith(f'"{prefix}-') and tag.endswith('"'):
+            try:
+                out.append(int(tag[len(prefix) + 2:-1], 16))
+            except ValueError:
+                pass
+    return out
 
-    # Allow well-known acronyms
-    if tok in {"api", "sql", "nosql", "ml", "ai", "nlp", "etl", "sre", "devops", "tls", "ssl", "jwt", "grpc", "rest", "http", "https", "tdd"}:
-        return True
 
-    # Only allow hyphenated tokens if in allowlist (avoid adjectives like consumer-facing)
-    if "-" in tok:
-        return tok in _TECH_TERMS
+def _etag_matches(request: Request, etag: str) -> bool:
+    tags = _if_none_match(request)
+    return "*" in tags or etag in tags
 
-    # Allow tokens with special signs only for known tech spellings
-    if tok in {"c++", "c#", ".net", "node.js", "next.js"}:
-        return True
 
-    return False
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, **_CACHE_HEADERS})
 
 
 def _keywords(text: str) -> Set[str]:
-    if not text:
-        return set()
-    raw = _TOKEN_RE.findall(text)
-    tokens = {_normalize_token(t.lower()) for t in raw}
-    stop = ENGLISH_STOP_WORDS.union(_EXTRA_STOP)
-    return {t for t in tokens if t and t not in stop and len(t) > 1 and _is_tech_term(t)}
+    return keyword_extractor.extract_keywords(text)
 
 
 def _match_and_missing(resume_text: str, jd_text: str, limit: int = 50):
@@ -355,6 +242,94 @@ def _match_and_missing(resume_text: str, jd_text: str, limit: int = 50):
     return matching, missing
 
 
+def _resume_keyword_fields(text: str):
+    """Keyword columns for a resumes upsert: (sorted terms, packed bitset, vocabulary version)."""
+    ext = keyword_extractor.default_extractor()
+    terms = ext.extract(text)
+    return sorted(terms), psycopg2.Binary(ext.pack(terms)), ext.version
+
+
+# Row version for ETags: updated_at in microseconds, bumped by every write of the row
+_ROW_VERSION = "(extract(epoch FROM updated_at) * 1000000)::bigint"
+
+# Hot lookups, kept as server-side prepared statements (parsed and planned once per connection)
+# Resume vector plus the stored bitset; the text to rebuild it from only when missing or stale
+_Q_RESUME_MATCH = db.prepared(
+    "resume_match",
+    "SELECT embedding, resume_keyword_bits, keyword_vocab, "
+    "CASE WHEN resume_keyword_bits IS NULL OR keyword_vocab IS DISTINCT FROM $2 THEN resume_text END "
+    "FROM resumes WHERE user_id = $1",
+    2,
+)
+_Q_RESUME_CHUNKS = db.prepared(
+    "resume_chunks", "SELECT embedding FROM resume_chunks WHERE user_id = $1 ORDER BY chunk_idx", 1
+)
+_Q_RESUME_TEXT = db.prepared("resume_text", "SELECT resume_text FROM resumes WHERE user_id = $1", 1)
+_Q_RESUME_TEXT_BITS = db.prepared(
+    "resume_text_bits", "SELECT resume_text, resume_keyword_bits, keyword_vocab FROM resumes WHERE user_id = $1", 1
+)
+_Q_USER_BY_ID = db.prepared(
+    "user_by_id",
+    "SELECT id, first_name, last_name, email, password_hash, phone, location, urls, eeo, "
+    f"{_ROW_VERSION} FROM users WHERE id = $1",
+    1,
+)
+# Everything the content script needs in one row. The tag combines the user and resume row
+# versions with the requested field set; text and file bytes are skipped when it still matches.
+_Q_BOOTSTRAP = db.prepared(
+    "bootstrap",
+    """
+    SELECT tag, id, first_name, last_name, email, phone, location, urls, eeo,
+           has_resume, resume_mime, resume_filename, resume_blob_sha, size,
+           CASE WHEN $4 AND NOT tag = ANY($2::text[]) THEN resume_text END,
+           CASE WHEN size <= $5 AND NOT tag = ANY($2::text[]) THEN
+                CASE WHEN resume_blob_sha IS NULL THEN resume_blob
+                     ELSE (SELECT string_agg(c.data, ''::bytea ORDER BY c.idx) FROM blob_chunks c WHERE c.sha256 = s.resume_blob_sha)
+                END
+           END
+    FROM (
+        SELECT format('b-%s-%s-%s',
+                      to_hex((extract(epoch FROM u.updated_at) * 1000000)::bigint),
+                      to_hex(coalesce((extract(epoch FROM r.updated_at) * 1000000)::bigint, 0)),
+                      $3::text) AS tag,
+               u.id, u.first_name, u.last_name, u.email, u.phone, u.location, u.urls, u.eeo,
+               r.user_id IS NOT NULL AS has_resume, r.resume_mime, r.resume_filename, r.resume_blob_sha,
+               coalesce(b.size, length(r.resume_blob)) AS size, r.resume_text, r.resume_blob
+        FROM users u
+        LEFT JOIN resumes r ON r.user_id = u.id
+        LEFT JOIN blobs b ON b.sha256 = r.resume_blob_sha
+        WHERE u.id = $1
+    ) s
+    """,
+    5,
+)
+# Text only when the client's cached version (If-None-Match) is out of date
+_Q_RESUME_TEXT_IF_CHANGED = db.prepared(
+    "resume_text_if_changed",
+    f"SELECT v, CASE WHEN v = ANY($2::bigint[]) THEN NULL ELSE resume_text END "
+    f"FROM (SELECT {_ROW_VERSION} AS v, resume_text FROM resumes WHERE user_id = $1) r",
+    2,
+)
+
+
+def _resume_keyword_bits(cur, user_id: str, bits, vocab: Optional[str], resume_text: Optional[str]) -> bytes:
+    """Return the resume's keyword bitset, backfilling rows written before (or with another) vocabulary."""
+    ext = keyword_extractor.default_extractor()
+    if bits is not None and vocab == ext.version:
+        return bytes(bits)
+    packed = ext.extract_bits(resume_text or "")
+    cur.execute(
+        "UPDATE resumes SET resume_keyword_bits = %s, keyword_vocab = %s WHERE user_id = %s",
+        (psycopg2.Binary(packed), ext.version, user_id),
+    )
+    return packed
+
+
+def _match_and_missing_bits(resume_bits: bytes, jd_text: str, limit: int = 50):
+    ext = keyword_extractor.default_extractor()
+    return ext.match_bits(resume_bits, np.frombuffer(ext.extract_bits(jd_text), dtype=np.uint8), limit)[0]
+
+
 def _sanitize_for_pdf(text: str) -> str:
     # Replace common unicode punctuation with ASCII equivalents to avoid PDF encoding issues
     if not text:
@@ -447,8 +422,7 @@ def _render_text_to_pdf_stream(text: str, filename: str = "document.pdf"):
 def similarity(req: SimilarityRequest):
     vec_resume = _embed(req.resume_text)
     vec_jd = _embed(req.job_description)
-    # cosine_similarity expects 2D arrays
-    score = float(cosine_similarity([vec_resume], [vec_jd])[0][0])
+    score = float(np.dot(_normalize(vec_resume), _normalize(vec_jd)))
     matching, missing = _match_and_missing(req.resume_text, req.job_description)
     return SimilarityResponse(
         score=score,
@@ -461,9 +435,83 @@ def similarity(req: SimilarityRequest):
 
 @app.get("/healthz")
 def healthz():
+    # Liveness only; use /readyz to know when the model is warm
     return {"status": "ok"}
 
 
+@app.get("/readyz")
+def readyz():
+    if _ready.is_set():
+        return {"status": "ready", "startup_ms": _startup_timings}
+    status = "failed" if _startup_error else "starting"
+    return JSONResponse(status_code=503, content={"status": status, "error": _startup_error, "startup_ms": _startup_timings})
+
+
+@app.get("/metrics")
+def metrics():
+    return {**embeddings.stats(), "db_pool": db.stats(), "llm": llm.stats(), "llm_cache": llm_cache.stats(), "llm_scheduler": llm_scheduler.stats()}
+
+
+# Chunked ingestion: all-MiniLM-L6-v2 truncates at 256 word pieces, so long resumes are
+# also stored as overlapping chunks and matched with a chunk-by-chunk similarity matrix.
+RESUME_CHUNKING = os.getenv("RESUME_CHUNKING", "0").lower() in {"1", "true", "on"}
+CHUNK_AGG = os.getenv("CHUNK_AGG", "max").lower()  # max (max-sim) | topk (mean of top-k)
+CHUNK_TOPK = int(os.getenv("CHUNK_TOPK", "3"))
+
+
+def _resume_chunk_rows(text: str):
+    if not RESUME_CHUNKING:
+        return []
+    chunks = embeddings.chunk_text(text)
+    if not chunks:
+        return []
+    mat = _normalize_rows(embeddings.embed_many(chunks))
+    return [(i, chunk, vec.tolist()) for i, (chunk, vec) in enumerate(zip(chunks, mat))]
+
+
+def _store_resume_chunks(cur, user_id: str, rows):
+    cur.execute("DELETE FROM resume_chunks WHERE user_id = %s", (user_id,))
+    if rows:
+        psycopg2.extras.execute_values(
+            cur,
+            "INSERT INTO resume_chunks (user_id, chunk_idx, chunk_text, embedding) VALUES %s",
+            [(user_id, i, chunk, vec) for i, chunk, vec in rows],
+        )
+
+
+def _load_resume_chunks(cur, user_id: str) -> Optional[np.ndarray]:
+    if not RESUME_CHUNKING:
+        return None
+    _Q_RESUME_CHUNKS.execute(cur, (user_id,))
+    rows = cur.fetchall() or []
+    if not rows:
+        return None
+    return np.asarray([r[0] for r in rows], dtype=np.float32)
+
+
+def _aggregate_chunk_sims(sims: np.ndarray) -> float:
+    if sims.size == 0:
+        return 0.0
+    if CHUNK_AGG == "topk":
+        k = min(max(1, CHUNK_TOPK), sims.size)
+        return float(np.mean(np.partition(sims.ravel(), -k)[-k:]))
+    # max-sim: best resume chunk for every JD chunk, averaged over the JD
+    return float(np.mean(sims.max(axis=1)))
+
+
+def _chunked_scores(jd_texts: List[str], resume_chunks: np.ndarray) -> np.ndarray:
+    # One encode over every chunk of every JD, one similarity matrix, then per-JD aggregation
+    per_jd = [embeddings.chunk_text(t) or [t] for t in jd_texts]
+    flat = [c for chunks in per_jd for c in chunks]
+    sims = _normalize_rows(embeddings.embed_many(flat)) @ resume_chunks.T
+    out = np.zeros(len(jd_texts), dtype=np.float32)
+    start = 0
+    for i, chunks in enumerate(per_jd):
+        out[i] = _aggregate_chunk_sims(sims[start:start + len(chunks)])
+        start += len(chunks)
+    return out
+
+
 class UpsertRequest(BaseModel):
     user_id: str
     resume_text: str
@@ -472,22 +520,26 @@ class UpsertRequest(BaseModel):
 @app.post("/upsert_resume")
 def upsert_resume(req: UpsertRequest):
     vec = _normalize(_embed(req.resume_text))
-    keywords = sorted(_keywords(req.resume_text))
+    keywords, kw_bits, kw_vocab = _resume_keyword_fields(req.resume_text)
+    chunk_rows = _resume_chunk_rows(req.resume_text)
     conn = _conn()
     try:
         with conn.cursor() as cur:
             cur.execute(
                 """
-                INSERT INTO resumes (user_id, resume_text, embedding, resume_keywords, updated_at)
-                VALUES (%s, %s, %s, %s, now())
+                INSERT INTO resumes (user_id, resume_text, embedding, resume_keywords, resume_keyword_bits, keyword_vocab, updated_at)
+                VALUES (%s, %s, %s, %s, %s, %s, now())
                 ON CONFLICT (user_id) DO UPDATE SET
                   resume_text = EXCLUDED.resume_text,
                   embedding = EXCLUDED.embedding,
                   resume_keywords = EXCLUDED.resume_keywords,
+                  resume_keyword_bits = EXCLUDED.resume_keyword_bits,
+                  keyword_vocab = EXCLUDED.keyword_vocab,
                   updated_at = now()
                 """,
-                (req.user_id, req.resume_text, vec.tolist(), keywords),
+                (req.user_id, req.resume_text, vec.tolist(), keywords, kw_bits, kw_vocab),
             )
+            _store_resume_chunks(cur, req.user_id, chunk_rows)
     finally:
         _put_conn(conn)
     return {"ok": True, "user_id": req.user_id}
@@ -503,18 +555,23 @@ def match_for_user(req: MatchForUserRequest):
     conn = _conn()
     try:
         with conn.cursor() as cur:
-            cur.execute("SELECT embedding, resume_text FROM resumes WHERE user_id = %s", (req.user_id,))
+            _Q_RESUME_MATCH.execute(cur, (req.user_id, keyword_extractor.default_extractor().version))
             row = cur.fetchone()
             if not row:
                 raise HTTPException(status_code=404, detail="User resume embedding not found")
-            emb_list, resume_text = row[0], row[1]
+            emb_list = row[0]
+            resume_bits = _resume_keyword_bits(cur, req.user_id, *row[1:])
+            chunk_mat = _load_resume_chunks(cur, req.user_id)
     finally:
         _put_conn(conn)
 
-    resume_vec = np.asarray(emb_list, dtype=np.float32)
-    jd_vec = _normalize(_embed(req.job_description))
-    score = float(np.dot(jd_vec, resume_vec))
-    matching, missing = _match_and_missing(resume_text, req.job_description)
+    if chunk_mat is not None:
+        score = float(_chunked_scores([req.job_description], chunk_mat)[0])
+    else:
+        resume_vec = np.asarray(emb_list, dtype=np.float32)
+        jd_vec = _normalize(_embed(req.job_description))
+        score = float(np.dot(jd_vec, resume_vec))
+    matching, missing = _match_and_missing_bits(resume_bits, req.job_description)
     return SimilarityResponse(
         score=score,
         percent=round(score * 100.0, 2),
@@ -663,20 +720,116 @@ def login(req: LoginRequest):
 
 
 @app.get("/user", response_model=UserOut)
-def get_user(user_id: str = Depends(_current_user)):
+def get_user(request: Request, response: Response, user_id: str = Depends(_current_user)):
     conn = _conn()
     try:
         with conn.cursor() as cur:
-            cur.execute(
-                "SELECT id, first_name, last_name, email, password_hash, phone, location, urls, eeo FROM users WHERE id = %s",
-                (user_id,),
+            _Q_USER_BY_ID.execute(cur, (user_id,))
+            row = cur.fetchone()
+            if not row:
+                raise HTTPException(status_code=404, detail="User not found")
+    finally:
+        _put_conn(conn)
+    etag = _version_etag("u", row[9])
+    if _etag_matches(request, etag):
+        return _not_modified(etag)
+    response.headers.update({"ETag": etag, **_CACHE_HEADERS})
+    return _user_row_to_out(row)
+
+
+# ===== Bootstrap =====
+BOOTSTRAP_FIELDS = ("profile", "resume", "text", "file")
+BOOTSTRAP_DEFAULT_FIELDS = "profile,resume,text"
+# Larger files come back as a reference to /resume_file instead of inline base64
+BOOTSTRAP_INLINE_MAX = int(os.getenv("BOOTSTRAP_INLINE_MAX", str(1024 * 1024)))
+
+
+def _negotiate_encoding(request: Request) -> Optional[str]:
+    accepted = set()
+    for part in (request.headers.get("accept-encoding") or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if name and params.replace(" ", "") not in {"q=0", "q=0.0", "q=0.00", "q=0.000"}:
+            accepted.add(name)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _encoded_json(payload, encoding: Optional[str], headers: dict) -> Response:
+    body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode("utf-8")
+    if encoding == "br":
+        body = brotli.compress(body, quality=5)
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=6)
+    if encoding:
+        headers = {**headers, "Content-Encoding": encoding}
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@app.get("/bootstrap")
+def bootstrap(request: Request, fields: str = BOOTSTRAP_DEFAULT_FIELDS, user_id: str = Depends(_current_user)):
+    """Profile, resume metadata, resume text and (``fields=...,file``) the file in one round trip."""
+    wanted = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = wanted - set(BOOTSTRAP_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    key = "".join(f[0] for f in BOOTSTRAP_FIELDS if f in wanted)
+    encoding = _negotiate_encoding(request)
+    # The tag names the representation, so gzip/br/identity bodies get distinct strong ETags
+    suffix = f"+{encoding}" if encoding else ""
+    # Row tags of validators for this encoding only: the query skips the body for those, and
+    # a tag held for another encoding still needs a full response
+    cached = [
+        t[1:-1 - len(suffix)] for t in _if_none_match(request)
+        if t.startswith('"b-') and t.endswith(f'{suffix}"') and "+" not in t[1:-1 - len(suffix)]
+    ]
+    conn = _conn()
+    try:
+        with conn.cursor() as cur:
+            _Q_BOOTSTRAP.execute(
+                cur, (user_id, cached, key, "text" in wanted, BOOTSTRAP_INLINE_MAX if "file" in wanted else -1)
             )
             row = cur.fetchone()
             if not row:
                 raise HTTPException(status_code=404, detail="User not found")
-            return _user_row_to_out(row)
     finally:
         _put_conn(conn)
+    tag, has_resume, mime, fname, sha, size, resume_text, data = row[0], *row[9:]
+    etag = f'"{tag}{suffix}"'
+    headers = {"ETag": etag, **_CACHE_HEADERS, "Vary": "Authorization, Accept-Encoding"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    out = {}
+    if "profile" in wanted:
+        out["user"] = UserOut(
+            id=row[1], first_name=row[2], last_name=row[3], email=row[4],
+            phone=row[5], location=row[6], urls=row[7] or [], eeo=row[8] or [],
+        )
+    if "resume" in wanted:
+        out["resume"] = {
+            "exists": bool(has_resume),
+            "has_file": size is not None,
+            "filename": fname,
+            "mime": mime,
+            "size": size,
+            "sha256": sha,
+        } if has_resume else None
+    if "text" in wanted:
+        out["resume_text"] = resume_text
+    if "file" in wanted:
+        if data is not None:
+            out["file"] = {
+                "filename": fname or "resume.pdf",
+                "mime": mime or "application/pdf",
+                "base64": base64.b64encode(bytes(data)).decode("ascii"),
+            }
+        elif size is not None:
+            out["file"] = {"filename": fname or "resume.pdf", "mime": mime or "application/pdf", "url": "/resume_file"}
+        else:
+            out["file"] = None
+    return _encoded_json(out, encoding, headers)
 
 
 @app.patch("/user")
@@ -703,154 +856,196 @@ async def update_user(
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid JSON in urls/eeo")
 
-    # Update user profile
+    # Database, PDF parsing and keyword work run in the threadpool: a pool checkout can wait
+    # up to PG_POOL_TIMEOUT, which must not stall the event loop (and the SSE streams on it)
+    profile = {"first_name": first_name, "last_name": last_name, "email": email, "phone": phone, "location": location}
+    await run_in_threadpool(_update_profile, user_id, profile, urls_val, eeo_val)
+
+    # If resume file uploaded, parse and upsert embedding
+    if resume is not None:
+        # Skip if no file actually provided
+        content = await resume.read() if getattr(resume, "filename", None) else b""
+        if not content:
+            return {"ok": True}
+        resume_text = await run_in_threadpool(_parse_resume_upload, content, resume.filename)
+        # Awaiting the embedding keeps the event loop free
+        vec = _normalize(await embeddings.aembed(resume_text))
+        await run_in_threadpool(
+            _store_uploaded_resume,
+            user_id,
+            resume_text,
+            vec,
+            content,
+            getattr(resume, "content_type", None) or "application/pdf",
+            resume.filename or "resume.pdf",
+        )
+
+    return {"ok": True}
+
+
+def _update_profile(user_id: str, profile: dict, urls_val, eeo_val):
+    set_cols = []
+    params = []
+    for col, val in profile.items():
+        if val is not None:
+            set_cols.append(f"{col} = %s")
+            params.append(val)
+    if urls_val is not None:
+        set_cols.append("urls = %s")
+        params.append(psycopg2.extras.Json(urls_val))
+    if eeo_val is not None:
+        set_cols.append("eeo = %s")
+        params.append(psycopg2.extras.Json(eeo_val))
+    if not set_cols:
+        return
+    params.append(user_id)
     conn = _conn()
     try:
         with conn.cursor() as cur:
-            set_cols = []
-            params = []
-            def add(col, val):
-                if val is not None:
-                    set_cols.append(f"{col} = %s")
-                    params.append(val)
-            add("first_name", first_name)
-            add("last_name", last_name)
-            add("email", email)
-            add("phone", phone)
-            add("location", location)
-            if urls_val is not None:
-                set_cols.append("urls = %s")
-                params.append(psycopg2.extras.Json(urls_val))
-            if eeo_val is not None:
-                set_cols.append("eeo = %s")
-                params.append(psycopg2.extras.Json(eeo_val))
-            if set_cols:
-                params.extend([user_id])
-                cur.execute(
-                    f"UPDATE users SET {', '.join(set_cols)}, updated_at = now() WHERE id = %s",
-                    params,
-                )
+            cur.execute(
+                f"UPDATE users SET {', '.join(set_cols)}, updated_at = now() WHERE id = %s",
+                params,
+            )
     finally:
         _put_conn(conn)
 
-    # If resume file uploaded, parse and upsert embedding
-    if resume is not None:
-        from pdfminer.high_level import extract_text
+
+def _parse_resume_upload(content: bytes, filename: Optional[str]) -> str:
+    """Text of an uploaded resume file; 400 if it can't be parsed."""
+    from pdfminer.high_level import extract_text
+    import tempfile
+    try:
+        suffix = ""
         try:
-            # Skip if no file actually provided
-            if not getattr(resume, "filename", None):
-                content = b""
-            else:
-                content = await resume.read()
-            if not content:
-                return {"ok": True}
-            # Persist: parse to text for embedding
-            import tempfile
+            # Guess suffix from filename
+            if filename and "." in filename:
+                suffix = "." + filename.rsplit(".", 1)[-1]
+        except Exception:
             suffix = ""
-            try:
-                # Guess suffix from filename
-                if resume.filename and "." in resume.filename:
-                    suffix = "." + resume.filename.rsplit(".", 1)[-1]
-            except Exception:
-                suffix = ""
-            with tempfile.NamedTemporaryFile(suffix=suffix or ".pdf") as tmp:
-                tmp.write(content)
-                tmp.flush()
-                resume_text = extract_text(tmp.name) or ""
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Failed to parse resume: {e}")
-
-        # Compute embedding + keywords
-        vec = _normalize(_embed(resume_text))
-        keywords = sorted(_keywords(resume_text))
-        # Upsert everything including blob
-        conn2 = _conn()
-        try:
-            with conn2.cursor() as cur2:
-                cur2.execute(
-                    """
-                    INSERT INTO resumes (user_id, resume_text, embedding, resume_keywords, resume_blob, resume_mime, resume_filename, updated_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, now())
-                    ON CONFLICT (user_id) DO UPDATE SET
-                      resume_text = EXCLUDED.resume_text,
-                      embedding = EXCLUDED.embedding,
-                      resume_keywords = EXCLUDED.resume_keywords,
-                      resume_blob = EXCLUDED.resume_blob,
-                      resume_mime = EXCLUDED.resume_mime,
-                      resume_filename = EXCLUDED.resume_filename,
-                      updated_at = now()
-                    """,
-                    (
-                        user_id,
-                        resume_text,
-                        vec.tolist(),
-                        keywords,
-                        psycopg2.Binary(content),
-                        getattr(resume, "content_type", None) or "application/pdf",
-                        resume.filename or "resume.pdf",
-                    ),
-                )
-        finally:
-            _put_conn(conn2)
+        with tempfile.NamedTemporaryFile(suffix=suffix or ".pdf") as tmp:
+            tmp.write(content)
+            tmp.flush()
+            return extract_text(tmp.name) or ""
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse resume: {e}")
 
-    return {"ok": True}
+
+def _store_uploaded_resume(user_id: str, resume_text: str, vec: np.ndarray, content: bytes, mime: str, filename: str):
+    keywords, kw_bits, kw_vocab = _resume_keyword_fields(resume_text)
+    chunk_rows = _resume_chunk_rows(resume_text) if RESUME_CHUNKING else []
+    # Upsert everything; the file goes to the blob store (stored once per distinct content)
+    conn = _conn()
+    try:
+        with conn.cursor() as cur:
+            blob_sha = blob_store.put(cur, content)
+            cur.execute(
+                """
+                INSERT INTO resumes (user_id, resume_text, embedding, resume_keywords, resume_keyword_bits, keyword_vocab, resume_blob_sha, resume_mime, resume_filename, updated_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, now())
+                ON CONFLICT (user_id) DO UPDATE SET
+                  resume_text = EXCLUDED.resume_text,
+                  embedding = EXCLUDED.embedding,
+                  resume_keywords = EXCLUDED.resume_keywords,
+                  resume_keyword_bits = EXCLUDED.resume_keyword_bits,
+                  keyword_vocab = EXCLUDED.keyword_vocab,
+                  resume_blob_sha = EXCLUDED.resume_blob_sha,
+                  resume_blob = NULL,
+                  resume_mime = EXCLUDED.resume_mime,
+                  resume_filename = EXCLUDED.resume_filename,
+                  updated_at = now()
+                """,
+                (user_id, resume_text, vec.tolist(), keywords, kw_bits, kw_vocab, blob_sha, mime, filename),
+            )
+            _store_resume_chunks(cur, user_id, chunk_rows)
+    finally:
+        _put_conn(conn)
 
 
 @app.get("/resume")
-def get_resume(user_id: str = Depends(_current_user)):
+def get_resume(request: Request, user_id: str = Depends(_current_user)):
     conn = _conn()
     try:
         with conn.cursor() as cur:
-            cur.execute("SELECT resume_text FROM resumes WHERE user_id = %s", (user_id,))
+            _Q_RESUME_TEXT_IF_CHANGED.execute(cur, (user_id, _cached_versions(request, "r")))
             row = cur.fetchone()
             if not row:
                 raise HTTPException(status_code=404, detail="No resume stored")
-            return {"resume_text": row[0]}
     finally:
         _put_conn(conn)
+    etag = _version_etag("r", row[0])
+    if _etag_matches(request, etag):
+        return _not_modified(etag)
+    return JSONResponse({"resume_text": row[1]}, headers={"ETag": etag, **_CACHE_HEADERS})
 
 
 @app.get("/resume_file")
-def get_resume_file(user_id: str = Depends(_current_user)):
+def get_resume_file(request: Request, user_id: str = Depends(_current_user)):
     conn = _conn()
     try:
         with conn.cursor() as cur:
-            cur.execute("SELECT resume_blob, resume_mime, resume_filename FROM resumes WHERE user_id = %s", (user_id,))
+            # The legacy bytea is only read when the client's copy (if any) is stale
+            cur.execute(
+                f"""
+                SELECT resume_blob_sha, resume_blob IS NOT NULL, resume_mime, resume_filename, v,
+                       CASE WHEN resume_blob_sha IS NULL AND NOT v = ANY(%s) THEN resume_blob END
+                FROM (SELECT *, {_ROW_VERSION} AS v FROM resumes WHERE user_id = %s) r
+                """,
+                (_cached_versions(request, "rf"), user_id),
+            )
             row = cur.fetchone()
-            if not row or row[0] is None:
+            if not row or (row[0] is None and not row[1]):
                 raise HTTPException(status_code=404, detail="No resume file stored")
-            blob, mime, fname = row
+            sha, _, mime, fname, version, legacy = row
+            etag = f'"{sha}"' if sha else _version_etag("rf", version)
+            if _etag_matches(request, etag):
+                return _not_modified(etag)
+            info = blob_store.stat(cur, sha)
     finally:
         _put_conn(conn)
-    try:
-        from io import BytesIO
-        bio = BytesIO(blob)
-        headers = {"Content-Disposition": f"inline; filename={fname or 'resume.pdf'}"}
-        return StreamingResponse(bio, media_type=mime or "application/pdf", headers=headers)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to stream resume: {e}")
+    headers = {"Content-Disposition": f"inline; filename={fname or 'resume.pdf'}", "ETag": etag, **_CACHE_HEADERS}
+    return blob_store.blob_response(request.headers.get("range"), info, legacy, mime or "application/pdf", headers)
 
 
 @app.get("/resume_pdf")
-def get_resume_pdf(user_id: str = Depends(_current_user)):
+def get_resume_pdf(request: Request, user_id: str = Depends(_current_user)):
     # Prefer stored PDF blob if present; otherwise render text to PDF
     conn = _conn()
     try:
         with conn.cursor() as cur:
-            cur.execute("SELECT resume_blob, resume_mime, resume_filename, resume_text FROM resumes WHERE user_id = %s", (user_id,))
+            # Neither the legacy bytea nor the text is read when the client's copy is current
+            cur.execute(
+                f"""
+                SELECT resume_blob_sha, is_pdf, resume_filename, v,
+                       CASE WHEN NOT v = ANY(%s) AND resume_blob_sha IS NULL AND is_pdf THEN resume_blob END,
+                       CASE WHEN NOT v = ANY(%s) AND NOT is_pdf THEN resume_text END
+                FROM (
+                    SELECT *, {_ROW_VERSION} AS v,
+                           coalesce(resume_mime, '') ILIKE 'application/pdf%%'
+                             AND (resume_blob_sha IS NOT NULL OR resume_blob IS NOT NULL) AS is_pdf
+                    FROM resumes WHERE user_id = %s
+                ) r
+                """,
+                (_cached_versions(request, "rp"), _cached_versions(request, "rp"), user_id),
+            )
             row = cur.fetchone()
             if not row:
                 raise HTTPException(status_code=404, detail="No resume stored")
-            blob, mime, fname, resume_text = row[0], row[1], row[2], row[3] or ""
+            sha, is_pdf, fname, version, legacy, resume_text = row
+            etag = f'"{sha}"' if is_pdf and sha else _version_etag("rp", version)
+            if _etag_matches(request, etag):
+                return _not_modified(etag)
+            info = blob_store.stat(cur, sha) if is_pdf else None
     finally:
         _put_conn(conn)
     try:
-        if blob and (mime or "").lower().startswith("application/pdf"):
-            from io import BytesIO
-            headers = {"Content-Disposition": f"inline; filename={fname or 'resume.pdf'}"}
-            return StreamingResponse(BytesIO(blob), media_type=mime or "application/pdf", headers=headers)
-        buffer, headers = _render_text_to_pdf_stream(resume_text, filename=fname or "resume.pdf")
+        if is_pdf:
+            headers = {"Content-Disposition": f"inline; filename={fname or 'resume.pdf'}", "ETag": etag, **_CACHE_HEADERS}
+            return blob_store.blob_response(request.headers.get("range"), info, legacy, "application/pdf", headers)
+        buffer, headers = _render_text_to_pdf_stream(resume_text or "", filename=fname or "resume.pdf")
+        headers.update({"ETag": etag, **_CACHE_HEADERS})
         return StreamingResponse(buffer, media_type="application/pdf", headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to render PDF: {e}")
 
@@ -873,29 +1068,81 @@ def match(req: MatchBody, user_id: str = Depends(_current_user)):
     }
 
 
+MATCH_BATCH_MAX = int(os.getenv("MATCH_BATCH_MAX", "100"))
+
+
+class MatchBatchBody(BaseModel):
+    jobDescriptions: List[str]
+    topK: Optional[int] = None
+
+
+@app.post("/match/batch")
+def match_batch(req: MatchBatchBody, user_id: str = Depends(_current_user)):
+    # Score a whole listing page at once: one resume lookup, one encode, one mat-vec
+    jds = req.jobDescriptions or []
+    if not jds:
+        raise HTTPException(status_code=400, detail="jobDescriptions is required")
+    if len(jds) > MATCH_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {MATCH_BATCH_MAX} job descriptions per request")
+    conn = _conn()
+    try:
+        with conn.cursor() as cur:
+            _Q_RESUME_MATCH.execute(cur, (user_id, keyword_extractor.default_extractor().version))
+            row = cur.fetchone()
+            if not row:
+                raise HTTPException(status_code=404, detail="User resume embedding not found")
+            emb_list = row[0]
+            resume_bits = _resume_keyword_bits(cur, user_id, *row[1:])
+            chunk_mat = _load_resume_chunks(cur, user_id)
+    finally:
+        _put_conn(conn)
+
+    resume_vec = np.asarray(emb_list, dtype=np.float32)
+    present = [i for i, jd in enumerate(jds) if jd and jd.strip()]
+    scores = np.zeros(len(jds), dtype=np.float32)
+    if present and chunk_mat is not None:
+        scores[present] = _chunked_scores([jds[i] for i in present], chunk_mat)
+    elif present:
+        jd_mat = _normalize_rows(embeddings.embed_many([jds[i] for i in present]))
+        scores[present] = jd_mat @ resume_vec
+
+    # Keyword overlap for every JD at once: AND / AND-NOT of packed bitsets
+    ext = keyword_extractor.default_extractor()
+    words = ext.match_bits(resume_bits, ext.extract_bits_many(jds), limit=50)
+
+    results = []
+    for i, (matching, missing) in enumerate(words):
+        score = float(scores[i])
+        results.append({
+            "index": i,
+            "score": score,
+            "percent": round(score * 100.0, 2),
+            "matchingWords": matching,
+            "missingWords": missing,
+        })
+    if req.topK is not None:
+        results.sort(key=lambda r: r["score"], reverse=True)
+        results = results[: max(0, req.topK)]
+    return {"results": results}
+
+
 class CustomAnswerBody(BaseModel):
     jobDescription: str
     applicationQuestion: str
 
 
-@app.post("/custom-answer")
-def custom_answer(req: CustomAnswerBody, user_id: str = Depends(_current_user)):
-    # Local-only LLMs: Ollama (default) or LM Studio/vLLM (OpenAI-compatible)
-    provider = os.getenv("LLM_PROVIDER", "ollama").lower()
-    ollama_host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
-    base_url = os.getenv("LLM_BASE_URL", "http://localhost:1234/v1")
-    model = os.getenv("LLM_MODEL","llama3.1:8b") 
+def _custom_answer_prompt(user_id: str, req: CustomAnswerBody) -> str:
     # Fetch resume text
     conn = _conn()
     try:
         with conn.cursor() as cur:
-            cur.execute("SELECT resume_text FROM resumes WHERE user_id = %s", (user_id,))
+            _Q_RESUME_TEXT.execute(cur, (user_id,))
             row = cur.fetchone()
             resume_text = row[0] if row else ""
     finally:
         _put_conn(conn)
 
-    prompt = (
+    return (
         "You are an assistant that writes concise, specific answers for job applications.\n"
         f"Resume:\n{resume_text}\n\n"
         f"Job Description:\n{req.jobDescription}\n\n"
@@ -903,110 +1150,108 @@ def custom_answer(req: CustomAnswerBody, user_id: str = Depends(_current_user)):
         "Write a tailored answer (120-180 words), highlight relevant skills, and keep a professional tone and give only response do not write any other text."
     )
 
-    try:
-        if provider == "ollama":
-            # Use Ollama chat API
-            model_name = model or "llama3.1:8b"
-            import requests as _rq
-            r = _rq.post(
-                f"{ollama_host.rstrip('/')}/api/chat",
-                json={
-                    "model": model_name,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "stream": False,
-                },
-                timeout=35,
-            )
-            if r.status_code != 200:
-                raise HTTPException(status_code=502, detail=f"Ollama error: {r.text}")
-            data = r.json()
-            content = None
-            if isinstance(data, dict):
-                if isinstance(data.get("message"), dict):
-                    content = data["message"].get("content")
-                if not content and "response" in data:
-                    content = data.get("response")
-            return {"answer": content or ""}
-
-        elif provider in ("lmstudio", "openai_compatible", "vllm"):
-            # Use OpenAI-compatible endpoint via direct HTTP
-            if not model:
-                raise HTTPException(status_code=400, detail="Set LLM_MODEL to your local model name for LM Studio/vLLM")
-            import requests as _rq
-            url = f"{base_url.rstrip('/')}/chat/completions"
-            r = _rq.post(
-                url,
-                headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY', 'lm-studio')}", "Content-Type": "application/json"},
-                json={"model": model, "messages": [{"role": "user", "content": prompt}]},
-                timeout=15,
-            )
-            if r.status_code != 200:
-                raise HTTPException(status_code=502, detail=f"LM Studio error: {r.text}")
-            data = r.json()
-            try:
-                answer = data["choices"][0]["message"]["content"]
-            except Exception:
-                answer = ""
-            return {"answer": answer}
 
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported LLM_PROVIDER. Use 'ollama' (default) or 'lmstudio'.")
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"LLM error: {e}")
+def _cache_header(hit: bool) -> dict:
+    return {"X-LLM-Cache": "hit" if hit else "miss"}
 
 
-def _llm_complete(prompt: str) -> str:
-    provider = os.getenv("LLM_PROVIDER", "ollama").lower()
-    ollama_host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
-    base_url = os.getenv("LLM_BASE_URL", "http://localhost:1234/v1")
-    model = os.getenv("LLM_MODEL")
-    timeout_s = int(os.getenv("LLM_TIMEOUT_SECONDS", "50"))
-    if provider in {"off", "none", "disabled"}:
-        return ""
+@app.post("/custom-answer")
+async def custom_answer(req: CustomAnswerBody, response: Response, no_cache: bool = False, user_id: str = Depends(_current_user)):
+    # Local-only LLMs: Ollama (default) or LM Studio/vLLM (OpenAI-compatible); custom answers
+    # fall back to DEFAULT_MODEL on either when LLM_MODEL is unset
     try:
-        if provider == "ollama":
-            model_name = model or "llama3.1:8b"
-            import requests as _rq
-            r = _rq.post(
-                f"{ollama_host.rstrip('/')}/api/chat",
-                json={
-                    "model": model_name,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "stream": False,
-                    "options": { "num_ctx": 8192, "temperature": 0.2 }
-                },
-                timeout=timeout_s,
-            )
-            if r.status_code != 200:
-                return ""
-            data = r.json()
-            if isinstance(data, dict):
-                if isinstance(data.get("message"), dict):
-                    return data["message"].get("content") or ""
-                if "response" in data:
-                    return data.get("response") or ""
-            return ""
-        elif provider in ("lmstudio", "openai_compatible", "vllm"):
-            if not model:
-                raise RuntimeError("Set LLM_MODEL for lmstudio/vLLM provider")
-            import requests as _rq
-            url = f"{base_url.rstrip('/')}/chat/completions"
-            r = _rq.post(
-                url,
-                headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY', 'lm-studio')}", "Content-Type": "application/json"},
-                json={"model": model, "messages": [{"role": "user", "content": prompt}]},
-                timeout=timeout_s,
-            )
-            if r.status_code != 200:
-                return ""
-            data = r.json()
-            return data.get("choices", [{}])[0].get("message", {}).get("content", "")
-        else:
-            raise RuntimeError("Unsupported LLM_PROVIDER")
-    except Exception:
-        return ""
+        p = llm.provider(default_model=llm.DEFAULT_MODEL)
+    except llm.LLMError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if p is None:
+        raise HTTPException(status_code=400, detail="Unsupported LLM_PROVIDER. Use 'ollama' (default) or 'lmstudio'.")
+    prompt = await run_in_threadpool(_custom_answer_prompt, user_id, req)
+    try:
+        answer, hit = await llm_cache.complete(prompt, p=p, bypass=no_cache, priority=llm_scheduler.INTERACTIVE)
+    except llm.LLMError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    response.headers.update(_cache_header(hit))
+    return {"answer": answer}
+
+
+async def _llm_complete(prompt: str, no_cache: bool = False):
+    """(tailoring completion, cache hit); "" when the provider is off or fails (callers fall back)."""
+    try:
+        return await llm_cache.complete(prompt, _TAILOR_OPTIONS, bypass=no_cache)
+    except llm.LLMError as e:
+        logger.warning("tailoring completion failed: %s", e)
+        return "", False
+
+
+async def _sse_completion(
+    prompt: str,
+    finish,
+    options: Optional[dict] = None,
+    required: bool = False,
+    no_cache: bool = False,
+    priority: int = llm_scheduler.STANDARD,
+    default_model: Optional[str] = None,
+) -> StreamingResponse:
+    """Stream the completion as SSE ``token`` events, then one ``done`` event with ``finish(text)``.
+
+    ``finish`` runs in the threadpool (it may save to the database) and only once the
+    provider has finished; if the client disconnects first, the upstream request is closed
+    and nothing is saved (or cached). A cached completion arrives as a single ``token``.
+    """
+    try:
+        p = llm.provider(default_model=default_model)
+    except llm.LLMError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if p is None and required:
+        raise HTTPException(status_code=400, detail="Unsupported LLM_PROVIDER. Use 'ollama' (default) or 'lmstudio'.")
+    cached, key = await llm_cache.lookup(p, options, prompt, no_cache)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **_cache_header(cached is not None)}
+    if cached is not None:
+        async def replay():
+            yield llm.sse("token", {"text": cached})
+            yield llm.sse("done", await run_in_threadpool(finish, cached))
+
+        return StreamingResponse(replay(), media_type="text/event-stream", headers=headers)
+
+    # Holds a scheduler slot until the stream ends; a full queue surfaces here as a 429
+    tokens = llm_scheduler.scheduler().stream(priority, llm.stream(prompt, options, p=p))
+    # Wait for the first chunk here so connection and provider errors still get a status code
+    try:
+        first = await tokens.__anext__()
+    except StopAsyncIteration:
+        first = None
+    except llm.LLMError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+    async def events():
+        parts = []
+        try:
+            if first is not None:
+                parts.append(first)
+                yield llm.sse("token", {"text": first})
+                async for chunk in tokens:
+                    parts.append(chunk)
+                    yield llm.sse("token", {"text": chunk})
+        except llm.LLMError as e:
+            yield llm.sse("error", {"detail": str(e)})
+            return
+        finally:
+            await tokens.aclose()
+        text = "".join(parts)
+        await llm_cache.store(key, p, text)
+        yield llm.sse("done", await run_in_threadpool(finish, text))
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+
+@app.post("/custom-answer/stream")
+async def custom_answer_stream(req: CustomAnswerBody, no_cache: bool = False, user_id: str = Depends(_current_user)):
+    """``/custom-answer`` as Server-Sent Events: ``token`` {text} ..., then ``done`` {answer}."""
+    prompt = await run_in_threadpool(_custom_answer_prompt, user_id, req)
+    return await _sse_completion(
+        prompt, lambda text: {"answer": text}, required=True, no_cache=no_cache,
+        priority=llm_scheduler.INTERACTIVE, default_model=llm.DEFAULT_MODEL,
+    )
 
 
 class TailoredResumeBody(BaseModel):
@@ -1014,26 +1259,31 @@ class TailoredResumeBody(BaseModel):
     save: Optional[bool] = False
 
 
-@app.post("/tailored_resume")
-def tailored_resume(req: TailoredResumeBody, user_id: str = Depends(_current_user)):
+# Sent to Ollama with tailoring prompts (deterministic-ish rewrites over a long context)
+_TAILOR_OPTIONS = {"num_ctx": 8192, "temperature": 0.2}
+
+
+def _tailor_context(user_id: str, job_description: str):
+    """(resume text, matching words, target keywords, prompt) for a tailoring request."""
     # Fetch resume text
     conn = _conn()
     try:
         with conn.cursor() as cur:
-            cur.execute("SELECT resume_text FROM resumes WHERE user_id = %s", (user_id,))
+            _Q_RESUME_TEXT_BITS.execute(cur, (user_id,))
             row = cur.fetchone()
             if not row:
                 raise HTTPException(status_code=404, detail="No resume stored")
             resume_text = row[0] or ""
+            resume_bits = _resume_keyword_bits(cur, user_id, row[1], row[2], resume_text)
     finally:
         _put_conn(conn)
 
-    matching, missing = _match_and_missing(resume_text, req.jobDescription)
+    matching, missing = _match_and_missing_bits(resume_bits, job_description)
     target_terms = missing[:20]
 
     # Clip inputs to avoid overwhelming local LLM servers
     max_chars = int(os.getenv("LLM_TAILOR_MAX_CHARS", "4000"))
-    jd_clip = _clip_text(req.jobDescription, max_chars)
+    jd_clip = _clip_text(job_description, max_chars)
     resume_clip = _clip_text(resume_text, max_chars)
 
     base_prompt = (
@@ -1044,7 +1294,11 @@ def tailored_resume(req: TailoredResumeBody, user_id: str = Depends(_current_use
         f"Job description (context): {jd_clip}\n\n"
         f"Resume:\n{resume_clip}\n"
     )
-    new_text = _llm_complete(base_prompt).strip()
+    return resume_text, matching, target_terms, base_prompt
+
+
+def _finish_tailored(user_id: str, req: TailoredResumeBody, resume_text: str, matching, target_terms, new_text: str) -> dict:
+    new_text = new_text.strip()
     if not new_text:
         # Fallback: append a compact skills block
         if target_terms:
@@ -1070,10 +1324,37 @@ def tailored_resume(req: TailoredResumeBody, user_id: str = Depends(_current_use
     return {"resume_text": new_text, "matching_words": matching, "missing_words": target_terms}
 
 
+async def _tailored(req: TailoredResumeBody, user_id: str, no_cache: bool):
+    resume_text, matching, target_terms, base_prompt = await run_in_threadpool(_tailor_context, user_id, req.jobDescription)
+    new_text, hit = await _llm_complete(base_prompt, no_cache)
+    return await run_in_threadpool(_finish_tailored, user_id, req, resume_text, matching, target_terms, new_text), hit
+
+
+@app.post("/tailored_resume")
+async def tailored_resume(req: TailoredResumeBody, response: Response, no_cache: bool = False, user_id: str = Depends(_current_user)):
+    body, hit = await _tailored(req, user_id, no_cache)
+    response.headers.update(_cache_header(hit))
+    return body
+
+
+@app.post("/tailored_resume/stream")
+async def tailored_resume_stream(req: TailoredResumeBody, no_cache: bool = False, user_id: str = Depends(_current_user)):
+    """``/tailored_resume`` as Server-Sent Events; ``done`` carries the same body (saved if ``save``)."""
+    resume_text, matching, target_terms, prompt = await run_in_threadpool(_tailor_context, user_id, req.jobDescription)
+
+    def finish(text: str) -> dict:
+        return _finish_tailored(user_id, req, resume_text, matching, target_terms, text)
+
+    return await _sse_completion(prompt, finish, options=_TAILOR_OPTIONS, no_cache=no_cache)
+
+
 @app.post("/tailored_resume_pdf")
-def tailored_resume_pdf(req: TailoredResumeBody, user_id: str = Depends(_current_user)):
-    resp = tailored_resume(req, user_id)  # generate text (and maybe save row)
-    text = resp.get("resume_text", "")
+async def tailored_resume_pdf(req: TailoredResumeBody, no_cache: bool = False, user_id: str = Depends(_current_user)):
+    resp, _ = await _tailored(req, user_id, no_cache)  # generate text (and maybe save row)
+    return await run_in_threadpool(_tailored_pdf_response, req, user_id, resp.get("resume_text", ""))
+
+
+def _tailored_pdf_response(req: TailoredResumeBody, user_id: str, text: str):
     try:
         buffer, headers = _render_text_to_pdf_stream(text, filename="tailored_resume.pdf")
         # Optionally save to history with blob
@@ -1083,9 +1364,10 @@ def tailored_resume_pdf(req: TailoredResumeBody, user_id: str = Depends(_current
             try:
                 with conn.cursor() as cur:
                     tid = str(uuid.uuid4())
+                    blob_sha = blob_store.put(cur, pdf_bytes)
                     cur.execute(
                         """
-                        INSERT INTO tailored_resumes (id, user_id, job_description, resume_text, resume_blob, resume_mime, resume_filename)
+                        INSERT INTO tailored_resumes (id, user_id, job_description, resume_text, resume_blob_sha, resume_mime, resume_filename)
                         VALUES (%s, %s, %s, %s, %s, %s, %s)
                         """,
                         (
@@ -1093,7 +1375,7 @@ def tailored_resume_pdf(req: TailoredResumeBody, user_id: str = Depends(_current
                             user_id,
                             req.jobDescription,
                             text,
-                            psycopg2.Binary(pdf_bytes),
+                            blob_sha,
                             "application/pdf",
                             "tailored_resume.pdf",
                         ),
@@ -1127,7 +1409,7 @@ def list_tailored_resumes(user_id: str = Depends(_current_user)):
     try:
         with conn.cursor() as cur:
             cur.execute(
-                "SELECT id, created_at, resume_filename, (resume_blob IS NOT NULL) AS has_blob FROM tailored_resumes WHERE user_id = %s ORDER BY created_at DESC",
+                "SELECT id, created_at, resume_filename, (resume_blob_sha IS NOT NULL OR resume_blob IS NOT NULL) AS has_blob FROM tailored_resumes WHERE user_id = %s ORDER BY created_at DESC",
                 (user_id,),
             )
             rows = cur.fetchall() or []
@@ -1146,26 +1428,30 @@ def list_tailored_resumes(user_id: str = Depends(_current_user)):
 
 
 @app.get("/tailored_resume_download")
-def download_tailored_resume(id: str, user_id: str = Depends(_current_user)):
+def download_tailored_resume(id: str, request: Request, user_id: str = Depends(_current_user)):
     conn = _conn()
     try:
         with conn.cursor() as cur:
             cur.execute(
-                "SELECT resume_blob, resume_mime, resume_filename, resume_text FROM tailored_resumes WHERE id = %s AND user_id = %s",
+                """
+                SELECT resume_blob_sha, resume_blob, resume_mime, resume_filename,
+                       CASE WHEN resume_blob_sha IS NULL AND resume_blob IS NULL THEN resume_text END
+                FROM tailored_resumes WHERE id = %s AND user_id = %s
+                """,
                 (id, user_id),
             )
             row = cur.fetchone()
             if not row:
                 raise HTTPException(status_code=404, detail="Not found")
-            blob, mime, fname, text = row
-            if blob:
-                from io import BytesIO
-                headers = {"Content-Disposition": f"attachment; filename={fname or 'tailored_resume.pdf'}"}
-                return StreamingResponse(BytesIO(blob), media_type=mime or "application/pdf", headers=headers)
-            buffer, headers = _render_text_to_pdf_stream(text or "", filename=fname or "tailored_resume.pdf")
-            return StreamingResponse(buffer, media_type="application/pdf", headers=headers)
+            sha, legacy, mime, fname, text = row
+            info = blob_store.stat(cur, sha)
     finally:
         _put_conn(conn)
+    if info is not None or legacy:
+        headers = {"Content-Disposition": f"attachment; filename={fname or 'tailored_resume.pdf'}"}
+        return blob_store.blob_response(request.headers.get("range"), info, legacy, mime or "application/pdf", headers)
+    buffer, headers = _render_text_to_pdf_stream(text or "", filename=fname or "tailored_resume.pdf")
+    return StreamingResponse(buffer, media_type="application/pdf", headers=headers)
 
 
 class UseTailoredBody(BaseModel):
@@ -1179,31 +1465,43 @@ def use_tailored(body: UseTailoredBody, user_id: str = Depends(_current_user)):
     try:
         with conn.cursor() as cur:
             cur.execute(
-                "SELECT resume_text, resume_blob, resume_mime, resume_filename FROM tailored_resumes WHERE id = %s AND user_id = %s",
+                "SELECT resume_text, resume_blob_sha, resume_blob, resume_mime, resume_filename FROM tailored_resumes WHERE id = %s AND user_id = %s",
                 (body.id, user_id),
             )
             row = cur.fetchone()
             if not row:
                 raise HTTPException(status_code=404, detail="Tailored resume not found")
-            text, blob, mime, fname = row
+            text, blob_sha, legacy, mime, fname = row
+            if blob_sha is None and legacy is not None:
+                # Not yet moved by `blob_store.py migrate`; store it so both rows share one copy
+                blob_sha = blob_store.put(cur, bytes(legacy))
+                cur.execute(
+                    "UPDATE tailored_resumes SET resume_blob_sha = %s, resume_blob = NULL WHERE id = %s",
+                    (blob_sha, body.id),
+                )
+            has_blob = blob_sha is not None
     finally:
         _put_conn(conn)
 
     text = text or ""
     vec = _normalize(_embed(text))
-    keywords = sorted(_keywords(text))
+    keywords, kw_bits, kw_vocab = _resume_keyword_fields(text)
+    chunk_rows = _resume_chunk_rows(text)
     conn2 = _conn()
     try:
         with conn2.cursor() as cur2:
             cur2.execute(
                 """
-                INSERT INTO resumes (user_id, resume_text, embedding, resume_keywords, resume_blob, resume_mime, resume_filename, updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, now())
+                INSERT INTO resumes (user_id, resume_text, embedding, resume_keywords, resume_keyword_bits, keyword_vocab, resume_blob_sha, resume_mime, resume_filename, updated_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, now())
                 ON CONFLICT (user_id) DO UPDATE SET
                   resume_text = EXCLUDED.resume_text,
                   embedding = EXCLUDED.embedding,
                   resume_keywords = EXCLUDED.resume_keywords,
-                  resume_blob = EXCLUDED.resume_blob,
+                  resume_keyword_bits = EXCLUDED.resume_keyword_bits,
+                  keyword_vocab = EXCLUDED.keyword_vocab,
+                  resume_blob_sha = EXCLUDED.resume_blob_sha,
+                  resume_blob = NULL,
                   resume_mime = EXCLUDED.resume_mime,
                   resume_filename = EXCLUDED.resume_filename,
                   updated_at = now()
@@ -1213,11 +1511,14 @@ def use_tailored(body: UseTailoredBody, user_id: str = Depends(_current_user)):
                     text,
                     vec.tolist(),
                     keywords,
-                    psycopg2.Binary(blob) if blob else None,
-                    mime or ("application/pdf" if blob else None),
-                    fname or ("resume.pdf" if blob else None),
+                    kw_bits,
+                    kw_vocab,
+                    blob_sha,
+                    mime or ("application/pdf" if has_blob else None),
+                    fname or ("resume.pdf" if has_blob else None),
                 ),
             )
+            _store_resume_chunks(cur2, user_id, chunk_rows)
     finally:
         _put_conn(conn2)
     return {"ok": True}
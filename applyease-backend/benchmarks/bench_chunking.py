@@ -0,0 +1,71 @@
+# bench_chunking.py
+# How resume/JD chunk count affects match latency: time to encode the JD chunks and
+# compute + aggregate the chunk-by-chunk similarity matrix against stored resume chunks.
+#
+#   python benchmarks/bench_chunking.py --repeats 20
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+import embeddings  # noqa: E402
+
+WORDS = (
+    "python aws docker kubernetes designed built scalable services postgres kafka redis "
+    "led team migrated monolith microservices terraform observability latency reduced "
+    "pipelines analytics customers reliability on-call react typescript graphql testing"
+).split()
+
+
+def _doc(n_words: int, seed: int) -> str:
+    rng = np.random.default_rng(seed)
+    return " ".join(rng.choice(WORDS, size=n_words))
+
+
+def _normalize_rows(m):
+    n = np.linalg.norm(m, axis=1, keepdims=True)
+    n[n == 0] = 1.0
+    return m / n
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeats", type=int, default=20)
+    ap.add_argument("--chunk-words", type=int, default=160)
+    ap.add_argument("--overlap", type=int, default=32)
+    args = ap.parse_args()
+
+    embeddings.load_model()
+    embeddings.configure_batching(False)
+    step = args.chunk_words - args.overlap
+
+    print(f"{'chunks':>8}{'words':>8}{'ingest ms':>12}{'match p50 ms':>14}{'match p95 ms':>14}")
+    for n_chunks in (1, 2, 4, 8, 16, 32):
+        n_words = args.chunk_words + step * (n_chunks - 1)
+        resume = _doc(n_words, seed=n_chunks)
+        jd = _doc(n_words, seed=1000 + n_chunks)
+
+        t0 = time.perf_counter()
+        resume_chunks = embeddings.chunk_text(resume, args.chunk_words, args.overlap)
+        resume_mat = _normalize_rows(embeddings.encode_batch(resume_chunks))
+        ingest_ms = (time.perf_counter() - t0) * 1000
+
+        samples = []
+        for _ in range(args.repeats):
+            t0 = time.perf_counter()
+            jd_chunks = embeddings.chunk_text(jd, args.chunk_words, args.overlap)
+            sims = _normalize_rows(embeddings.encode_batch(jd_chunks)) @ resume_mat.T
+            float(np.mean(sims.max(axis=1)))
+            samples.append((time.perf_counter() - t0) * 1000)
+        samples.sort()
+        p95 = samples[min(len(samples) - 1, int(0.95 * (len(samples) - 1) + 0.5))]
+        print(f"{len(resume_chunks):>8}{n_words:>8}{ingest_ms:>12.1f}{statistics.median(samples):>14.1f}{p95:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# bench_embed_backends.py
+# Load time, encode latency and resident memory for each embedding backend
+# (torch fp32, ONNX Runtime fp32, ONNX Runtime dynamic int8). Each backend runs in its own
+# subprocess so memory numbers don't bleed into each other.
+#
+#   python benchmarks/bench_embed_backends.py --repeats 50
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+TEXT = (
+    "We are looking for a backend engineer experienced in Python, FastAPI and PostgreSQL. "
+    "You will own distributed services on AWS, use Terraform and Docker, and improve observability."
+)
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except Exception:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _pct(samples, pct):
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(pct / 100.0 * (len(s) - 1) + 0.5))]
+
+
+def _measure(backend: str, repeats: int) -> dict:
+    import embed_backends
+    from embeddings import MODEL_NAME
+
+    base = _rss_mb()
+    t0 = time.perf_counter()
+    model = embed_backends.create(backend, MODEL_NAME)
+    model.encode([TEXT])  # warm-up
+    load_s = time.perf_counter() - t0
+    single, batch = [], []
+    for i in range(repeats):
+        t0 = time.perf_counter()
+        model.encode([f"{TEXT} {i}"])
+        single.append((time.perf_counter() - t0) * 1000)
+    texts = [f"{TEXT} {i}" for i in range(32)]
+    for _ in range(max(1, repeats // 5)):
+        t0 = time.perf_counter()
+        model.encode(texts)
+        batch.append((time.perf_counter() - t0) * 1000)
+    return {
+        "backend": backend,
+        "load_s": load_s,
+        "single_p50_ms": statistics.median(single),
+        "single_p95_ms": _pct(single, 95),
+        "batch32_p50_ms": statistics.median(batch),
+        "rss_mb": _rss_mb() - base,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeats", type=int, default=50)
+    ap.add_argument("--backend", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.backend:
+        print(json.dumps(_measure(args.backend, args.repeats)))
+        return
+
+    print(f"{'backend':<12}{'load s':>8}{'1x p50 ms':>11}{'1x p95 ms':>11}{'32x p50 ms':>12}{'RSS MB':>9}")
+    for backend in BACKENDS:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--backend", backend, "--repeats", str(args.repeats)],
+            capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            print(f"{backend:<12} failed: {proc.stderr.strip().splitlines()[-1:]}")
+            continue
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{backend:<12}{r['load_s']:>8.2f}{r['single_p50_ms']:>11.2f}{r['single_p95_ms']:>11.2f}{r['batch32_p50_ms']:>12.2f}{r['rss_mb']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# bench_embed_batching.py
+# Throughput/latency of /match, /similarity, /upsert_resume and /use_tailored under
+# concurrent load, with the embedding micro-batcher on vs off.
+#
+# Runs the app in-process against the Postgres configured via PG* env vars:
+#   python benchmarks/bench_embed_batching.py --requests 200 --concurrency 40
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Measure the encoder, not cache hits
+os.environ.setdefault("EMBED_CACHE", "0")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import app as svc  # noqa: E402
+import embeddings  # noqa: E402
+
+
+RESUME = (
+    "Software engineer with 6 years building Python and Go microservices on AWS. "
+    "Designed Kafka pipelines, PostgreSQL schemas and Redis caches; deployed with Docker, "
+    "Kubernetes and Terraform; CI/CD with GitHub Actions. Led migration from a monolith."
+)
+JD = (
+    "We are looking for a backend engineer experienced in Python, FastAPI and PostgreSQL. "
+    "You will own distributed services on AWS (EKS, SQS, S3), use Terraform and Docker, "
+    "and improve observability. Experience with Kafka or RabbitMQ is a plus."
+)
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(pct / 100.0 * (len(values) - 1)))))
+    return values[k]
+
+
+def _setup_user(client):
+    user_id = f"bench-{uuid.uuid4()}"
+    client.post("/upsert_resume", json={"user_id": user_id, "resume_text": RESUME}).raise_for_status()
+    tid = str(uuid.uuid4())
+    conn = svc._conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO tailored_resumes (id, user_id, job_description, resume_text) VALUES (%s, %s, %s, %s)",
+                (tid, user_id, JD, RESUME + " Also FastAPI."),
+            )
+    finally:
+        svc._put_conn(conn)
+    token = svc._jwt_create(user_id, f"{user_id}@bench.local")
+    return user_id, tid, {"Authorization": f"Bearer {token}"}
+
+
+def _cleanup_user(user_id):
+    conn = svc._conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM tailored_resumes WHERE user_id = %s", (user_id,))
+            cur.execute("DELETE FROM resumes WHERE user_id = %s", (user_id,))
+    finally:
+        svc._put_conn(conn)
+
+
+def _calls(user_id, tid, headers):
+    # Vary the text per request so every call really embeds something new
+    return {
+        "/match": lambda i: ("post", "/match", {"json": {"jobDescription": f"{JD} Req {i}."}, "headers": headers}),
+        "/similarity": lambda i: ("post", "/similarity", {"json": {"resume_text": RESUME, "job_description": f"{JD} Req {i}."}}),
+        "/upsert_resume": lambda i: ("post", "/upsert_resume", {"json": {"user_id": user_id, "resume_text": f"{RESUME} Rev {i}."}}),
+        "/use_tailored": lambda i: ("post", "/use_tailored", {"json": {"id": tid}, "headers": headers}),
+    }
+
+
+def _run(client, make_call, n_requests, concurrency):
+    def one(i):
+        method, path, kwargs = make_call(i)
+        t0 = time.perf_counter()
+        r = getattr(client, method)(path, **kwargs)
+        r.raise_for_status()
+        return time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        latencies = list(ex.map(one, range(n_requests)))
+    wall = time.perf_counter() - t0
+    return {
+        "rps": n_requests / wall,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=40)
+    ap.add_argument("--max-batch-size", type=int, default=32)
+    ap.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = ap.parse_args()
+
+    with TestClient(svc.app) as client:
+        user_id, tid, headers = _setup_user(client)
+        try:
+            print(f"{'endpoint':<16}{'mode':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'avg batch':>11}")
+            for name, make_call in _calls(user_id, tid, headers).items():
+                for mode in ("unbatched", "batched"):
+                    embeddings.configure_batching(mode == "batched", args.max_batch_size, args.max_wait_ms)
+                    _run(client, make_call, min(20, args.requests), min(4, args.concurrency))  # warm-up
+                    b = embeddings.batcher()
+                    before = b.stats() if b else None
+                    res = _run(client, make_call, args.requests, args.concurrency)
+                    avg = "-"
+                    if b:
+                        after = b.stats()
+                        batches = after["batches"] - before["batches"]
+                        avg = f"{(after['items'] - before['items']) / batches:.1f}" if batches else "-"
+                    print(f"{name:<16}{mode:<10}{res['rps']:>10.1f}{res['p50_ms']:>10.1f}{res['p95_ms']:>10.1f}{avg:>11}")
+        finally:
+            _cleanup_user(user_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# bench_jobs_bulk.py
+# Loading N job applications into the tracker against a local Postgres:
+#   per-row  - one INSERT per job, as N calls to POST /jobs would do (embedding excluded)
+#   copy     - the /jobs/import path: validated rows written with COPY in JOBS_IMPORT_BATCH batches
+# then streams them back out through the /jobs/export generator (server-side cursor).
+#
+#   PGDATABASE=applyease python benchmarks/bench_jobs_bulk.py --rows 10000
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+import migrations  # noqa: E402
+from routes import job_tracker as jt  # noqa: E402
+
+USER_ID = "bench-jobs-bulk-user"
+
+
+def _records(n: int):
+    statuses = ("saved", "applied", "interview", "offer", "rejected")
+    return [
+        {
+            "company": f"Company {i}",
+            "title": "Software Engineer",
+            "location": "Remote",
+            "source": "spreadsheet",
+            "url": f"https://example.com/jobs/{i}",
+            "status": statuses[i % len(statuses)],
+            "notes": "Referred by a friend; follow up after the phone screen." * 2,
+            "next_action_date": "2026-11-01" if i % 4 == 0 else None,
+        }
+        for i in range(n)
+    ]
+
+
+def _clear():
+    conn = db.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM job_applications WHERE user_id = %s", (USER_ID,))
+    finally:
+        db.putconn(conn)
+
+
+def per_row(records):
+    conn = db.getconn()
+    try:
+        with conn.cursor() as cur:
+            for r in records:
+                cur.execute(
+                    """
+                    INSERT INTO job_applications (id, user_id, company, title, location, source, url, status, notes, jd_text, next_action_date)
+                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+                    """,
+                    (str(uuid.uuid4()), USER_ID, r["company"], r["title"], r["location"], r["source"], r["url"],
+                     r["status"], r["notes"], None, r["next_action_date"]),
+                )
+    finally:
+        db.putconn(conn)
+
+
+def copy(records):
+    created = datetime.now(timezone.utc).isoformat()
+    batch = []
+    for r in records:
+        batch.append(jt._import_row(r, created))
+        if len(batch) >= jt.JOBS_IMPORT_BATCH:
+            jt._copy_batch(USER_ID, batch)
+            batch = []
+    if batch:
+        jt._copy_batch(USER_ID, batch)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10000)
+    args = ap.parse_args()
+
+    migrations.migrate()
+    records = _records(args.rows)
+    try:
+        print(f"{args.rows} job applications")
+        print(f"{'path':<10}{'seconds':>10}{'rows/s':>12}")
+        base = None
+        for name, fn in (("per-row", per_row), ("copy", copy)):
+            _clear()
+            t0 = time.perf_counter()
+            fn(records)
+            dt = time.perf_counter() - t0
+            base = base or dt
+            print(f"{name:<10}{dt:>10.2f}{args.rows / dt:>12.0f}   ({base / dt:.1f}x)")
+        t0 = time.perf_counter()
+        size = sum(len(b) for b in jt._export_rows(USER_ID, list(jt._JOB_FIELDS), [], "ndjson"))
+        dt = time.perf_counter() - t0
+        print(f"{'export':<10}{dt:>10.2f}{args.rows / dt:>12.0f}   ({size / 1e6:.1f} MB NDJSON)")
+    finally:
+        _clear()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
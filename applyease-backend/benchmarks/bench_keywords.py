@@ -0,0 +1,134 @@
+# bench_keywords.py
+# Legacy per-call keyword filter vs the precompiled KeywordExtractor on ~10 KB job
+# descriptions. Also checks that both produce the same terms for the legacy vocabulary, and
+# compares set-based matching/missing terms against the packed-bitset AND / AND-NOT path.
+#
+#   python benchmarks/bench_keywords.py --docs 200
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS  # noqa: E402
+
+import keyword_extractor as kx  # noqa: E402
+
+
+# --- Legacy implementation (app._keywords before the extractor) ---
+
+def _legacy_is_tech_term(tok):
+    if tok in kx._TECH_TERMS:
+        return True
+    if tok.isdigit() or re.fullmatch(r"\d+(?:\.\d+)?", tok):
+        return False
+    if tok in {"s3", "ec2", "rds", "sqs", "sns", "k8s"}:
+        return True
+    if any(ch.isdigit() for ch in tok):
+        return False
+    if tok in {"api", "sql", "nosql", "ml", "ai", "nlp", "etl", "sre", "devops", "tls", "ssl", "jwt", "grpc", "rest", "http", "https", "tdd"}:
+        return True
+    if "-" in tok:
+        return tok in kx._TECH_TERMS
+    if tok in {"c++", "c#", ".net", "node.js", "next.js"}:
+        return True
+    return False
+
+
+def legacy_keywords(text):
+    if not text:
+        return set()
+    raw = kx._TOKEN_RE.findall(text)
+    tokens = {kx._normalize_token(t.lower()) for t in raw}
+    stop = ENGLISH_STOP_WORDS.union(kx._EXTRA_STOP)
+    return {t for t in tokens if t and t not in stop and len(t) > 1 and _legacy_is_tech_term(t)}
+
+
+# --- Synthetic job descriptions ---
+
+FILLER = (
+    "we are looking for a self-starter to join our world-class team and build reliable services "
+    "you will collaborate with stakeholders design apis own on-call and mentor engineers "
+    "experience with 5+ years 2.5 k8s s3 ec2 v2 consumer-facing results-driven back-end front-end full-stack"
+).split()
+
+
+def make_jd(rng, size=10_000):
+    terms = sorted(kx._TECH_TERMS | kx._ACRONYMS | kx._SPECIAL_SPELLINGS | set(kx._PHRASES))
+    words = []
+    while sum(len(w) + 1 for w in words) < size:
+        w = rng.choice(terms) if rng.random() < 0.2 else rng.choice(FILLER)
+        if rng.random() < 0.1:
+            w = w.capitalize()
+        if rng.random() < 0.08:
+            w += rng.choice([",", ".", ";", ")", ":"])
+        words.append(w)
+    return " ".join(words)
+
+
+def _time(fn, docs, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for d in docs:
+            fn(d)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(docs) * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=200)
+    ap.add_argument("--rounds", type=int, default=5)
+    args = ap.parse_args()
+
+    rng = random.Random(7)
+    docs = [make_jd(rng) for _ in range(args.docs)]
+
+    stop = ENGLISH_STOP_WORDS.union(kx._EXTRA_STOP)
+    legacy_vocab_only = kx.KeywordExtractor(kx._TECH_TERMS | kx._ACRONYMS | kx._SPECIAL_SPELLINGS, stop)
+    full = kx.default_extractor()
+    for d in docs:
+        old = legacy_keywords(d)
+        assert legacy_vocab_only.extract(d) == old, "extractor diverged from legacy output"
+        assert old <= full.extract(d), "phrases/aliases dropped a legacy term"
+
+    legacy_us = _time(legacy_keywords, docs, args.rounds)
+    single_us = _time(legacy_vocab_only.extract, docs, args.rounds)
+    full_us = _time(full.extract, docs, args.rounds)
+    print(f"{args.docs} docs of ~10 KB, outputs identical on the legacy vocabulary")
+    print(f"{'implementation':<34}{'us/doc':>10}{'speedup':>10}")
+    print(f"{'legacy _keywords':<34}{legacy_us:>10.1f}{1.0:>10.2f}")
+    print(f"{'KeywordExtractor (single tokens)':<34}{single_us:>10.1f}{legacy_us / single_us:>10.2f}")
+    print(f"{'KeywordExtractor (+ phrases)':<34}{full_us:>10.1f}{legacy_us / full_us:>10.2f}")
+
+    # Matching/missing words for a resume against every doc, with the resume's keywords
+    # re-extracted per call (old /match) vs a stored bitset and one vectorized pass
+    resume = docs[0]
+    jd_bits = full.extract_bits_many(docs)
+    resume_bits = full.extract_bits(resume)
+    jd_sets = [full.extract(d) for d in docs]
+
+    def with_sets():
+        for j in jd_sets:
+            r = full.extract(resume)
+            sorted(r & j)[:50], sorted(j - r)[:50]
+
+    def with_bits():
+        full.match_bits(resume_bits, jd_bits, limit=50)
+
+    r_set = full.extract(resume)
+    expected = [(sorted(r_set & j)[:50], sorted(j - r_set)[:50]) for j in jd_sets]
+    assert full.match_bits(resume_bits, jd_bits, limit=50) == expected, "bitset matching diverged from sets"
+    sets_us = _time(lambda _: with_sets(), [None], args.rounds) / len(docs)
+    bits_us = _time(lambda _: with_bits(), [None], args.rounds) / len(docs)
+    print(f"\nmatching/missing words against {len(docs)} pre-extracted JDs")
+    print(f"{'re-extract resume + set ops':<34}{sets_us:>10.1f}{1.0:>10.2f}")
+    print(f"{'stored bitset + AND/AND-NOT':<34}{bits_us:>10.1f}{sets_us / bits_us:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
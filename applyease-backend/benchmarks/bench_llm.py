@@ -0,0 +1,186 @@
+# bench_llm.py
+# Load test of the generation endpoints against benchmarks/fake_llm_server.py (no model needed):
+#   custom-answer  - POST /custom-answer
+#   tailored       - POST /tailored_resume
+#   cover-letter   - POST /cover_letters/generate (renders a PDF, so it needs reportlab)
+# Runs the app and the fake server in-process on local ports, seeds one user and resume in a
+# local Postgres, then sends --requests requests per endpoint from --concurrency clients.
+# Reports p50/p95/p99 latency and throughput, plus the scheduler counters from /metrics.
+# Prompts are distinct and ?no_cache=true unless --unique N cycles N job descriptions
+# through the completion cache.
+#
+#   PGDATABASE=applyease python benchmarks/bench_llm.py --requests 200 --concurrency 16
+#   LLM_MAX_CONCURRENCY=4 python benchmarks/bench_llm.py --provider lmstudio --latency-ms 500
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+import fake_llm_server  # noqa: E402
+
+USER_ID = "bench-llm-user"
+EMAIL = "bench-llm@example.com"
+RESUME = (
+    "Senior backend engineer. Python, FastAPI, PostgreSQL, Docker and AWS. "
+    "Built data pipelines and REST APIs serving millions of requests per day. " * 10
+)
+JD = "We are hiring a backend engineer with Python, Kubernetes, Terraform, Kafka and AWS experience. Posting #{i}."
+
+ENDPOINTS = {
+    "custom-answer": ("/custom-answer", lambda jd: {"jobDescription": jd, "applicationQuestion": "Why do you want this role?"}),
+    "tailored": ("/tailored_resume", lambda jd: {"jobDescription": jd}),
+    "cover-letter": ("/cover_letters/generate", lambda jd: {"company": "Acme", "title": "Backend Engineer", "job_description": jd, "save": False}),
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _serve(asgi_app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(asgi_app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def _seed(app_module, db):
+    from embeddings import DIM
+
+    conn = db.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO users (id, first_name, last_name, email, password_hash, phone, location)
+                VALUES (%s, 'Bench', 'User', %s, 'x', '555-0100', 'Remote') ON CONFLICT (id) DO NOTHING
+                """,
+                (USER_ID, EMAIL),
+            )
+            cur.execute(
+                """
+                INSERT INTO resumes (user_id, resume_text, embedding, resume_keywords, summary, skills)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (user_id) DO UPDATE SET resume_text = EXCLUDED.resume_text
+                """,
+                (USER_ID, RESUME, [0.0] * DIM, [], "Backend engineer", ["Python", "AWS"]),
+            )
+    finally:
+        db.putconn(conn)
+    return app_module._jwt_create(USER_ID, EMAIL)
+
+
+def _clear(db):
+    conn = db.getconn()
+    try:
+        with conn.cursor() as cur:
+            for table in ("tailored_resumes", "cover_letters"):
+                cur.execute(f"DELETE FROM {table} WHERE user_id = %s", (USER_ID,))
+            cur.execute("DELETE FROM resumes WHERE user_id = %s", (USER_ID,))
+            cur.execute("DELETE FROM users WHERE id = %s", (USER_ID,))
+    finally:
+        db.putconn(conn)
+
+
+def _pct(samples, q: float) -> float:
+    return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+
+
+async def _load(base: str, token: str, name: str, n: int, concurrency: int, unique: int):
+    path, make_body = ENDPOINTS[name]
+    query = "" if unique else "?no_cache=true"
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies, statuses = [], {}
+    next_i = iter(range(n))
+
+    async def client(http: httpx.AsyncClient):
+        for i in next_i:
+            jd = JD.format(i=i % unique if unique else i)
+            t0 = time.perf_counter()
+            try:
+                r = await http.post(base + path + query, json=make_body(jd), headers=headers)
+                status = r.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__  # e.g. the server dropped the connection on an error
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 200:
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=300, limits=limits) as http:
+        t0 = time.perf_counter()
+        await asyncio.gather(*[client(http) for _ in range(concurrency)])
+        elapsed = time.perf_counter() - t0
+    latencies.sort()
+    return latencies, statuses, elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=100, help="requests per endpoint")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    ap.add_argument("--provider", choices=("ollama", "lmstudio"), default="ollama")
+    ap.add_argument("--unique", type=int, default=0, help="cycle N job descriptions through the cache (0 = all distinct, cache bypassed)")
+    ap.add_argument("--latency-ms", type=float, default=300.0)
+    ap.add_argument("--tokens-per-s", type=float, default=40.0)
+    ap.add_argument("--tokens", type=int, default=120)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    args = ap.parse_args()
+
+    fake = fake_llm_server.FakeLLM(args.latency_ms, args.tokens_per_s, args.tokens, args.error_rate)
+    fake_port, app_port = _free_port(), _free_port()
+    os.environ["LLM_PROVIDER"] = args.provider
+    os.environ["OLLAMA_HOST"] = f"http://127.0.0.1:{fake_port}"
+    os.environ["LLM_BASE_URL"] = f"http://127.0.0.1:{fake_port}/v1"
+    os.environ.setdefault("LLM_MODEL", "fake")
+    os.environ.setdefault("LLM_CACHE_PERSIST", "0")  # keep benchmark completions out of llm_cache
+
+    import app  # noqa: E402  (reads LLM settings from the environment)
+    import db  # noqa: E402
+
+    _serve(fake_llm_server.make_app(fake), fake_port)
+    server = _serve(app.app, app_port)  # startup runs migrations and opens the pool
+    base = f"http://127.0.0.1:{app_port}"
+    token = _seed(app, db)
+    try:
+        print(
+            f"fake {args.provider}: {args.latency_ms:.0f} ms to first token, {args.tokens} tokens at {args.tokens_per_s:.0f}/s, "
+            f"{args.error_rate:.0%} errors; {args.requests} requests/endpoint from {args.concurrency} clients"
+        )
+        print(f"{'endpoint':<15}{'ok':>6}{'other':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}")
+        for name in args.endpoints.split(","):
+            latencies, statuses, elapsed = asyncio.run(_load(base, token, name, args.requests, args.concurrency, args.unique))
+            other = ", ".join(f"{code} x{k}" for code, k in statuses.items() if code != 200)
+            print(
+                f"{name:<15}{len(latencies):>6}{sum(statuses.values()) - len(latencies):>7}"
+                f"{_pct(latencies, 0.50):>10.0f}{_pct(latencies, 0.95):>10.0f}{_pct(latencies, 0.99):>10.0f}"
+                f"{len(latencies) / elapsed:>9.2f}" + (f"   ({other})" if other else "")
+            )
+        metrics = httpx.get(base + "/metrics").json()
+        sched, cache = metrics.get("llm_scheduler") or {}, metrics.get("llm_cache") or {}
+        print(
+            f"scheduler: max {sched.get('max_concurrency')} concurrent, peak upstream {fake.counters['peak_active']}, "
+            f"rejected {sched.get('rejected')}, deduplicated {sched.get('deduplicated')}, "
+            f"queue wait ms {sched.get('wait_ms')}"
+        )
+        print(f"llm client: {metrics.get('llm')}; cache hit rate {cache.get('hit_rate')}")
+    finally:
+        _clear(db)
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# bench_prepared.py
+# Per-request cost of the hot resume lookup behind /match against a local Postgres:
+#   legacy    - set autocommit + register_vector on every checkout, then a plain query
+#   init-once - connection set up once (db.PooledConnection), plain query
+#   prepared  - connection set up once, query via the named prepared statement in app.py
+# Reports server round trips per request and p50/p95 latency.
+#
+#   PGDATABASE=applyease python benchmarks/bench_prepared.py --requests 2000
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import psycopg2  # noqa: E402
+from pgvector.psycopg2 import register_vector  # noqa: E402
+
+import db  # noqa: E402
+import keyword_extractor  # noqa: E402
+import migrations  # noqa: E402
+from embeddings import DIM  # noqa: E402
+
+USER_ID = "bench-prepared-user"
+PLAIN_SQL = (
+    "SELECT embedding, resume_keyword_bits, keyword_vocab, "
+    "CASE WHEN resume_keyword_bits IS NULL OR keyword_vocab IS DISTINCT FROM %s THEN resume_text END "
+    "FROM resumes WHERE user_id = %s"
+)
+
+
+class CountingCursor(psycopg2.extensions.cursor):
+    round_trips = 0
+
+    def execute(self, query, vars=None):
+        CountingCursor.round_trips += 1
+        return super().execute(query, vars)
+
+
+def _seed(conn):
+    ext = keyword_extractor.default_extractor()
+    text = "Python FastAPI PostgreSQL Docker Kubernetes AWS machine learning " * 40
+    vec = np.random.default_rng(0).standard_normal(DIM).astype(np.float32)
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO resumes (user_id, resume_text, embedding, resume_keywords, resume_keyword_bits, keyword_vocab)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (user_id) DO UPDATE SET resume_keyword_bits = EXCLUDED.resume_keyword_bits, keyword_vocab = EXCLUDED.keyword_vocab
+            """,
+            (USER_ID, text, vec.tolist(), sorted(ext.extract(text)), psycopg2.Binary(ext.extract_bits(text)), ext.version),
+        )
+
+
+def _run(mode: str, conn, n: int, version: str):
+    from app import _Q_RESUME_MATCH
+
+    CountingCursor.round_trips = 0
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        if mode == "legacy":
+            conn.autocommit = True
+            register_vector(conn)
+        with conn.cursor(cursor_factory=CountingCursor) as cur:
+            if mode == "prepared":
+                _Q_RESUME_MATCH.execute(cur, (USER_ID, version))
+            else:
+                cur.execute(PLAIN_SQL, (version, USER_ID))
+            cur.fetchone()
+        samples.append((time.perf_counter() - t0) * 1000)
+    # register_vector opens its own cursor; it costs one round trip per call
+    trips = CountingCursor.round_trips + (n if mode == "legacy" else 0)
+    samples.sort()
+    return trips / n, statistics.median(samples), samples[int(0.95 * (len(samples) - 1))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=2000)
+    args = ap.parse_args()
+
+    migrations.migrate()
+    conn = psycopg2.connect(db.dsn(), connection_factory=db.PooledConnection)
+    db._init_connection(conn)
+    _seed(conn)
+    version = keyword_extractor.default_extractor().version
+    try:
+        for mode in ("legacy", "init-once", "prepared"):
+            _run(mode, conn, 50, version)  # warm up (and PREPARE once for the last mode)
+        print(f"{args.requests} lookups of one resume row over a single connection")
+        print(f"{'mode':<12}{'round trips':>13}{'p50 ms':>10}{'p95 ms':>10}")
+        base = None
+        for mode in ("legacy", "init-once", "prepared"):
+            trips, p50, p95 = _run(mode, conn, args.requests, version)
+            base = base or p50
+            print(f"{mode:<12}{trips:>13.2f}{p50:>10.3f}{p95:>10.3f}   ({base / p50:.2f}x)")
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM resumes WHERE user_id = %s", (USER_ID,))
+        conn.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# fake_llm_server.py
+# Stand-in for a local LLM server, for load tests and the provider tests (no model needed).
+# Speaks both protocols the backend uses, streaming and not:
+#   POST /api/chat                               - Ollama (NDJSON when "stream" is true, the default)
+#   POST /v1/chat/completions, /chat/completions - OpenAI-compatible (SSE when "stream" is true)
+#   GET  /stats                                  - requests, errors, active/peak generations, cancelled streams
+# Each completion waits --latency-ms before the first token, then emits --tokens tokens at
+# --tokens-per-s. A --error-rate fraction of requests answer 503 (which the client retries).
+#
+#   python benchmarks/fake_llm_server.py --port 11434 --latency-ms 300 --tokens-per-s 40
+#   OLLAMA_HOST=http://localhost:11434 uvicorn app:app --port 8000
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = (
+    "Led a team of engineers to deliver a Python service on AWS that cut latency by forty percent "
+    "while improving reliability, observability and developer experience across the platform"
+).split()
+
+
+class FakeLLM:
+    def __init__(self, latency_ms: float = 300.0, tokens_per_s: float = 40.0, tokens: int = 120, error_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.tokens_per_s = tokens_per_s
+        self.tokens = tokens
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self.counters = {"requests": 0, "errors": 0, "completed": 0, "cancelled": 0, "active": 0, "peak_active": 0}
+
+    def configure(self, **settings):
+        for name, value in settings.items():
+            if name not in {"latency_ms", "tokens_per_s", "tokens", "error_rate"}:
+                raise ValueError(f"unknown setting {name!r}")
+            setattr(self, name, float(value) if name != "tokens" else int(value))
+
+    def fail(self) -> bool:
+        self.counters["requests"] += 1
+        if self._rng.random() < self.error_rate:
+            self.counters["errors"] += 1
+            return True
+        return False
+
+    def words(self, n: int):
+        return [WORDS[i % len(WORDS)] + " " for i in range(n)]
+
+    async def generate(self):
+        """Yield tokens at the configured pace, counting active and cancelled generations."""
+        self.counters["active"] += 1
+        self.counters["peak_active"] = max(self.counters["peak_active"], self.counters["active"])
+        try:
+            await asyncio.sleep(self.latency_ms / 1000.0)
+            gap = 1.0 / self.tokens_per_s if self.tokens_per_s > 0 else 0.0
+            t0 = time.perf_counter()
+            for i, word in enumerate(self.words(self.tokens)):
+                # Pace against the start time so sleep overhead doesn't accumulate
+                delay = t0 + i * gap - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                yield word
+            self.counters["completed"] += 1
+        except (asyncio.CancelledError, GeneratorExit):
+            self.counters["cancelled"] += 1
+            raise
+        finally:
+            self.counters["active"] -= 1
+
+    async def full_text(self) -> str:
+        return "".join([w async for w in self.generate()])
+
+
+def make_app(fake: FakeLLM) -> FastAPI:
+    app = FastAPI(title="fake-llm")
+
+    @app.post("/api/chat")
+    async def ollama_chat(request: Request):
+        body = await request.json()
+        if fake.fail():
+            return JSONResponse(status_code=503, content={"error": "server busy"})
+        model = body.get("model", "fake")
+        if not body.get("stream", True):
+            text = await fake.full_text()
+            return {"model": model, "message": {"role": "assistant", "content": text}, "done": True}
+
+        async def lines():
+            async for word in fake.generate():
+                yield json.dumps({"model": model, "message": {"role": "assistant", "content": word}, "done": False}) + "\n"
+            yield json.dumps({"model": model, "message": {"role": "assistant", "content": ""}, "done": True}) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    async def openai_chat(request: Request):
+        body = await request.json()
+        if fake.fail():
+            return JSONResponse(status_code=503, content={"error": {"message": "server busy"}})
+        model = body.get("model", "fake")
+        if not body.get("stream"):
+            text = await fake.full_text()
+            return {"object": "chat.completion", "model": model, "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}]}
+
+        async def events():
+            async for word in fake.generate():
+                yield "data: " + json.dumps({"object": "chat.completion.chunk", "model": model, "choices": [{"index": 0, "delta": {"content": word}}]}) + "\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    app.post("/v1/chat/completions")(openai_chat)
+    app.post("/chat/completions")(openai_chat)
+
+    @app.get("/stats")
+    def stats():
+        return {**fake.counters, "latency_ms": fake.latency_ms, "tokens_per_s": fake.tokens_per_s, "tokens": fake.tokens, "error_rate": fake.error_rate}
+
+    return app
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=11434)
+    ap.add_argument("--latency-ms", type=float, default=300.0, help="delay before the first token")
+    ap.add_argument("--tokens-per-s", type=float, default=40.0, help="0 sends every token at once")
+    ap.add_argument("--tokens", type=int, default=120, help="tokens per completion")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    import uvicorn
+
+    fake = FakeLLM(args.latency_ms, args.tokens_per_s, args.tokens, args.error_rate, args.seed)
+    uvicorn.run(make_app(fake), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Content-addressed blob store in Postgres.
+
+Files (original resumes, generated PDFs) are keyed by their SHA-256 and split into
+``BLOB_CHUNK_SIZE`` rows in ``blob_chunks``. Storing the same bytes twice is a no-op.
+Reads fetch only the chunks a (Range) request covers, a few at a time, so a download
+never holds the whole file in memory. Maintenance::
+
+    python blob_store.py migrate    # move legacy inline bytea columns into the store
+    python blob_store.py gc         # delete blobs no row references any more
+                                    # (and not put within BLOB_GC_GRACE_SECONDS)
+"""
+import hashlib
+import os
+import re
+import sys
+from typing import Callable, Iterator, NamedTuple, Optional
+
+import psycopg2
+import psycopg2.extras
+from fastapi import HTTPException
+from fastapi.responses import Response, StreamingResponse
+
+try:
+    from . import db
+except Exception:
+    import db
+
+
+CHUNK_SIZE = int(os.getenv("BLOB_CHUNK_SIZE", str(256 * 1024)))
+# gc leaves blobs put this recently alone: put() returns a sha before the caller's row references it
+GC_GRACE_SECONDS = float(os.getenv("BLOB_GC_GRACE_SECONDS", "3600"))
+# Chunks fetched per query while streaming (bounds memory per download)
+READ_BATCH = 4
+
+# (table, blob sha column, legacy bytea column, key column) for every reference to a blob
+REFERENCES = (
+    ("resumes", "resume_blob_sha", "resume_blob", "user_id"),
+    ("tailored_resumes", "resume_blob_sha", "resume_blob", "id"),
+    ("cover_letters", "letter_blob_sha", "letter_blob", "id"),
+)
+
+
+class BlobInfo(NamedTuple):
+    sha256: str
+    size: int
+    chunk_size: int
+
+
+def put(cur, data: bytes) -> str:
+    """Store ``data`` once and return its SHA-256 hex digest."""
+    sha = hashlib.sha256(data).hexdigest()
+    # Re-using a stored blob restarts its gc grace period. The row lock orders this against a
+    # concurrent gc: either gc sees the new put_at and keeps the blob, or it has deleted blob
+    # and chunks (one transaction) by the time this runs, and the bytes are written again.
+    cur.execute("UPDATE blobs SET put_at = now() WHERE sha256 = %s", (sha,))
+    if cur.rowcount:
+        return sha
+    view = memoryview(data)
+    psycopg2.extras.execute_values(
+        cur,
+        "INSERT INTO blob_chunks (sha256, idx, data) VALUES %s ON CONFLICT DO NOTHING",
+        [(sha, i, psycopg2.Binary(view[off:off + CHUNK_SIZE])) for i, off in enumerate(range(0, len(data), CHUNK_SIZE))],
+    )
+    # Written last: a blobs row means every chunk is in place (connections are autocommit)
+    cur.execute(
+        "INSERT INTO blobs (sha256, size, chunk_size) VALUES (%s, %s, %s) ON CONFLICT DO NOTHING",
+        (sha, len(data), CHUNK_SIZE),
+    )
+    return sha
+
+
+def stat(cur, sha: Optional[str]) -> Optional[BlobInfo]:
+    if not sha:
+        return None
+    cur.execute("SELECT sha256, size, chunk_size FROM blobs WHERE sha256 = %s", (sha,))
+    row = cur.fetchone()
+    return BlobInfo(row[0], int(row[1]), int(row[2])) if row else None
+
+
+def iter_range(info: BlobInfo, start: int, end: int, get_conn: Callable = db.getconn, put_conn: Callable = db.putconn) -> Iterator[bytes]:
+    """Yield bytes ``start..end`` (inclusive) of a blob, ``READ_BATCH`` chunks per query.
+
+    A connection is checked out per batch, not for the whole response, so slow clients
+    don't pin pool slots.
+    """
+    first, last = start // info.chunk_size, end // info.chunk_size
+    for lo in range(first, last + 1, READ_BATCH):
+        hi = min(last, lo + READ_BATCH - 1)
+        conn = get_conn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT idx, data FROM blob_chunks WHERE sha256 = %s AND idx BETWEEN %s AND %s ORDER BY idx",
+                    (info.sha256, lo, hi),
+                )
+                rows = cur.fetchall() or []
+        finally:
+            put_conn(conn)
+        for idx, data in rows:
+            base = idx * info.chunk_size
+            yield bytes(data[max(start - base, 0): end - base + 1])
+
+
+def read(info: BlobInfo) -> bytes:
+    return b"".join(iter_range(info, 0, info.size - 1)) if info.size else b""
+
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(header: Optional[str], size: int):
+    """(start, end) for a single ``bytes=`` range, None to send the full body; 416 if unsatisfiable."""
+    if not header:
+        return None
+    m = _RANGE_RE.match(header.strip())
+    if not m or (not m.group(1) and not m.group(2)):
+        # Multi-range or malformed: ignoring the header is allowed (RFC 9110 14.2)
+        return None
+    if m.group(1):
+        start = int(m.group(1))
+        end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+    else:
+        start, end = max(size - int(m.group(2)), 0), size - 1
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+def range_response(range_header: Optional[str], size: int, read_range: Callable[[int, int], Iterator[bytes]], media_type: str, headers: Optional[dict] = None) -> Response:
+    """Full (200) or single-range (206) streamed response over ``read_range(start, end)``."""
+    headers = dict(headers or {})
+    headers["Accept-Ranges"] = "bytes"
+    rng = _parse_range(range_header, size)
+    if size == 0:
+        return Response(b"", media_type=media_type, headers=headers)
+    start, end = rng or (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    if rng:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(read_range(start, end), status_code=206 if rng else 200, media_type=media_type, headers=headers)
+
+
+def blob_response(range_header: Optional[str], info: Optional[BlobInfo], legacy: Optional[bytes], media_type: str, headers: Optional[dict] = None) -> Response:
+    """Serve a stored blob, or bytes still held in a legacy bytea column."""
+    if info is not None:
+        return range_response(range_header, info.size, lambda s, e: iter_range(info, s, e), media_type, headers)
+    data = bytes(legacy or b"")
+    return range_response(range_header, len(data), lambda s, e: iter([data[s:e + 1]]), media_type, headers)
+
+
+def migrate_legacy(batch: int = 50) -> int:
+    """Move inline bytea blobs into the store, ``batch`` rows per query; returns rows moved."""
+    moved = 0
+    conn = db.getconn()
+    try:
+        with conn.cursor() as cur:
+            for table, sha_col, legacy_col, key_col in REFERENCES:
+                while True:
+                    cur.execute(
+                        f"SELECT {key_col}, {legacy_col} FROM {table} WHERE {legacy_col} IS NOT NULL AND {sha_col} IS NULL LIMIT %s",
+                        (batch,),
+                    )
+                    rows = cur.fetchall() or []
+                    if not rows:
+                        break
+                    for key, data in rows:
+                        sha = put(cur, bytes(data))
+                        cur.execute(
+                            f"UPDATE {table} SET {sha_col} = %s, {legacy_col} = NULL WHERE {key_col} = %s",
+                            (sha, key),
+                        )
+                        moved += 1
+    finally:
+        db.putconn(conn)
+    return moved
+
+
+def gc() -> int:
+    """Delete blobs no row references that weren't put within ``GC_GRACE_SECONDS``; returns the number removed."""
+    unreferenced = " AND ".join(
+        f"NOT EXISTS (SELECT 1 FROM {table} t WHERE t.{sha_col} = b.sha256)" for table, sha_col, _, _ in REFERENCES
+    )
+    conn = db.getconn()
+    try:
+        # One transaction: a put() racing the delete waits on the blobs row and then finds
+        # neither the row nor its chunks
+        conn.autocommit = False
+        with conn.cursor() as cur:
+            # Blob row first: readers treat a missing blobs row as "no blob"
+            cur.execute(
+                f"DELETE FROM blobs b WHERE b.put_at < now() - make_interval(secs => %s) AND {unreferenced} RETURNING sha256",
+                (GC_GRACE_SECONDS,),
+            )
+            gone = [r[0] for r in cur.fetchall() or []]
+            if gone:
+                cur.execute("DELETE FROM blob_chunks WHERE sha256 = ANY(%s)", (gone,))
+            # Chunks of puts that died before writing their blobs row (old enough not to be in flight)
+            cur.execute(
+                """
+                DELETE FROM blob_chunks c
+                WHERE c.created_at < now() - make_interval(secs => %s)
+                  AND NOT EXISTS (SELECT 1 FROM blobs b WHERE b.sha256 = c.sha256)
+                """,
+                (GC_GRACE_SECONDS,),
+            )
+        conn.commit()
+        return len(gone)
+    finally:
+        db.putconn(conn)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["migrate"]:
+        print(f"moved {migrate_legacy()} blob(s) into the store")
+    elif sys.argv[1:] == ["gc"]:
+        print(f"removed {gc()} unreferenced blob(s)")
+    else:
+        sys.exit("usage: python blob_store.py migrate|gc")
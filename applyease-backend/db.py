@@ -0,0 +1,278 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional, Sequence
+
+import psycopg2
+import psycopg2.extensions
+
+
+class PoolTimeoutError(RuntimeError):
+    """No connection became free within the acquire timeout."""
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers its one-time setup and server-side prepared statements."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.vector_ready = False
+        self.prepared: set = set()
+
+
+def _init_connection(conn: PooledConnection):
+    # Runs once per physical connection instead of on every checkout
+    conn.autocommit = True
+    _ensure_vector(conn)
+
+
+def _ensure_vector(conn: PooledConnection):
+    # register_vector looks up the type OID (one round trip); retried on later checkouts
+    # only while the extension doesn't exist yet (before the first migration)
+    if conn.vector_ready:
+        return
+    from pgvector.psycopg2 import register_vector
+    try:
+        register_vector(conn)
+        conn.vector_ready = True
+    except psycopg2.ProgrammingError:
+        pass
+
+
+def dsn() -> str:
+    host = os.getenv("PGHOST", "localhost")
+    port = os.getenv("PGPORT", "5432")
+    user = os.getenv("PGUSER", os.getenv("USER", "postgres"))
+    password = os.getenv("PGPASSWORD", "")
+    dbname = os.getenv("PGDATABASE", "applyease")
+    if password:
+        return f"host={host} port={port} dbname={dbname} user={user} password={password}"
+    else:
+        return f"host={host} port={port} dbname={dbname} user={user}"
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 pool shared by the app and its routers.
+
+    Unlike ``SimpleConnectionPool`` (not safe across threads, and raises once ``maxconn``
+    connections are out), ``getconn`` blocks up to ``timeout`` seconds for a free slot and
+    then raises ``PoolTimeoutError``. Connections idle for longer than ``ping_after`` seconds
+    are checked with ``SELECT 1`` on checkout and replaced if the server dropped them.
+    """
+
+    def __init__(self, dsn: str, minconn: int = 1, maxconn: int = 10, timeout: float = 5.0, ping_after: float = 30.0):
+        self.dsn = dsn
+        self.minconn = max(0, int(minconn))
+        self.maxconn = max(1, int(maxconn))
+        self.timeout = float(timeout)
+        self.ping_after = float(ping_after)
+        self._slots = threading.BoundedSemaphore(self.maxconn)
+        self._lock = threading.Lock()
+        self._idle: "deque[tuple]" = deque()  # (conn, returned_at)
+        self._open = 0
+        self._in_use = 0
+        self._closed = False
+        self._counters = {"checkouts": 0, "waits": 0, "timeouts": 0, "created": 0, "discarded": 0}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        for _ in range(self.minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def getconn(self, timeout: Optional[float] = None):
+        if self._closed:
+            raise psycopg2.InterfaceError("connection pool is closed")
+        t0 = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._counters["waits"] += 1
+            if not self._slots.acquire(timeout=self.timeout if timeout is None else timeout):
+                with self._lock:
+                    self._counters["timeouts"] += 1
+                raise PoolTimeoutError(f"no database connection free after {self.timeout if timeout is None else timeout:.1f}s")
+        waited = time.perf_counter() - t0
+        try:
+            conn = self._checkout()
+            _ensure_vector(conn)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._in_use += 1
+            self._counters["checkouts"] += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return conn
+
+    def putconn(self, conn, close: bool = False):
+        try:
+            if not close and not conn.closed:
+                status = conn.info.transaction_status
+                if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                    close = True
+                elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    # Handler left a transaction open (or failed mid-transaction)
+                    conn.rollback()
+                if not close and not conn.autocommit:
+                    conn.autocommit = True
+            if close or conn.closed or self._closed:
+                self._discard(conn)
+            else:
+                with self._lock:
+                    self._idle.append((conn, time.monotonic()))
+        except Exception:
+            self._discard(conn)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def closeall(self):
+        self._closed = True
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._counters)
+            out.update(
+                max=self.maxconn,
+                open=self._open,
+                in_use=self._in_use,
+                idle=len(self._idle),
+                utilization=round(self._in_use / self.maxconn, 4),
+                wait_ms_avg=round(self._wait_total / out["checkouts"] * 1000.0, 3) if out["checkouts"] else 0.0,
+                wait_ms_max=round(self._wait_max * 1000.0, 3),
+            )
+        return out
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn, connection_factory=PooledConnection)
+        try:
+            _init_connection(conn)
+        except Exception:
+            conn.close()
+            raise
+        with self._lock:
+            self._open += 1
+            self._counters["created"] += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._open -= 1
+            self._counters["discarded"] += 1
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                item = self._idle.pop() if self._idle else None
+            if item is None:
+                return self._connect()
+            conn, returned_at = item
+            if not conn.closed and self._healthy(conn, returned_at):
+                return conn
+            self._discard(conn)
+
+    def _healthy(self, conn, returned_at: float) -> bool:
+        if time.monotonic() - returned_at < self.ping_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            if not conn.autocommit:
+                conn.rollback()
+            return True
+        except Exception:
+            return False
+
+
+class Prepared:
+    """A named server-side prepared statement, created lazily on each connection that runs it.
+
+    ``sql`` uses ``$1, $2, ...`` placeholders. The first ``execute`` on a connection sends
+    ``PREPARE`` and ``EXECUTE`` in one round trip; later ones send only ``EXECUTE``, skipping
+    the parse and plan.
+    """
+
+    def __init__(self, name: str, sql: str, nparams: int):
+        self.name = name
+        self.sql = sql
+        self._execute = f"EXECUTE {name}" + (" (" + ", ".join(["%s"] * nparams) + ")" if nparams else "")
+
+    def execute(self, cur, params: Sequence = ()):
+        conn = cur.connection
+        if self.name in conn.prepared:
+            cur.execute(self._execute, params)
+            return cur
+        # Escape % in the statement body; only the EXECUTE arguments are interpolated
+        try:
+            cur.execute(f"PREPARE {self.name} AS {self.sql.replace('%', '%%')}; {self._execute}", params)
+        except Exception:
+            # The PREPARE may have gone through even if the EXECUTE failed
+            try:
+                cur.execute(f"DEALLOCATE {self.name}")
+            except Exception:
+                pass
+            raise
+        conn.prepared.add(self.name)
+        return cur
+
+
+_statements: dict = {}
+
+
+def prepared(name: str, sql: str, nparams: int) -> Prepared:
+    """Register (or fetch) a prepared statement; names are global to the process."""
+    stmt = _statements.get(name)
+    if stmt is None:
+        stmt = _statements[name] = Prepared(name, sql, nparams)
+    elif stmt.sql != sql:
+        raise ValueError(f"prepared statement {name!r} already registered with different SQL")
+    return stmt
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """The process-wide pool, created on first use from ``PG_POOL_*`` settings."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    dsn(),
+                    minconn=int(os.getenv("PG_POOL_MIN", "1")),
+                    maxconn=int(os.getenv("PG_POOL_MAX", "10")),
+                    timeout=float(os.getenv("PG_POOL_TIMEOUT", "5")),
+                    ping_after=float(os.getenv("PG_POOL_PING_AFTER", "30")),
+                )
+    return _pool
+
+
+def getconn(timeout: Optional[float] = None):
+    return get_pool().getconn(timeout)
+
+
+def putconn(conn, close: bool = False):
+    get_pool().putconn(conn, close)
+
+
+def stats() -> dict:
+    return _pool.stats() if _pool is not None else {}
+
+
+def close():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
@@ -0,0 +1,139 @@
+import os
+from typing import List
+
+import numpy as np
+
+
+DEFAULT_ONNX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "onnx")
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "models")
+
+
+def load_sentence_transformer(model_name: str):
+    """Load from the local model directory when present (no hub round trips), else download and save it there."""
+    from sentence_transformers import SentenceTransformer
+    local_dir = os.path.join(os.getenv("EMBED_MODEL_DIR", DEFAULT_MODEL_DIR), model_name)
+    if os.path.isfile(os.path.join(local_dir, "modules.json")):
+        return SentenceTransformer(local_dir, device="cpu")
+    model = SentenceTransformer(model_name, device="cpu")
+    try:
+        model.save(local_dir)
+    except Exception:
+        pass
+    return model
+
+
+def _normalize_rows(mat: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0.0] = 1.0
+    return mat / norms
+
+
+class TorchBackend:
+    """Reference backend: sentence-transformers on PyTorch (fp32)."""
+
+    name = "torch"
+
+    def __init__(self, model_name: str):
+        self._model = load_sentence_transformer(model_name)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self._model.encode(list(texts), batch_size=max(32, len(texts))), dtype=np.float32)
+
+
+class OnnxBackend:
+    """The same transformer exported to ONNX and run with onnxruntime on CPU.
+
+    Mean pooling and L2 normalization (the model's sentence-transformers head) are done in
+    NumPy, so outputs are directly comparable with ``TorchBackend``. With ``quantize=True`` the
+    graph's weights are dynamically quantized to int8.
+    """
+
+    def __init__(self, model_name: str, quantize: bool = False, onnx_dir: str = None, max_length: int = 256):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.name = "onnx-int8" if quantize else "onnx"
+        model_dir = os.path.join(onnx_dir or os.getenv("EMBED_ONNX_DIR", DEFAULT_ONNX_DIR), model_name)
+        path = export_onnx(model_name, model_dir, quantize=quantize)
+        self._tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length=max_length)
+        self._tokenizer.enable_padding()
+        opts = ort.SessionOptions()
+        threads = int(os.getenv("EMBED_ORT_THREADS", "0"))
+        if threads > 0:
+            opts.intra_op_num_threads = threads
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(path, sess_options=opts, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self._session.get_inputs()}
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        encs = self._tokenizer.encode_batch(list(texts))
+        ids = np.asarray([e.ids for e in encs], dtype=np.int64)
+        mask = np.asarray([e.attention_mask for e in encs], dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._inputs:
+            feeds["token_type_ids"] = np.asarray([e.type_ids for e in encs], dtype=np.int64)
+        hidden = self._session.run(None, feeds)[0]
+        m = mask[..., None].astype(np.float32)
+        pooled = (hidden * m).sum(axis=1) / np.clip(m.sum(axis=1), 1e-9, None)
+        return _normalize_rows(pooled.astype(np.float32))
+
+
+def export_onnx(model_name: str, model_dir: str, quantize: bool = False) -> str:
+    """Export ``model_name`` to ``model_dir/model.onnx`` (and the int8 variant) once; return the path.
+
+    Exporting needs torch + sentence-transformers; serving an already-exported graph only
+    needs onnxruntime and tokenizers.
+    """
+    fp32_path = os.path.join(model_dir, "model.onnx")
+    int8_path = os.path.join(model_dir, "model.int8.onnx")
+    if not os.path.exists(fp32_path) or not os.path.exists(os.path.join(model_dir, "tokenizer.json")):
+        import torch
+
+        os.makedirs(model_dir, exist_ok=True)
+        st = load_sentence_transformer(model_name)
+        hf_model = st[0].auto_model.eval()
+        tokenizer = st[0].tokenizer
+        tokenizer.save_pretrained(model_dir)
+
+        class _Encoder(torch.nn.Module):
+            def __init__(self, m):
+                super().__init__()
+                self.m = m
+
+            def forward(self, input_ids, attention_mask, token_type_ids):
+                return self.m(input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids)[0]
+
+        dummy = tokenizer(["warm up the exporter"], return_tensors="pt")
+        axes = {0: "batch", 1: "seq"}
+        tmp_path = fp32_path + ".tmp"
+        with torch.no_grad():
+            torch.onnx.export(
+                _Encoder(hf_model),
+                (dummy["input_ids"], dummy["attention_mask"], dummy["token_type_ids"]),
+                tmp_path,
+                input_names=["input_ids", "attention_mask", "token_type_ids"],
+                output_names=["last_hidden_state"],
+                dynamic_axes={"input_ids": axes, "attention_mask": axes, "token_type_ids": axes, "last_hidden_state": axes},
+                opset_version=14,
+            )
+        os.replace(tmp_path, fp32_path)
+    if not quantize:
+        return fp32_path
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        tmp_path = int8_path + ".tmp"
+        quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, int8_path)
+    return int8_path
+
+
+def create(backend: str, model_name: str):
+    backend = (backend or "torch").lower()
+    if backend == "torch":
+        return TorchBackend(model_name)
+    if backend == "onnx":
+        return OnnxBackend(model_name)
+    if backend in ("onnx-int8", "onnx_int8", "int8"):
+        return OnnxBackend(model_name, quantize=True)
+    raise ValueError(f"Unsupported EMBED_BACKEND: {backend} (use torch, onnx or onnx-int8)")
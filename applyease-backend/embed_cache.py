@@ -0,0 +1,151 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache: bounded in-process LRU in front of a Postgres table.
+
+    Keys are ``sha256(model_name + "\\n" + normalized_text)`` so the same job description or
+    resume text maps to the same entry across restarts and workers. The persistent tier is
+    best-effort: database errors degrade to a miss instead of failing the request.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_entries: int = 4096,
+        get_conn: Optional[Callable] = None,
+        put_conn: Optional[Callable] = None,
+    ):
+        self.model_name = model_name
+        self.max_entries = max(1, int(max_entries))
+        self._get_conn = get_conn
+        self._put_conn = put_conn
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "persistent_hits": 0, "misses": 0, "evictions": 0, "persistent_errors": 0}
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        # Whitespace-only differences don't change the tokenization, so collapse them
+        return " ".join((text or "").split())
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\n{self.normalize(text)}".encode("utf-8")).hexdigest()
+
+    @property
+    def persistent(self) -> bool:
+        return self._get_conn is not None and self._put_conn is not None
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        pending: List[str] = []
+        with self._lock:
+            for k in keys:
+                if k in found:
+                    continue
+                vec = self._lru.get(k)
+                if vec is not None:
+                    self._lru.move_to_end(k)
+                    self._counters["memory_hits"] += 1
+                    found[k] = vec
+                elif k not in pending:
+                    pending.append(k)
+        if pending and self.persistent:
+            stored = self._load(pending)
+            with self._lock:
+                self._counters["persistent_hits"] += len(stored)
+            for k, vec in stored.items():
+                self._remember(k, vec)
+                found[k] = vec
+        with self._lock:
+            self._counters["misses"] += len([k for k in pending if k not in found])
+        return found
+
+    def peek(self, key: str) -> Optional[np.ndarray]:
+        """In-process lookup only; never touches the database."""
+        with self._lock:
+            vec = self._lru.get(key)
+            if vec is not None:
+                self._lru.move_to_end(key)
+                self._counters["memory_hits"] += 1
+            return vec
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        if not items:
+            return
+        frozen = {}
+        for k, vec in items.items():
+            v = np.array(vec, dtype=np.float32, copy=True)
+            v.setflags(write=False)
+            frozen[k] = v
+            self._remember(k, v)
+        if self.persistent:
+            self._store(frozen)
+
+    def put(self, key: str, vec: np.ndarray):
+        self.put_many({key: vec})
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._counters)
+            out["size"] = len(self._lru)
+        out["max_entries"] = self.max_entries
+        out["persistent"] = self.persistent
+        lookups = out["memory_hits"] + out["persistent_hits"] + out["misses"]
+        out["hit_rate"] = round((out["memory_hits"] + out["persistent_hits"]) / lookups, 4) if lookups else 0.0
+        return out
+
+    def _remember(self, key: str, vec: np.ndarray):
+        with self._lock:
+            self._lru[key] = vec
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def _load(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        conn = None
+        try:
+            conn = self._get_conn()
+            with conn.cursor() as cur:
+                cur.execute("SELECT key, embedding FROM embedding_cache WHERE key = ANY(%s)", (keys,))
+                out = {}
+                for k, buf in cur.fetchall() or []:
+                    vec = np.frombuffer(bytes(buf), dtype=np.float32)
+                    vec.setflags(write=False)
+                    out[k] = vec
+                return out
+        except Exception:
+            with self._lock:
+                self._counters["persistent_errors"] += 1
+            return {}
+        finally:
+            if conn is not None:
+                self._put_conn(conn)
+
+    def _store(self, items: Dict[str, np.ndarray]):
+        import psycopg2
+        import psycopg2.extras
+        conn = None
+        try:
+            conn = self._get_conn()
+            with conn.cursor() as cur:
+                psycopg2.extras.execute_values(
+                    cur,
+                    "INSERT INTO embedding_cache (key, model, embedding) VALUES %s ON CONFLICT (key) DO NOTHING",
+                    [(k, self.model_name, psycopg2.Binary(v.tobytes())) for k, v in items.items()],
+                )
+        except Exception:
+            with self._lock:
+                self._counters["persistent_errors"] += 1
+        finally:
+            if conn is not None:
+                self._put_conn(conn)
@@ -0,0 +1,184 @@
+import multiprocessing as mp
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import List
+
+import numpy as np
+
+
+def _worker_main(conn, shm_name: str, capacity: int, dim: int, backend: str, model_name: str, threads: int):
+    # Pin math-library threads before torch/onnxruntime are imported in this process
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "EMBED_ORT_THREADS"):
+        os.environ[var] = str(threads)
+    try:
+        from . import embed_backends
+    except Exception:
+        import embed_backends
+    shm = shared_memory.SharedMemory(name=shm_name)
+    out = np.ndarray((capacity, dim), dtype=np.float32, buffer=shm.buf)
+    try:
+        if backend == "torch":
+            import torch
+            torch.set_num_threads(threads)
+        model = embed_backends.create(backend, model_name)
+        model.encode(["warm up"])
+        conn.send(("ready", None))
+    except Exception as e:
+        conn.send(("err", f"{type(e).__name__}: {e}"))
+        return
+    while True:
+        try:
+            texts = conn.recv()
+        except EOFError:
+            break
+        if texts is None:
+            break
+        try:
+            vecs = model.encode(texts)
+            out[: len(texts)] = vecs
+            conn.send(("ok", len(texts)))
+        except Exception as e:
+            conn.send(("err", f"{type(e).__name__}: {e}"))
+    del out
+    shm.close()
+
+
+class _Worker:
+    def __init__(self, ctx, capacity: int, dim: int, backend: str, model_name: str, threads: int):
+        self.capacity = capacity
+        self.dim = dim
+        self.shm = shared_memory.SharedMemory(create=True, size=capacity * dim * 4)
+        self.out = np.ndarray((capacity, dim), dtype=np.float32, buffer=self.shm.buf)
+        self.conn, child_conn = ctx.Pipe()
+        self.proc = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.shm.name, capacity, dim, backend, model_name, threads),
+            name="embed-worker",
+            daemon=True,
+        )
+        self.proc.start()
+        child_conn.close()
+
+    def wait_ready(self):
+        status, detail = self.conn.recv()
+        if status != "ready":
+            raise RuntimeError(f"embedding worker failed to start: {detail}")
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        self.conn.send(list(texts))
+        status, detail = self.conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"embedding worker error: {detail}")
+        return np.array(self.out[:detail], copy=True)
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except Exception:
+            pass
+        self.proc.join(timeout=5)
+        if self.proc.is_alive():
+            self.proc.terminate()
+        del self.out
+        self.shm.close()
+        self.shm.unlink()
+
+
+class EmbeddingWorkerPool:
+    """Run the embedding model in N worker processes, each with a pinned thread count.
+
+    Texts go to an idle worker over a Pipe and vectors come back through that worker's
+    shared-memory buffer, so model inference never competes for the app's GIL or
+    threadpool. ``submit`` is non-blocking and returns a Future; ``encode`` waits on it.
+    """
+
+    def __init__(self, backend: str, model_name: str, dim: int, n_workers: int = 2, threads_per_worker: int = 0, capacity: int = 64):
+        ctx = mp.get_context("spawn")
+        self.name = backend
+        self.n_workers = max(1, int(n_workers))
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.n_workers)
+        self.capacity = max(1, int(capacity))
+        self._spawn = lambda: _Worker(ctx, self.capacity, dim, backend, model_name, self.threads_per_worker)
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers = [self._spawn() for _ in range(self.n_workers)]
+        for w in self._workers:
+            w.wait_ready()
+            self._idle.put(w)
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._requests = 0
+        self._restarts = 0
+        # Dispatch threads only block on pipes (GIL released); the CPU work is in the workers
+        self._dispatch = ThreadPoolExecutor(max_workers=self.n_workers, thread_name_prefix="embed-dispatch")
+
+    def submit(self, texts: List[str]) -> Future:
+        return self._dispatch.submit(self._run, list(texts))
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return self.submit(texts).result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.n_workers,
+                "threads_per_worker": self.threads_per_worker,
+                "busy": self._busy,
+                "requests": self._requests,
+                "restarts": self._restarts,
+            }
+
+    def close(self):
+        self._dispatch.shutdown(wait=True)
+        for w in self._workers:
+            w.close()
+
+    def _run(self, texts: List[str]) -> np.ndarray:
+        worker = self._idle.get()
+        if worker is None:
+            self._idle.put(None)  # every worker is gone; wake the next caller too
+            raise RuntimeError("no embedding workers left")
+        with self._lock:
+            self._busy += 1
+            self._requests += 1
+        try:
+            parts = [worker.encode(texts[i:i + self.capacity]) for i in range(0, len(texts), self.capacity)]
+            return np.concatenate(parts) if parts else np.zeros((0, worker.dim), dtype=np.float32)
+        except (EOFError, BrokenPipeError, ConnectionResetError):
+            dead, worker = worker, None
+            worker = self._replace(dead)  # when no replacement starts, the pool shrinks and that error is raised
+            raise RuntimeError("embedding worker exited; restarted")
+        finally:
+            with self._lock:
+                self._busy -= 1
+            if worker is not None:
+                self._idle.put(worker)
+
+    def _replace(self, dead: _Worker) -> _Worker:
+        try:
+            dead.close()
+        except Exception:
+            pass
+        fresh = None
+        try:
+            fresh = self._spawn()
+            fresh.wait_ready()
+        except Exception:
+            if fresh is not None:
+                try:
+                    fresh.close()
+                except Exception:
+                    pass
+            with self._lock:
+                self._workers = [w for w in self._workers if w is not dead]
+                self.n_workers = len(self._workers)
+                empty = not self._workers
+            if empty:
+                self._idle.put(None)
+            raise
+        with self._lock:
+            self._workers = [fresh if w is dead else w for w in self._workers]
+            self._restarts += 1
+        return fresh
@@ -0,0 +1,304 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import numpy as np
+
+try:
+    from . import embed_backends, embed_workers
+    from .embed_cache import EmbeddingCache
+except Exception:
+    import embed_backends
+    import embed_workers
+    from embed_cache import EmbeddingCache
+
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+DIM = 384  # all-MiniLM-L6-v2 embedding size
+
+
+class NotReadyError(RuntimeError):
+    """Raised when an embedding is requested before ``load_model`` has finished."""
+
+
+class EmbeddingBatcher:
+    """Coalesce single-text embed calls from concurrent requests into batched encodes.
+
+    Callers block on a Future while a background thread gathers queued texts for up to
+    ``max_wait_ms`` (or until ``max_batch_size`` texts are waiting) and runs one
+    ``encode_batch`` call for the whole group. With ``concurrency > 1`` (an out-of-process
+    worker pool) up to that many batches are in flight at once; while all are busy, new
+    texts keep accumulating into the next batch.
+    """
+
+    def __init__(
+        self,
+        encode_batch: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        concurrency: int = 1,
+    ):
+        self._encode_batch = encode_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.concurrency = max(1, int(concurrency))
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._flushers = ThreadPoolExecutor(self.concurrency, thread_name_prefix="embed-flush") if self.concurrency > 1 else None
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._thread = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        fut: Future = Future()
+        self._queue.put((text, fut))
+        return fut
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.submit(text).result()
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        futures = [self.submit(t) for t in texts]
+        return np.stack([f.result() for f in futures]) if futures else np.zeros((0, DIM), dtype=np.float32)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            batches, items = self._batches, self._items
+        return {
+            "batches": batches,
+            "items": items,
+            "avg_batch_size": round(items / batches, 2) if batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+        }
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        if self._flushers is not None:
+            self._flushers.shutdown(wait=True)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            self._slots.acquire()
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.max_wait_ms / 1000.0
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    nxt = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+            if self._flushers is not None:
+                self._flushers.submit(self._flush, batch)
+            else:
+                self._flush(batch)
+            if stop:
+                return
+
+    def _flush(self, batch):
+        texts = [t for t, _ in batch]
+        try:
+            vecs = self._encode_batch(texts)
+        except BaseException as e:
+            for _, fut in batch:
+                fut.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(batch)
+        for (_, fut), vec in zip(batch, vecs):
+            fut.set_result(vec)
+
+
+_model = None
+_batcher: Optional[EmbeddingBatcher] = None
+_cache: Optional[EmbeddingCache] = None
+_lock = threading.Lock()
+
+
+def stats() -> dict:
+    return {
+        "embed_backend": model_id(),
+        "embed_cache": _cache.stats() if _cache is not None else None,
+        "embed_batcher": _batcher.stats() if _batcher is not None else None,
+        "embed_workers": _model.stats() if isinstance(_model, embed_workers.EmbeddingWorkerPool) else None,
+    }
+
+
+def backend_name() -> str:
+    return os.getenv("EMBED_BACKEND", "torch").lower()
+
+
+def model_id() -> str:
+    # Cache keys must differ per backend: ONNX/int8 vectors are close to, not equal to, torch's
+    name = getattr(_model, "name", None) or backend_name()
+    return MODEL_NAME if name == "torch" else f"{MODEL_NAME}@{name}"
+
+
+def load_model():
+    # Load a compact, high-quality general-purpose model on the selected backend
+    # (EMBED_BACKEND=torch|onnx|onnx-int8); cached locally after first download/export.
+    # EMBED_WORKERS>0 moves inference into that many worker processes.
+    global _model
+    n_workers = int(os.getenv("EMBED_WORKERS", "0"))
+    if n_workers > 0:
+        _model = embed_workers.EmbeddingWorkerPool(
+            backend_name(),
+            MODEL_NAME,
+            DIM,
+            n_workers=n_workers,
+            threads_per_worker=int(os.getenv("EMBED_WORKER_THREADS", "0")),
+        )
+    else:
+        _model = embed_backends.create(backend_name(), MODEL_NAME)
+    if os.getenv("EMBED_BATCHING", "1").lower() not in {"0", "false", "off"}:
+        configure_batching(True)
+    return _model
+
+
+def warm_up():
+    # First forward pass allocates buffers and (for ONNX) finalizes the graph
+    encode_batch(["warm up the embedding model"])
+
+
+def configure_batching(enabled: bool, max_batch_size: Optional[int] = None, max_wait_ms: Optional[float] = None):
+    global _batcher
+    with _lock:
+        old, _batcher = _batcher, None
+        if enabled:
+            _batcher = EmbeddingBatcher(
+                embed_many,
+                max_batch_size=max_batch_size or int(os.getenv("EMBED_BATCH_MAX_SIZE", "32")),
+                max_wait_ms=max_wait_ms if max_wait_ms is not None else float(os.getenv("EMBED_BATCH_WAIT_MS", "5")),
+                concurrency=getattr(_model, "n_workers", 1),
+            )
+    if old is not None:
+        old.close()
+
+
+def shutdown():
+    global _model
+    configure_batching(False)
+    if isinstance(_model, embed_workers.EmbeddingWorkerPool):
+        _model.close()
+    _model = None
+
+
+def configure_cache(get_conn: Optional[Callable] = None, put_conn: Optional[Callable] = None):
+    # Persistent tier is used when connection callables are given and EMBED_CACHE_PERSIST isn't off
+    global _cache
+    if os.getenv("EMBED_CACHE", "1").lower() in {"0", "false", "off"}:
+        _cache = None
+        return None
+    if os.getenv("EMBED_CACHE_PERSIST", "1").lower() in {"0", "false", "off"}:
+        get_conn = put_conn = None
+    _cache = EmbeddingCache(
+        model_id(),
+        max_entries=int(os.getenv("EMBED_CACHE_SIZE", "4096")),
+        get_conn=get_conn,
+        put_conn=put_conn,
+    )
+    return _cache
+
+
+def batcher() -> Optional[EmbeddingBatcher]:
+    return _batcher
+
+
+def cache() -> Optional[EmbeddingCache]:
+    return _cache
+
+
+def encode_batch(texts: List[str]) -> np.ndarray:
+    """One forward pass over ``texts``; returns a (len(texts), DIM) float32 matrix."""
+    if _model is None:
+        raise NotReadyError("embedding model not loaded")
+    if not texts:
+        return np.zeros((0, DIM), dtype=np.float32)
+    return _model.encode(list(texts))
+
+
+def chunk_text(text: str, max_words: Optional[int] = None, overlap: Optional[int] = None) -> List[str]:
+    """Split ``text`` into overlapping word windows that fit the model's 256 word-piece limit."""
+    words = (text or "").split()
+    if not words:
+        return []
+    max_words = max(1, max_words or int(os.getenv("CHUNK_WORDS", "160")))
+    overlap = overlap if overlap is not None else int(os.getenv("CHUNK_OVERLAP", "32"))
+    overlap = min(max(0, overlap), max_words - 1)
+    step = max_words - overlap
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + max_words]))
+        if start + max_words >= len(words):
+            break
+    return chunks
+
+
+def submit(text: str) -> Future:
+    """Non-blocking embed: returns a Future for ``text``'s vector.
+
+    In-process cache hits resolve immediately; everything else goes to the micro-batcher,
+    which does the persistent-cache lookup and the encode once for the whole batch.
+    """
+    fut: Future = Future()
+    c = _cache
+    if c is not None:
+        vec = c.peek(c.key(text))
+        if vec is not None:
+            fut.set_result(vec)
+            return fut
+    b = _batcher
+    if b is not None:
+        return b.submit(text)
+    try:
+        fut.set_result(embed_many([text])[0])
+    except Exception as e:
+        fut.set_exception(e)
+    return fut
+
+
+def embed(text: str) -> np.ndarray:
+    return submit(text).result()
+
+
+async def aembed(text: str) -> np.ndarray:
+    return await asyncio.wrap_future(submit(text))
+
+
+def embed_many(texts: List[str]) -> np.ndarray:
+    """Embed ``texts`` with a single encode call for whatever isn't already cached."""
+    c = _cache
+    if c is None:
+        return encode_batch(texts)
+    keys = [c.key(t) for t in texts]
+    found = c.get_many(keys)
+    todo = {}
+    for k, t in zip(keys, texts):
+        if k not in found and k not in todo:
+            todo[k] = t
+    if todo:
+        fresh = encode_batch(list(todo.values()))
+        computed = dict(zip(todo.keys(), fresh))
+        c.put_many(computed)
+        found.update(computed)
+    if not keys:
+        return np.zeros((0, DIM), dtype=np.float32)
+    return np.stack([found[k] for k in keys])
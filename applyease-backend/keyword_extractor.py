@@ -0,0 +1,268 @@
+import hashlib
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+
+_TOKEN_RE = re.compile(r"[a-zA-Z0-9][a-zA-Z0-9+.#\-]*")
+_EXTRA_STOP = {
+    "experience",
+    "experiences",
+    "responsibility",
+    "responsibilities",
+    "requirements",
+    "requirement",
+    "work",
+    "works",
+    "company",
+    "role",
+    "roles",
+    "candidate",
+    "candidates",
+    "job",
+    "jobs",
+    "team",
+    "teams",
+    "developer",
+    "developers",
+    "engineer",
+    "engineers",
+    "backend",
+    "front-end",
+    "frontend",
+    "fullstack",
+    "full-stack",
+    "experienced",
+    "looking",
+    "opportunity",
+    "position",
+    "applicant",
+    "applicants",
+    "employee",
+    "employees",
+    "employer",
+    "employers",
+    "candidate",
+    "candidates",
+    "culture",
+    "stakeholder",
+    "stakeholders",
+    "collaborate",
+    "collaboration",
+    "communication",
+    "communications",
+    "benefits",
+    "salary",
+    # Generic JD adjectives/phrases we don't want as tech terms
+    "consumer-facing",
+    "customer-obsessed",
+    "results-driven",
+    "revenue-generating",
+    "self-directed",
+    "self-starter",
+    "people-first",
+    "world-class",
+    "in-house",
+    "event-driven",
+    "well-being",
+    "know-how",
+    "unit-testing",
+}
+
+# Curated technical terms and acronyms to keep
+_TECH_TERMS = {
+    # Languages
+    "python", "java", "javascript", "typescript", "go", "golang", "ruby", "rust", "scala", "kotlin", "c", "c++", "c#",
+    # Web/Frameworks
+    "node", "nodejs", "express", "django", "flask", "fastapi", "spring", "springboot", "rails", "react", "vue", "angular", "nextjs", "nuxt", "svelte",
+    # Cloud/DevOps
+    "aws", "azure", "gcp", "kubernetes", "k8s", "docker", "terraform", "ansible", "helm", "serverless", "lambda", "ec2", "s3", "rds", "eks", "ecs", "cloudformation",
+    # Databases/Queues/Caches
+    "postgres", "postgresql", "mysql", "mariadb", "mongodb", "dynamodb", "redis", "elastic", "elasticsearch", "kafka", "rabbitmq", "sqs", "sns",
+    # Data/ML
+    "pandas", "numpy", "scikit-learn", "sklearn", "pytorch", "tensorflow", "keras", "spark", "hadoop", "airflow", "dbt", "snowflake", "databricks",
+    # Testing/Build/Tools
+    "pytest", "unittest", "junit", "maven", "gradle", "webpack", "vite", "babel", "eslint", "prettier", "git", "github", "gitlab", "jenkins", "circleci", "travisci",
+    # APIs/Protocols
+    "grpc", "graphql", "rest", "soap", "http", "https", "websocket", "oauth", "oidc",
+    # Concepts
+    "microservices", "monolith", "ci", "cd", "cicd", "oop", "tdd", "redux", "rxjs", "asyncio", "multithreading", "concurrency", "distributed",
+}
+
+
+# Other spellings the legacy token filter accepted outside _TECH_TERMS
+_ACRONYMS = {"api", "sql", "nosql", "ml", "ai", "nlp", "etl", "sre", "devops", "tls", "ssl", "jwt", "grpc", "rest", "http", "https", "tdd"}
+_SPECIAL_SPELLINGS = {"c++", "c#", ".net", "node.js", "next.js"}
+
+# Multi-word terms and alternate spellings -> canonical term. Spellings that were already
+# recognized on their own (node.js, nodejs, ...) keep their own output; these only add
+# terms the single-token filter could not see.
+_PHRASES = {
+    "machine learning": "machine learning",
+    "deep learning": "deep learning",
+    "computer vision": "computer vision",
+    "natural language processing": "nlp",
+    "large language models": "llm",
+    "spring boot": "springboot",
+    "ruby on rails": "rails",
+    "react native": "react native",
+    "github actions": "github actions",
+    "amazon web services": "aws",
+    "google cloud": "gcp",
+    "google cloud platform": "gcp",
+    "microsoft azure": "azure",
+    "node js": "nodejs",
+    "next js": "nextjs",
+    "react.js": "react",
+    "reactjs": "react",
+    "vue.js": "vue",
+    "vuejs": "vue",
+    "nuxt.js": "nuxt",
+    "express.js": "express",
+    "angularjs": "angular",
+}
+
+def _normalize_token(tok: str) -> str:
+    # Trim common trailing punctuation and quotes
+    t = tok.strip(".,;:!?()[]{}\"'`)“”’“”")
+    t = t.lower()
+    # Collapse common hyphenated variants to canonical tokens
+    hyphen_map = {
+        "back-end": "backend",
+        "front-end": "frontend",
+        "full-stack": "fullstack",
+    }
+    t = hyphen_map.get(t, t)
+    return t
+
+
+class KeywordExtractor:
+    """Precompiled tech-keyword extractor.
+
+    Single tokens are checked against a frozen vocabulary (the legacy allowlists minus stop
+    words), so the per-token rules of the old filter collapse into one set lookup. A multi-word
+    phrase is only searched for (with its own precompiled pattern) when every one of its words
+    occurs in the text, which the token set already tells us.
+    """
+
+    def __init__(self, terms: Iterable[str], stop_words: Iterable[str], phrases: Optional[Dict[str, str]] = None):
+        stop = frozenset(stop_words)
+        self.vocab = frozenset(t for t in terms if len(t) > 1 and t not in stop)
+        self._aliases: Dict[str, str] = {}
+        # (words that must all be present, compiled pattern, canonical term)
+        self._phrases: List[tuple] = []
+        self._phrase_words: Set[str] = set()
+        for surface, canonical in (phrases or {}).items():
+            toks = [_normalize_token(t) for t in _TOKEN_RE.findall(surface)]
+            if len(toks) == 1 and toks[0] not in self.vocab:
+                self._aliases[toks[0]] = canonical
+            elif len(toks) > 1:
+                # Words separated by whitespace only, ending on a token boundary. Matched against
+                # the lowercased text and starting with a literal, so the scan stays in C.
+                pattern = re.compile(r"\s+".join(re.escape(t) for t in toks) + r"(?![a-z0-9+#\-])")
+                self._phrases.append((frozenset(toks), pattern, canonical))
+                self._phrase_words.update(toks)
+        self.terms = frozenset(self.vocab | set(self._aliases.values()) | {p[2] for p in self._phrases})
+        # Integer IDs in sorted term order: decoding set bits in ID order yields sorted terms.
+        # ``version`` fingerprints the ordered vocabulary so stored bitsets from another
+        # vocabulary are detected and recomputed instead of being misread.
+        self.id_to_term: List[str] = sorted(self.terms)
+        self.term_to_id: Dict[str, int] = {t: i for i, t in enumerate(self.id_to_term)}
+        self.version = hashlib.sha256("\n".join(self.id_to_term).encode("utf-8")).hexdigest()[:16]
+        self._terms_arr = np.asarray(self.id_to_term, dtype=object)
+
+    def extract(self, text: str) -> Set[str]:
+        if not text:
+            return set()
+        # Normalize each distinct spelling once; job descriptions repeat words a lot
+        tokens = {_normalize_token(r) for r in set(_TOKEN_RE.findall(text))}
+        out = tokens & self.vocab
+        for t in tokens.intersection(self._aliases):
+            out.add(self._aliases[t])
+        if self._phrases and not tokens.isdisjoint(self._phrase_words):
+            lowered = text.lower()
+            for words, pattern, canonical in self._phrases:
+                if canonical not in out and words <= tokens and self._search(pattern, lowered):
+                    out.add(canonical)
+        return out
+
+    @property
+    def nbytes(self) -> int:
+        return (len(self.id_to_term) + 7) // 8
+
+    def pack(self, terms: Iterable[str]) -> bytes:
+        """Encode a term set as a little-endian bitset of ``nbytes`` bytes (unknown terms are dropped)."""
+        bits = np.zeros(self.nbytes * 8, dtype=np.uint8)
+        ids = [self.term_to_id[t] for t in terms if t in self.term_to_id]
+        bits[ids] = 1
+        return np.packbits(bits, bitorder="little").tobytes()
+
+    def extract_bits(self, text: str) -> bytes:
+        return self.pack(self.extract(text))
+
+    def extract_bits_many(self, texts: Iterable[str]) -> np.ndarray:
+        """One packed row per text, shape ``(len(texts), nbytes)``, for vectorized matching."""
+        rows = [np.frombuffer(self.extract_bits(t), dtype=np.uint8) for t in texts]
+        return np.vstack(rows) if rows else np.zeros((0, self.nbytes), dtype=np.uint8)
+
+    def unpack(self, bits: bytes, limit: Optional[int] = None) -> List[str]:
+        """Terms whose bits are set, in sorted order (optionally the first ``limit``)."""
+        arr = np.frombuffer(bytes(bits), dtype=np.uint8)
+        ids = np.flatnonzero(np.unpackbits(arr, bitorder="little")[: len(self.id_to_term)])
+        if limit is not None:
+            ids = ids[:limit]
+        return self._terms_arr[ids].tolist()
+
+    def match_bits(self, resume_bits: bytes, jd_bits: np.ndarray, limit: Optional[int] = 50):
+        """Matching (AND) and missing (AND-NOT) terms of one resume against one or many JDs.
+
+        ``jd_bits`` is a packed row or a ``(n, nbytes)`` matrix; returns one
+        ``(matching, missing)`` pair per row.
+        """
+        r = np.frombuffer(bytes(resume_bits), dtype=np.uint8)
+        j = np.atleast_2d(np.asarray(jd_bits, dtype=np.uint8))
+        n = len(self.id_to_term)
+        both = np.unpackbits(j & r, axis=1, bitorder="little")[:, :n]
+        gaps = np.unpackbits(j & ~r, axis=1, bitorder="little")[:, :n]
+        out = []
+        for b, g in zip(both, gaps):
+            m_ids = np.flatnonzero(b)
+            x_ids = np.flatnonzero(g)
+            if limit is not None:
+                m_ids, x_ids = m_ids[:limit], x_ids[:limit]
+            out.append((self._terms_arr[m_ids].tolist(), self._terms_arr[x_ids].tolist()))
+        return out
+
+    @staticmethod
+    def _search(pattern, lowered: str) -> bool:
+        for m in pattern.finditer(lowered):
+            start = m.start()
+            if start == 0 or not ("a" <= lowered[start - 1] <= "z" or "0" <= lowered[start - 1] <= "9"):
+                return True
+        return False
+
+
+_default: Optional[KeywordExtractor] = None
+_default_lock = threading.Lock()
+
+
+def default_extractor() -> KeywordExtractor:
+    """Extractor over the curated tables with sklearn's English stop words (built once, lazily)."""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                # sklearn is heavy to import; load its stop-word list on first use or during warm-up
+                from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+                _default = KeywordExtractor(
+                    _TECH_TERMS | _ACRONYMS | _SPECIAL_SPELLINGS,
+                    ENGLISH_STOP_WORDS.union(_EXTRA_STOP),
+                    _PHRASES,
+                )
+    return _default
+
+
+def extract_keywords(text: str) -> Set[str]:
+    return default_extractor().extract(text)
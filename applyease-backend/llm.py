@@ -0,0 +1,229 @@
+"""Local LLM providers: Ollama (``/api/chat``) and OpenAI-compatible servers (LM Studio, vLLM).
+
+``LLM_PROVIDER`` selects the protocol (``ollama`` default, ``lmstudio`` /
+``openai_compatible`` / ``vllm``, or ``off``). All calls share one ``httpx.AsyncClient``
+per process (keep-alive connections to the provider) and are awaited from ``async def``
+endpoints, so a long generation holds no threadpool worker. Connection failures and
+429/502/503/504 answers are retried with backoff before any output is produced.
+
+``stream`` yields the completion as the provider produces it; closing the generator (e.g.
+the client went away) closes the upstream request, which makes the server stop generating.
+"""
+import asyncio
+import json
+import os
+import threading
+from typing import AsyncIterator, NamedTuple, Optional
+
+import httpx
+
+
+class LLMError(RuntimeError):
+    """The provider is misconfigured, unreachable, or answered with an error."""
+
+
+class Provider(NamedTuple):
+    kind: str  # "ollama" | "openai"
+    label: str
+    url: str
+    model: str
+    headers: dict
+    timeout: float  # seconds per read (between stream chunks), not for the whole generation
+
+
+_OPENAI_COMPATIBLE = ("lmstudio", "openai_compatible", "vllm")
+
+
+DEFAULT_MODEL = "llama3.1:8b"
+
+
+def provider(default_model: Optional[str] = None) -> Optional[Provider]:
+    """Current provider settings; None when ``LLM_PROVIDER`` is off.
+
+    ``LLM_MODEL`` wins; otherwise Ollama uses ``default_model`` or ``DEFAULT_MODEL``, and
+    OpenAI-compatible servers use ``default_model`` or raise ``LLMError``.
+    """
+    name = os.getenv("LLM_PROVIDER", "ollama").lower()
+    model = os.getenv("LLM_MODEL")
+    if name in {"off", "none", "disabled"}:
+        return None
+    default_timeout = os.getenv("LLM_TIMEOUT_SECONDS", "50")
+    if name == "ollama":
+        host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+        timeout = float(os.getenv("LLM_TIMEOUT_OLLAMA", default_timeout))
+        return Provider("ollama", "Ollama", f"{host.rstrip('/')}/api/chat", model or default_model or DEFAULT_MODEL, {}, timeout)
+    if name in _OPENAI_COMPATIBLE:
+        model = model or default_model
+        if not model:
+            raise LLMError("Set LLM_MODEL to your local model name for LM Studio/vLLM")
+        base_url = os.getenv("LLM_BASE_URL", "http://localhost:1234/v1")
+        headers = {"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY', 'lm-studio')}"}
+        timeout = float(os.getenv("LLM_TIMEOUT_OPENAI", default_timeout))
+        return Provider("openai", "LM Studio", f"{base_url.rstrip('/')}/chat/completions", model, headers, timeout)
+    raise LLMError("Unsupported LLM_PROVIDER. Use 'ollama' (default) or 'lmstudio'.")
+
+
+def payload(p: Provider, prompt: str, options: Optional[dict], stream: bool) -> dict:
+    # options are Ollama model options; OpenAI-compatible servers keep their own defaults
+    body = {"model": p.model, "messages": [{"role": "user", "content": prompt}], "stream": stream}
+    if options and p.kind == "ollama":
+        body["options"] = options
+    return body
+
+
+def _stream_delta(p: Provider, line: str) -> Optional[str]:
+    """Text carried by one line of the provider's stream (NDJSON for Ollama, SSE otherwise)."""
+    line = line.strip()
+    if not line:
+        return None
+    if p.kind == "openai":
+        if not line.startswith("data:"):
+            return None
+        line = line[5:].strip()
+        if line == "[DONE]":
+            return None
+        data = json.loads(line)
+        if data.get("error"):
+            raise LLMError(f"{p.label} error: {data['error']}")
+        choices = data.get("choices") or [{}]
+        return (choices[0].get("delta") or {}).get("content")
+    data = json.loads(line)
+    if data.get("error"):
+        raise LLMError(f"{p.label} error: {data['error']}")
+    if isinstance(data.get("message"), dict):
+        return data["message"].get("content")
+    return data.get("response")
+
+
+def _completion_text(p: Provider, data) -> str:
+    if not isinstance(data, dict):
+        return ""
+    if p.kind == "openai":
+        try:
+            return data["choices"][0]["message"]["content"] or ""
+        except (KeyError, IndexError, TypeError):
+            return ""
+    if isinstance(data.get("message"), dict):
+        return data["message"].get("content") or ""
+    return data.get("response") or ""
+
+
+# ===== Shared client =====
+RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+_RETRY_STATUS = {429, 502, 503, 504}
+# Errors raised before the provider accepted the request: safe to send again
+_RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, httpx.RemoteProtocolError)
+
+_client: Optional[httpx.AsyncClient] = None
+_counters = {"requests": 0, "streams": 0, "retries": 0, "errors": 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name: str, n: int = 1):
+    with _counters_lock:
+        _counters[name] += n
+
+
+def client() -> httpx.AsyncClient:
+    """The process-wide async client (created on first use, closed by ``aclose``)."""
+    global _client
+    if _client is None:
+        max_conns = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(float(os.getenv("LLM_TIMEOUT_SECONDS", "50")), connect=float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))),
+            limits=httpx.Limits(max_connections=max_conns, max_keepalive_connections=max_conns),
+        )
+    return _client
+
+
+async def aclose():
+    global _client
+    c, _client = _client, None
+    if c is not None:
+        await c.aclose()
+
+
+def stats() -> dict:
+    with _counters_lock:
+        return dict(_counters)
+
+
+def _backoff(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), 5.0)
+    return 0.25 * (2 ** attempt)
+
+
+async def _open(p: Provider, body: dict, stream: bool) -> httpx.Response:
+    """Send the request (retrying transient failures) and return a response with status 200."""
+    c = client()
+    timeout = httpx.Timeout(p.timeout, connect=c.timeout.connect)
+    for attempt in range(RETRIES + 1):
+        r = None
+        try:
+            req = c.build_request("POST", p.url, json=body, headers=p.headers, timeout=timeout)
+            r = await c.send(req, stream=stream)
+        except _RETRY_ERRORS as e:
+            if attempt >= RETRIES:
+                raise LLMError(f"LLM error: {e}") from e
+        except httpx.HTTPError as e:
+            raise LLMError(f"LLM error: {e}") from e
+        if r is not None:
+            if r.status_code == 200:
+                return r
+            text = (await r.aread()).decode("utf-8", "replace")
+            await r.aclose()
+            if r.status_code not in _RETRY_STATUS or attempt >= RETRIES:
+                raise LLMError(f"{p.label} error: {text[:500]}")
+        _count("retries")
+        await asyncio.sleep(_backoff(attempt, r))
+    raise LLMError("LLM error: retries exhausted")  # not reached
+
+
+async def complete(prompt: str, options: Optional[dict] = None, p: Optional[Provider] = None) -> str:
+    """The whole completion text ("" when the provider is off); raises ``LLMError``."""
+    p = p or provider()
+    if p is None:
+        return ""
+    _count("requests")
+    try:
+        r = await _open(p, payload(p, prompt, options, False), stream=False)
+        try:
+            return _completion_text(p, r.json())
+        except ValueError as e:
+            raise LLMError(f"{p.label} sent an unreadable response: {e}") from e
+    except LLMError:
+        _count("errors")
+        raise
+
+
+async def stream(prompt: str, options: Optional[dict] = None, p: Optional[Provider] = None) -> AsyncIterator[str]:
+    """Yield completion text chunks as they arrive (nothing when the provider is off)."""
+    p = p or provider()
+    if p is None:
+        return
+    _count("streams")
+    try:
+        r = await _open(p, payload(p, prompt, options, True), stream=True)
+        try:
+            async for line in r.aiter_lines():
+                text = _stream_delta(p, line)
+                if text:
+                    yield text
+        finally:
+            await r.aclose()
+    except httpx.HTTPError as e:
+        _count("errors")
+        raise LLMError(f"LLM error: {e}") from e
+    except ValueError as e:
+        _count("errors")
+        raise LLMError(f"{p.label} sent an unreadable stream: {e}") from e
+    except LLMError:
+        _count("errors")
+        raise
+
+
+def sse(event: str, data) -> bytes:
+    """One Server-Sent Events frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
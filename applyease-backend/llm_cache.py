@@ -0,0 +1,267 @@
+"""Completion cache for the local LLM: bounded in-process LRU in front of a Postgres table.
+
+Keys are ``sha256(provider, model, sorted options JSON, prompt)``, so regenerating a tailored
+resume or custom answer for the same inputs returns the stored text instead of paying for
+another generation. Entries expire after ``LLM_CACHE_TTL_SECONDS``; the table is pruned to
+``LLM_CACHE_MAX_ROWS`` (oldest first) every ``PRUNE_EVERY`` stores. As with the embedding
+cache, the persistent tier is best-effort: database errors degrade to a miss.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+try:
+    from . import llm, llm_scheduler
+except Exception:
+    import llm
+    import llm_scheduler
+
+
+# Stores between two prunes of the persistent table
+PRUNE_EVERY = 100
+
+
+class CompletionCache:
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_rows: int = 20000,
+        get_conn: Optional[Callable] = None,
+        put_conn: Optional[Callable] = None,
+    ):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_rows = max(1, int(max_rows))
+        self._get_conn = get_conn
+        self._put_conn = put_conn
+        self._lru: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # key -> (text, stored at)
+        self._lock = threading.Lock()
+        self._stores_since_prune = 0
+        self._counters = {
+            "memory_hits": 0, "persistent_hits": 0, "misses": 0, "bypassed": 0,
+            "stores": 0, "evictions": 0, "expired": 0, "pruned": 0, "persistent_errors": 0,
+        }
+
+    @staticmethod
+    def key(p: "llm.Provider", options: Optional[dict], prompt: str) -> str:
+        opts = json.dumps(options or {}, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(f"{p.kind}\n{p.model}\n{opts}\n{prompt}".encode("utf-8")).hexdigest()
+
+    @property
+    def persistent(self) -> bool:
+        return self._get_conn is not None and self._put_conn is not None
+
+    def peek(self, key: str) -> Optional[str]:
+        """In-process lookup only; never touches the database."""
+        with self._lock:
+            hit = self._lru.get(key)
+            if hit is None:
+                return None
+            text, stored_at = hit
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._lru[key]
+                self._counters["expired"] += 1
+                return None
+            self._lru.move_to_end(key)
+            self._counters["memory_hits"] += 1
+            return text
+
+    def get(self, key: str) -> Optional[str]:
+        text = self.peek(key)
+        if text is not None:
+            return text
+        if self.persistent:
+            row = self._load(key)
+            if row is not None:
+                with self._lock:
+                    self._counters["persistent_hits"] += 1
+                self._remember(key, *row)
+                return row[0]
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def put(self, key: str, p: "llm.Provider", text: str):
+        if not text:
+            return  # failed or empty generations are not worth keeping
+        self._remember(key, text, time.time())
+        with self._lock:
+            self._counters["stores"] += 1
+            self._stores_since_prune += 1
+            prune = self._stores_since_prune >= PRUNE_EVERY
+            if prune:
+                self._stores_since_prune = 0
+        if self.persistent:
+            self._store(key, p, text)
+            if prune:
+                self.prune()
+
+    def note_bypass(self):
+        with self._lock:
+            self._counters["bypassed"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._counters)
+            out["size"] = len(self._lru)
+        out["max_entries"] = self.max_entries
+        out["ttl_seconds"] = self.ttl_seconds
+        out["persistent"] = self.persistent
+        lookups = out["memory_hits"] + out["persistent_hits"] + out["misses"]
+        out["hit_rate"] = round((out["memory_hits"] + out["persistent_hits"]) / lookups, 4) if lookups else 0.0
+        return out
+
+    def _remember(self, key: str, text: str, stored_at: float):
+        with self._lock:
+            self._lru[key] = (text, stored_at)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def _run(self, fn, default=None):
+        conn = None
+        try:
+            conn = self._get_conn()
+            with conn.cursor() as cur:
+                return fn(cur)
+        except Exception:
+            with self._lock:
+                self._counters["persistent_errors"] += 1
+            return default
+        finally:
+            if conn is not None:
+                self._put_conn(conn)
+
+    def _load(self, key: str) -> Optional[Tuple[str, float]]:
+        def load(cur):
+            cur.execute(
+                """
+                SELECT completion, extract(epoch FROM created_at)::float8 FROM llm_cache
+                WHERE key = %s AND created_at > now() - make_interval(secs => %s)
+                """,
+                (key, self.ttl_seconds),
+            )
+            row = cur.fetchone()
+            return (row[0], float(row[1])) if row else None
+
+        return self._run(load)
+
+    def _store(self, key: str, p: "llm.Provider", text: str):
+        def store(cur):
+            # A bypassed request regenerates the entry, so the newer text wins
+            cur.execute(
+                """
+                INSERT INTO llm_cache (key, provider, model, completion) VALUES (%s, %s, %s, %s)
+                ON CONFLICT (key) DO UPDATE SET completion = EXCLUDED.completion, created_at = now()
+                """,
+                (key, p.kind, p.model, text),
+            )
+
+        self._run(store)
+
+    def prune(self) -> int:
+        """Delete expired rows and the oldest rows beyond ``max_rows``; returns rows removed."""
+        def prune(cur):
+            cur.execute("DELETE FROM llm_cache WHERE created_at <= now() - make_interval(secs => %s)", (self.ttl_seconds,))
+            n = cur.rowcount
+            cur.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY created_at DESC OFFSET %s)",
+                (self.max_rows,),
+            )
+            return n + cur.rowcount
+
+        n = self._run(prune, 0) if self.persistent else 0
+        with self._lock:
+            self._counters["pruned"] += n
+        return n
+
+
+_cache: Optional[CompletionCache] = None
+
+
+def configure(get_conn: Optional[Callable] = None, put_conn: Optional[Callable] = None) -> Optional[CompletionCache]:
+    # Persistent tier is used when connection callables are given and LLM_CACHE_PERSIST isn't off
+    global _cache
+    if os.getenv("LLM_CACHE", "1").lower() in {"0", "false", "off"}:
+        _cache = None
+        return None
+    if os.getenv("LLM_CACHE_PERSIST", "1").lower() in {"0", "false", "off"}:
+        get_conn = put_conn = None
+    _cache = CompletionCache(
+        max_entries=int(os.getenv("LLM_CACHE_SIZE", "512")),
+        ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        max_rows=int(os.getenv("LLM_CACHE_MAX_ROWS", "20000")),
+        get_conn=get_conn,
+        put_conn=put_conn,
+    )
+    return _cache
+
+
+def cache() -> Optional[CompletionCache]:
+    return _cache
+
+
+def stats() -> Optional[dict]:
+    return _cache.stats() if _cache is not None else None
+
+
+async def lookup(p: Optional["llm.Provider"], options: Optional[dict], prompt: str, bypass: bool = False) -> Tuple[Optional[str], Optional[str]]:
+    """(cached text or None, key to ``store`` the fresh completion under, None when not caching)."""
+    c = _cache
+    if c is None or p is None:
+        return None, None
+    key = c.key(p, options, prompt)
+    if bypass:
+        c.note_bypass()
+        return None, key
+    text = c.peek(key)
+    if text is None and c.persistent:
+        text = await run_in_threadpool(c.get, key)
+    elif text is None:
+        text = c.get(key)
+    return text, key
+
+
+async def store(key: Optional[str], p: Optional["llm.Provider"], text: str):
+    c = _cache
+    if c is None or key is None or p is None or not text:
+        return
+    if c.persistent:
+        await run_in_threadpool(c.put, key, p, text)
+    else:
+        c.put(key, p, text)
+
+
+async def complete(
+    prompt: str,
+    options: Optional[dict] = None,
+    p: Optional["llm.Provider"] = None,
+    bypass: bool = False,
+    priority: int = llm_scheduler.STANDARD,
+) -> Tuple[str, bool]:
+    """``llm.complete`` through the cache and the scheduler; returns (text, served from cache).
+
+    Misses for the same fingerprint that overlap share one generation.
+    """
+    p = p or llm.provider()
+    if p is None:
+        return "", False
+    text, key = await lookup(p, options, prompt, bypass)
+    if text is not None:
+        return text, True
+
+    async def generate() -> str:
+        out = await llm.complete(prompt, options, p=p)
+        await store(key, p, out)
+        return out
+
+    shared_key = key or CompletionCache.key(p, options, prompt)
+    return await llm_scheduler.scheduler().run(shared_key, priority, generate), False
@@ -0,0 +1,205 @@
+"""Admission control for the local LLM.
+
+A local Ollama/LM Studio server generates a few requests at a time; anything beyond that
+only queues inside the server until it times out. Every generation goes through one
+``LLMScheduler`` per process:
+
+- at most ``LLM_MAX_CONCURRENCY`` generations run at once;
+- up to ``LLM_MAX_QUEUE`` more wait for a slot, lowest priority class first
+  (``INTERACTIVE`` custom answers, then ``STANDARD`` tailoring, then ``BATCH`` cover
+  letters); beyond that ``QueueFullError`` is raised (the app answers 429 + Retry-After);
+- completions with the same key (the ``llm_cache`` fingerprint) that are already in flight
+  share one upstream request. Streams get admission control only.
+
+All state lives on the event loop, so no locks are needed.
+"""
+import asyncio
+import contextlib
+import heapq
+import itertools
+import math
+import os
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+INTERACTIVE, STANDARD, BATCH = 0, 1, 2
+PRIORITY_NAMES = ("interactive", "standard", "batch")
+
+
+class QueueFullError(RuntimeError):
+    """Every slot is busy and the wait queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("LLM queue is full")
+        self.retry_after = retry_after
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency: int = 2, max_queue: int = 32):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_queue = max(0, int(max_queue))
+        self._active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []  # heap of (priority, arrival, future)
+        self._seq = itertools.count()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Moving average of how long a generation holds its slot; drives Retry-After
+        self._hold_s = 5.0
+        self._counters = {"admitted": 0, "queued": 0, "rejected": 0, "deduplicated": 0}
+        self._waits = {name: [0, 0.0, 0.0] for name in PRIORITY_NAMES}  # admitted, total ms, max ms
+
+    def retry_after(self) -> int:
+        backlog = (len(self._waiters) + 1) / self.max_concurrency
+        return int(min(60, max(1, math.ceil(self._hold_s * backlog))))
+
+    def _admit(self, priority: int) -> Optional[asyncio.Future]:
+        """None when a slot is free now, else a future that resolves once one is handed over."""
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            return None
+        if len(self._waiters) >= self.max_queue:
+            self._counters["rejected"] += 1
+            raise QueueFullError(self.retry_after())
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        self._counters["queued"] += 1
+        return fut
+
+    async def _acquire(self, priority: int, fut: Optional[asyncio.Future]) -> float:
+        t0 = time.perf_counter()
+        if fut is not None:
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    self._release(None)  # the slot was handed over just as the caller gave up
+                else:
+                    self._waiters = [w for w in self._waiters if w[2] is not fut]
+                    heapq.heapify(self._waiters)
+                raise
+        started = time.perf_counter()
+        wait_ms = (started - t0) * 1000.0
+        w = self._waits[PRIORITY_NAMES[priority]]
+        w[0] += 1
+        w[1] += wait_ms
+        w[2] = max(w[2], wait_ms)
+        self._counters["admitted"] += 1
+        return started
+
+    def _release(self, held_s: Optional[float]):
+        if held_s is not None:
+            self._hold_s = 0.8 * self._hold_s + 0.2 * held_s
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)  # hand the slot straight to the next waiter
+                return
+        self._active -= 1
+
+    def _abandon(self, fut: Optional[asyncio.Future]):
+        """Give back an admission whose holder never ran: a slot, or a place in the queue."""
+        if fut is None or (fut.done() and not fut.cancelled()):
+            self._release(None)
+        else:
+            fut.cancel()
+            self._waiters = [w for w in self._waiters if w[2] is not fut]
+            heapq.heapify(self._waiters)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: int = STANDARD):
+        """Hold one generation slot for the body of the ``async with``."""
+        started = await self._acquire(priority, self._admit(priority))
+        try:
+            yield
+        finally:
+            self._release(time.perf_counter() - started)
+
+    async def run(self, key: Optional[str], priority: int, fn: Callable[[], Awaitable]):
+        """``await fn()`` in a slot; callers with the same ``key`` share the in-flight result.
+
+        The work runs as its own task, so one caller disconnecting doesn't cancel it for the
+        others. When the last caller leaves, queued work is dropped; work already generating
+        is kept only if it has a key (its result still lands in the cache).
+        """
+        if key is not None and key in self._inflight:
+            self._counters["deduplicated"] += 1
+            return await self._wait(self._inflight[key])
+        fut = self._admit(priority)  # QueueFullError before anything is shared
+
+        async def job():
+            task.entered = True  # from here on _acquire / the finally below own the admission
+            started = await self._acquire(priority, fut)
+            task.started = True
+            try:
+                return await fn()
+            finally:
+                self._release(time.perf_counter() - started)
+
+        task = asyncio.ensure_future(job())
+        task.entered, task.started, task.waiters, task.keyed = False, False, 0, key is not None
+
+        def done(t: asyncio.Future):
+            if key is not None and self._inflight.get(key) is t:
+                del self._inflight[key]
+            if not t.entered:
+                self._abandon(fut)  # cancelled before its first step: no finally ever ran
+            if not t.cancelled():
+                t.exception()  # retrieved here so abandoned failures aren't logged as unhandled
+
+        if key is not None:
+            self._inflight[key] = task
+        task.add_done_callback(done)
+        return await self._wait(task)
+
+    @staticmethod
+    async def _wait(task: asyncio.Future):
+        task.waiters += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if task.waiters == 1 and not (task.started and task.keyed):
+                task.cancel()
+            raise
+        finally:
+            task.waiters -= 1
+
+    async def stream(self, priority: int, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+        """Relay ``chunks`` while holding a slot (admission control only, no sharing)."""
+        async with self.slot(priority):
+            try:
+                async for chunk in chunks:
+                    yield chunk
+            finally:
+                await chunks.aclose()
+
+    def stats(self) -> dict:
+        out = dict(self._counters)
+        out.update(
+            active=self._active,
+            waiting=len(self._waiters),
+            inflight_keys=len(self._inflight),
+            max_concurrency=self.max_concurrency,
+            max_queue=self.max_queue,
+            avg_hold_ms=round(self._hold_s * 1000.0, 1),
+        )
+        out["wait_ms"] = {
+            name: {"admitted": n, "avg": round(total / n, 1) if n else 0.0, "max": round(peak, 1)}
+            for name, (n, total, peak) in self._waits.items()
+        }
+        return out
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def scheduler() -> LLMScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler(
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "2")),
+            max_queue=int(os.getenv("LLM_MAX_QUEUE", "32")),
+        )
+    return _scheduler
+
+
+def stats() -> dict:
+    return scheduler().stats()
@@ -0,0 +1,497 @@
+"""Versioned schema migrations.
+
+Each step runs once, in order, inside its own transaction and is recorded in
+``schema_migrations``. The runner holds a Postgres advisory lock, so several workers
+starting together apply each step exactly once. Run it at deploy time::
+
+    python migrations.py            # apply pending steps
+    python migrations.py status     # list applied / pending steps
+
+or let the app run it on startup (``MIGRATE_ON_STARTUP``, default on). Steps use
+``IF NOT EXISTS`` so databases created by the old per-request DDL adopt the history cleanly.
+"""
+import logging
+import sys
+from typing import Callable, List, Optional, Tuple
+
+try:
+    from . import db
+    from .embeddings import DIM
+except Exception:
+    import db
+    from embeddings import DIM
+
+
+logger = logging.getLogger("uvicorn.error")
+
+# Arbitrary constant shared by every process running migrations against this database
+_LOCK_KEY = 0x4150504C59  # "APPLY"
+
+
+def _optional(cur, sql: str):
+    """Run ``sql`` but keep the migration going if this Postgres/pgvector lacks the feature."""
+    cur.execute("SAVEPOINT optional_step")
+    try:
+        cur.execute(sql)
+    except Exception as e:
+        cur.execute("ROLLBACK TO SAVEPOINT optional_step")
+        logger.warning("optional migration statement skipped: %s", e)
+    cur.execute("RELEASE SAVEPOINT optional_step")
+
+
+def _0001_baseline(cur):
+    cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS resumes (
+            user_id text PRIMARY KEY,
+            resume_text text NOT NULL,
+            embedding vector({DIM}) NOT NULL,
+            resume_keywords text[] NOT NULL,
+            updated_at timestamptz NOT NULL DEFAULT now()
+        );
+        """
+    )
+    # Original resume file
+    cur.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS resume_blob bytea;")
+    cur.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS resume_mime text;")
+    cur.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS resume_filename text;")
+    # Users table for migrated Node backend
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id text PRIMARY KEY,
+            first_name text NOT NULL,
+            last_name text NOT NULL,
+            email text UNIQUE NOT NULL,
+            password_hash text NOT NULL,
+            phone text,
+            location text,
+            urls jsonb DEFAULT '[]'::jsonb,
+            eeo jsonb DEFAULT '[]'::jsonb,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            updated_at timestamptz NOT NULL DEFAULT now()
+        );
+        """
+    )
+    # ANN index for later nearest-neighbor queries; older pgvector may lack vector_cosine_ops
+    _optional(
+        cur,
+        "CREATE INDEX IF NOT EXISTS resumes_embedding_idx ON resumes USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);",
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tailored_resumes (
+            id text PRIMARY KEY,
+            user_id text NOT NULL,
+            job_description text NOT NULL,
+            resume_text text NOT NULL,
+            resume_blob bytea,
+            resume_mime text,
+            resume_filename text,
+            created_at timestamptz NOT NULL DEFAULT now()
+        );
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS job_applications (
+            id text PRIMARY KEY,
+            user_id text NOT NULL,
+            company text NOT NULL,
+            title text NOT NULL,
+            location text,
+            source text,
+            url text,
+            status text NOT NULL DEFAULT 'saved', -- saved|applied|interview|offer|rejected
+            notes text,
+            jd_text text,
+            next_action_date date,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            updated_at timestamptz NOT NULL DEFAULT now()
+        );
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS job_applications_user_idx ON job_applications (user_id, updated_at DESC);")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS cover_letters (
+            id text PRIMARY KEY,
+            user_id text NOT NULL,
+            job_id text,
+            company text,
+            title text,
+            letter_text text NOT NULL,
+            letter_blob bytea,
+            letter_mime text,
+            filename text,
+            created_at timestamptz NOT NULL DEFAULT now()
+        );
+        """
+    )
+
+
+def _0002_embedding_storage(cur):
+    # Per-chunk resume vectors for long documents (RESUME_CHUNKING=1)
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS resume_chunks (
+            user_id text NOT NULL,
+            chunk_idx int NOT NULL,
+            chunk_text text NOT NULL,
+            embedding vector({DIM}) NOT NULL,
+            PRIMARY KEY (user_id, chunk_idx)
+        );
+        """
+    )
+    # Persistent tier of the embedding cache (key = sha256 of model + normalized text)
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            key text PRIMARY KEY,
+            model text NOT NULL,
+            embedding bytea NOT NULL,
+            created_at timestamptz NOT NULL DEFAULT now()
+        );
+        """
+    )
+
+
+def _0003_resume_keyword_bits(cur):
+    # Packed keyword bitset (IDs from keyword_extractor) and the vocabulary it was built with
+    cur.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS resume_keyword_bits bytea;")
+    cur.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS keyword_vocab text;")
+
+
+def _0004_job_embeddings(cur):
+    # JD embedding for /jobs/ranked, written whenever jd_text is set (NULL until then)
+    cur.execute(f"ALTER TABLE job_applications ADD COLUMN IF NOT EXISTS jd_embedding vector({DIM});")
+    # Ranking is exact within one user's jobs: this index narrows the scan to their scored
+    # rows, then pgvector computes <=> only for those
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS job_applications_scored_idx ON job_applications (user_id) WHERE jd_embedding IS NOT NULL;"
+    )
+
+
+def _0005_history_indexes(cur):
+    # Per-user history listings (ORDER BY created_at DESC) were full scans
+    cur.execute("CREATE INDEX IF NOT EXISTS tailored_resumes_user_created_idx ON tailored_resumes (user_id, created_at DESC);")
+    cur.execute("CREATE INDEX IF NOT EXISTS cover_letters_user_created_idx ON cover_letters (user_id, created_at DESC);")
+
+
+def _0006_blob_store(cur):
+    # Content-addressed blobs (blob_store.py); the blobs row is written after its chunks
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS blobs (
+            sha256 text PRIMARY KEY,
+            size bigint NOT NULL,
+            chunk_size int NOT NULL,
+            created_at timestamptz NOT NULL DEFAULT now()
+        );
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS blob_chunks (
+            sha256 text NOT NULL,
+            idx int NOT NULL,
+            data bytea NOT NULL,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            PRIMARY KEY (sha256, idx)
+        );
+        """
+    )
+    # Chunks are already compressed (PDF) or small; skip TOAST compression attempts
+    cur.execute("ALTER TABLE blob_chunks ALTER COLUMN data SET STORAGE EXTERNAL;")
+    # Legacy bytea columns stay readable until `python blob_store.py migrate` empties them
+    cur.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS resume_blob_sha text;")
+    cur.execute("ALTER TABLE tailored_resumes ADD COLUMN IF NOT EXISTS resume_blob_sha text;")
+    cur.execute("ALTER TABLE cover_letters ADD COLUMN IF NOT EXISTS letter_blob_sha text;")
+
+
+def _0007_jobs_keyset_index(cur):
+    # /jobs pages by (updated_at, id) DESC within a user; carrying the list columns lets the
+    # default projection (no notes/jd_text) be served by an index-only scan
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS job_applications_user_keyset_idx
+        ON job_applications (user_id, updated_at DESC, id DESC)
+        INCLUDE (status, company, title, location, source, url, next_action_date, created_at);
+        """
+    )
+    # Same leading columns; the new index serves everything this one did
+    cur.execute("DROP INDEX IF EXISTS job_applications_user_idx;")
+
+
+def _0008_job_rollups(cur):
+    # Per-user counts by current status, and by week added (created_at) x status, kept in step
+    # with job_applications by a trigger so dashboards never aggregate the jobs themselves
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS job_status_counts (
+            user_id text NOT NULL,
+            status text NOT NULL,
+            n bigint NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, status)
+        );
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS job_weekly_counts (
+            user_id text NOT NULL,
+            week date NOT NULL,
+            status text NOT NULL,
+            n bigint NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, week, status)
+        );
+        """
+    )
+    cur.execute(
+        """
+        CREATE OR REPLACE FUNCTION job_rollup_apply(uid text, st text, created timestamptz, delta int)
+        RETURNS void LANGUAGE sql AS $$
+            INSERT INTO job_status_counts AS c (user_id, status, n) VALUES (uid, st, delta)
+            ON CONFLICT (user_id, status) DO UPDATE SET n = c.n + EXCLUDED.n;
+            INSERT INTO job_weekly_counts AS c (user_id, week, status, n)
+            VALUES (uid, date_trunc('week', created AT TIME ZONE 'UTC')::date, st, delta)
+            ON CONFLICT (user_id, week, status) DO UPDATE SET n = c.n + EXCLUDED.n;
+        $$;
+        """
+    )
+    cur.execute(
+        """
+        CREATE OR REPLACE FUNCTION job_rollup_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM job_rollup_apply(OLD.user_id, OLD.status, OLD.created_at, -1);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM job_rollup_apply(NEW.user_id, NEW.status, NEW.created_at, 1);
+            END IF;
+            RETURN NULL;
+        END;
+        $$;
+        """
+    )
+    # Backfill and attach the trigger atomically: writers wait on the lock, so no row is
+    # counted twice or missed
+    cur.execute("LOCK TABLE job_applications IN SHARE ROW EXCLUSIVE MODE;")
+    cur.execute("DROP TRIGGER IF EXISTS job_applications_rollup ON job_applications;")
+    cur.execute(
+        """
+        CREATE TRIGGER job_applications_rollup
+        AFTER INSERT OR DELETE OR UPDATE OF user_id, status, created_at ON job_applications
+        FOR EACH ROW EXECUTE FUNCTION job_rollup_trigger();
+        """
+    )
+    cur.execute("DELETE FROM job_status_counts; DELETE FROM job_weekly_counts;")
+    cur.execute(
+        """
+        INSERT INTO job_status_counts (user_id, status, n)
+        SELECT user_id, status, count(*) FROM job_applications GROUP BY 1, 2;
+        INSERT INTO job_weekly_counts (user_id, week, status, n)
+        SELECT user_id, date_trunc('week', created_at AT TIME ZONE 'UTC')::date, status, count(*)
+        FROM job_applications GROUP BY 1, 2, 3;
+        """
+    )
+
+
+def _0009_job_rollups_per_statement(cur):
+    # The row trigger from 0008 upserted both rollups once per row, which dominated bulk
+    # COPY imports. Statement triggers see all changed rows (transition tables) and apply
+    # one grouped delta per (user, status[, week]); updates that don't move a job between
+    # buckets net to zero and write nothing.
+    cur.execute(
+        """
+        CREATE OR REPLACE FUNCTION job_rollup_apply_set(uids text[], sts text[], created timestamptz[], deltas int[])
+        RETURNS void LANGUAGE sql AS $$
+            INSERT INTO job_status_counts AS c (user_id, status, n)
+            SELECT u, s, sum(d) FROM unnest(uids, sts, deltas) AS t(u, s, d)
+            GROUP BY 1, 2 HAVING sum(d) <> 0 ORDER BY 1, 2
+            ON CONFLICT (user_id, status) DO UPDATE SET n = c.n + EXCLUDED.n;
+            INSERT INTO job_weekly_counts AS c (user_id, week, status, n)
+            SELECT u, date_trunc('week', ca AT TIME ZONE 'UTC')::date, s, sum(d)
+            FROM unnest(uids, sts, created, deltas) AS t(u, s, ca, d)
+            GROUP BY 1, 2, 3 HAVING sum(d) <> 0 ORDER BY 1, 2, 3
+            ON CONFLICT (user_id, week, status) DO UPDATE SET n = c.n + EXCLUDED.n;
+        $$;
+        """
+    )
+    cur.execute(
+        """
+        CREATE OR REPLACE FUNCTION job_rollup_stmt_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                PERFORM job_rollup_apply_set(array_agg(user_id), array_agg(status), array_agg(created_at), array_agg(1))
+                FROM new_rows;
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM job_rollup_apply_set(array_agg(user_id), array_agg(status), array_agg(created_at), array_agg(-1))
+                FROM old_rows;
+            ELSE
+                PERFORM job_rollup_apply_set(array_agg(user_id), array_agg(status), array_agg(created_at), array_agg(d))
+                FROM (
+                    SELECT user_id, status, created_at, -1 AS d FROM old_rows
+                    UNION ALL
+                    SELECT user_id, status, created_at, 1 FROM new_rows
+                ) t;
+            END IF;
+            RETURN NULL;
+        END;
+        $$;
+        """
+    )
+    # Transition tables allow one event per trigger
+    cur.execute("DROP TRIGGER IF EXISTS job_applications_rollup ON job_applications;")
+    for event, tables in (
+        ("INSERT", "NEW TABLE AS new_rows"),
+        ("UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+        ("DELETE", "OLD TABLE AS old_rows"),
+    ):
+        cur.execute(f"DROP TRIGGER IF EXISTS job_applications_rollup_{event.lower()} ON job_applications;")
+        cur.execute(
+            f"""
+            CREATE TRIGGER job_applications_rollup_{event.lower()}
+            AFTER {event} ON job_applications REFERENCING {tables}
+            FOR EACH STATEMENT EXECUTE FUNCTION job_rollup_stmt_trigger();
+            """
+        )
+    cur.execute("DROP FUNCTION IF EXISTS job_rollup_trigger();")
+    cur.execute("DROP FUNCTION IF EXISTS job_rollup_apply(text, text, timestamptz, int);")
+
+
+def _0010_job_search(cur):
+    # Full-text search for /jobs/search: company/title weigh most, then notes, then the JD
+    cur.execute(
+        """
+        ALTER TABLE job_applications ADD COLUMN IF NOT EXISTS search_tsv tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(company, '') || ' ' || coalesce(title, '')), 'A')
+            || setweight(to_tsvector('english', coalesce(notes, '')), 'C')
+            || setweight(to_tsvector('english', coalesce(jd_text, '')), 'D')
+        ) STORED;
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS job_applications_search_idx ON job_applications USING gin (search_tsv);")
+    # Typo-tolerant company/title matching; without pg_trgm the endpoint falls back to ILIKE
+    _optional(cur, "CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    _optional(
+        cur,
+        "CREATE INDEX IF NOT EXISTS job_applications_trgm_idx ON job_applications USING gin ((company || ' ' || title) gin_trgm_ops);",
+    )
+
+
+def _0011_llm_cache(cur):
+    # Completions keyed by sha256(provider, model, options, prompt); see llm_cache.py
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key text PRIMARY KEY,
+            provider text NOT NULL,
+            model text NOT NULL,
+            completion text NOT NULL,
+            created_at timestamptz NOT NULL DEFAULT now()
+        );
+        """
+    )
+    # TTL and size pruning delete oldest-first
+    cur.execute("CREATE INDEX IF NOT EXISTS llm_cache_created_idx ON llm_cache (created_at);")
+
+
+def _0012_resume_sections(cur):
+    # Profile sections /cover_letters/generate reads (it queried them before they existed); NULL is fine
+    cur.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS summary text;")
+    cur.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS experiences jsonb;")
+    cur.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS skills text[];")
+
+
+def _0013_blob_put_at(cur):
+    # Last time blob_store.put stored or re-used a blob; gc spares blobs put within its grace period
+    cur.execute("ALTER TABLE blobs ADD COLUMN IF NOT EXISTS put_at timestamptz NOT NULL DEFAULT now();")
+
+
+# Append-only: never edit or reorder a step that has shipped; add a new one instead
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "baseline", _0001_baseline),
+    (2, "embedding_storage", _0002_embedding_storage),
+    (3, "resume_keyword_bits", _0003_resume_keyword_bits),
+    (4, "job_embeddings", _0004_job_embeddings),
+    (5, "history_indexes", _0005_history_indexes),
+    (6, "blob_store", _0006_blob_store),
+    (7, "jobs_keyset_index", _0007_jobs_keyset_index),
+    (8, "job_rollups", _0008_job_rollups),
+    (9, "job_rollups_per_statement", _0009_job_rollups_per_statement),
+    (10, "job_search", _0010_job_search),
+    (11, "llm_cache", _0011_llm_cache),
+    (12, "resume_sections", _0012_resume_sections),
+    (13, "blob_put_at", _0013_blob_put_at),
+]
+
+
+def _applied(cur) -> dict:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version int PRIMARY KEY,
+            name text NOT NULL,
+            applied_at timestamptz NOT NULL DEFAULT now()
+        );
+        """
+    )
+    cur.execute("SELECT version, applied_at FROM schema_migrations")
+    return {int(v): at for v, at in cur.fetchall() or []}
+
+
+def migrate(target: Optional[int] = None) -> List[int]:
+    """Apply pending steps up to ``target`` (default: all); return the versions applied."""
+    conn = db.getconn(timeout=60)
+    done: List[int] = []
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s)", (_LOCK_KEY,))
+            try:
+                applied = _applied(cur)
+                conn.autocommit = False
+                for version, name, step in MIGRATIONS:
+                    if version in applied or (target is not None and version > target):
+                        continue
+                    try:
+                        step(cur)
+                        cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        logger.exception("migration %04d_%s failed", version, name)
+                        raise
+                    logger.info("applied migration %04d_%s", version, name)
+                    done.append(version)
+            finally:
+                conn.autocommit = True
+                cur.execute("SELECT pg_advisory_unlock(%s)", (_LOCK_KEY,))
+    finally:
+        db.putconn(conn)
+    return done
+
+
+def status() -> List[Tuple[int, str, Optional[str]]]:
+    conn = db.getconn()
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            applied = _applied(cur)
+    finally:
+        db.putconn(conn)
+    return [(v, name, str(applied[v]) if v in applied else None) for v, name, _ in MIGRATIONS]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if sys.argv[1:] == ["status"]:
+        for version, name, applied_at in status():
+            print(f"{version:04d}_{name:<24} {applied_at or 'pending'}")
+    elif sys.argv[1:]:
+        sys.exit("usage: python migrations.py [status]")
+    else:
+        applied = migrate()
+        print(f"applied {len(applied)} migration(s)" + (f": {applied}" if applied else ""))
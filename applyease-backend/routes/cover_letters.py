@@ -1,75 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from typing import Optional
 import os
 import jwt
-import psycopg2
-import psycopg2.extras
-from psycopg2.pool import SimpleConnectionPool
-from threading import Lock
+import logging
 import uuid
 
+try:
+    from .. import blob_store, db, llm, llm_cache, llm_scheduler
+except Exception:
+    import blob_store
+    import db
+    import llm
+    import llm_cache
+    import llm_scheduler
 
+
+logger = logging.getLogger(__name__)
 router = APIRouter()
 security = HTTPBearer(auto_error=True)
 
 
-_pool = None
-_pool_lock = Lock()
-
-
-def _db_dsn() -> str:
-    host = os.getenv("PGHOST", "localhost")
-    port = os.getenv("PGPORT", "5432")
-    user = os.getenv("PGUSER", os.getenv("USER", "postgres"))
-    password = os.getenv("PGPASSWORD", "")
-    dbname = os.getenv("PGDATABASE", "applyease")
-    if password:
-        return f"host={host} port={port} dbname={dbname} user={user} password={password}"
-    else:
-        return f"host={host} port={port} dbname={dbname} user={user}"
-
-
+# --- DB helpers over the process-wide pool in db.py ---
 def _conn():
-    global _pool
-    with _pool_lock:
-        if _pool is None:
-            _pool = SimpleConnectionPool(minconn=1, maxconn=5, dsn=_db_dsn())
-    conn = _pool.getconn()
-    conn.autocommit = True
-    return conn
+    return db.getconn()
 
 
 def _put_conn(conn):
-    global _pool
-    if _pool is not None:
-        _pool.putconn(conn)
-
-
-def _ensure_schema():
-    conn = _conn()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS cover_letters (
-                    id text PRIMARY KEY,
-                    user_id text NOT NULL,
-                    job_id text,
-                    company text,
-                    title text,
-                    letter_text text NOT NULL,
-                    letter_blob bytea,
-                    letter_mime text,
-                    filename text,
-                    created_at timestamptz NOT NULL DEFAULT now()
-                );
-                """
-            )
-    finally:
-        _put_conn(conn)
+    db.putconn(conn)
 
 
 JWT_KEY = os.getenv("JWT_KEY", "dev-secret")
@@ -171,62 +132,23 @@ def _format_cover_letter(user_row, sections_row, body: GenerateCoverBody) -> str
     return (url_line + intro + core + close + sig).strip()
 
 
-def _llm_complete(prompt: str) -> str:
-    provider = os.getenv("LLM_PROVIDER", "ollama").lower()
-    ollama_host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
-    base_url = os.getenv("LLM_BASE_URL", "http://localhost:1234/v1")
-    model = os.getenv("LLM_MODEL")
-    timeout_s = int(os.getenv("LLM_TIMEOUT_SECONDS", "45"))
-    if provider in {"off", "none", "disabled"}:
-        return ""
+# Sent to Ollama with cover letter prompts (a little more varied than resume rewrites)
+_COVER_OPTIONS = {"temperature": 0.4, "num_ctx": 8192}
+
+
+async def _llm_complete(prompt: str, no_cache: bool = False) -> str:
     try:
-        if provider == "ollama":
-            model_name = model or "llama3.1:8b"
-            import requests as _rq
-            r = _rq.post(
-                f"{ollama_host.rstrip('/')}/api/chat",
-                json={
-                    "model": model_name,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "stream": False,
-                    "options": {"temperature": 0.4, "num_ctx": 8192},
-                },
-                timeout=timeout_s,
-            )
-            if r.status_code != 200:
-                return ""
-            data = r.json()
-            if isinstance(data, dict):
-                if isinstance(data.get("message"), dict):
-                    return data["message"].get("content") or ""
-                if "response" in data:
-                    return data.get("response") or ""
-            return ""
-        elif provider in ("lmstudio", "openai_compatible", "vllm"):
-            if not model:
-                return ""
-            import requests as _rq
-            url = f"{base_url.rstrip('/')}/chat/completions"
-            r = _rq.post(
-                url,
-                headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY', 'lm-studio')}", "Content-Type": "application/json"},
-                json={"model": model, "messages": [{"role": "user", "content": prompt}]},
-                timeout=timeout_s,
-            )
-            if r.status_code != 200:
-                return ""
-            data = r.json()
-            return data.get("choices", [{}])[0].get("message", {}).get("content", "")
-        else:
-            return ""
-    except Exception:
+        # Cover letters are batch work: interactive answers and tailoring go first
+        text, _ = await llm_cache.complete(prompt, _COVER_OPTIONS, bypass=no_cache, priority=llm_scheduler.BATCH)
+        return text
+    except llm.LLMError as e:
+        logger.warning("cover letter completion failed: %s", e)
         return ""
 
 
 @router.post("/cover_letters/generate")
-def generate_cover_letter(body: GenerateCoverBody, user_id: str = Depends(_current_user)):
-    _ensure_schema()
-    u, s = _get_user_and_sections(user_id)
+async def generate_cover_letter(body: GenerateCoverBody, no_cache: bool = False, user_id: str = Depends(_current_user)):
+    u, s = await run_in_threadpool(_get_user_and_sections, user_id)
     if not u:
         raise HTTPException(status_code=404, detail="User not found")
     # Try LLM-enhanced generation if requested and job description present
@@ -256,11 +178,15 @@ def generate_cover_letter(body: GenerateCoverBody, user_id: str = Depends(_curre
             f"Company: {body.company or ''}\nRole: {body.title or ''}\nJob Description:\n{body.job_description}\n\n"
             f"Candidate Profile:\n{profile}\n"
         )
-        llm_text = _llm_complete(prompt).strip()
+        llm_text = (await _llm_complete(prompt, no_cache)).strip()
         if llm_text:
             text = llm_text
     if not text:
         text = _format_cover_letter(u, s, body)
+    return await run_in_threadpool(_cover_letter_response, body, user_id, text)
+
+
+def _cover_letter_response(body: GenerateCoverBody, user_id: str, text: str):
     filename = (body.filename or "cover_letter.pdf").replace("\n", " ")
     buffer, headers = _render_text_to_pdf_stream(text, filename=filename)
     if body.save:
@@ -269,12 +195,13 @@ def generate_cover_letter(body: GenerateCoverBody, user_id: str = Depends(_curre
         try:
             with conn.cursor() as cur:
                 cid = str(uuid.uuid4())
+                blob_sha = blob_store.put(cur, pdf_bytes)
                 cur.execute(
                     """
-                    INSERT INTO cover_letters (id, user_id, job_id, company, title, letter_text, letter_blob, letter_mime, filename)
+                    INSERT INTO cover_letters (id, user_id, job_id, company, title, letter_text, letter_blob_sha, letter_mime, filename)
                     VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
                     """,
-                    (cid, user_id, body.job_id, body.company, body.title, text, psycopg2.Binary(pdf_bytes), "application/pdf", filename),
+                    (cid, user_id, body.job_id, body.company, body.title, text, blob_sha, "application/pdf", filename),
                 )
         finally:
             _put_conn(conn)
@@ -283,7 +210,6 @@ def generate_cover_letter(body: GenerateCoverBody, user_id: str = Depends(_curre
 
 @router.get("/cover_letters")
 def list_cover_letters(user_id: str = Depends(_current_user)):
-    _ensure_schema()
     conn = _conn()
     try:
         with conn.cursor() as cur:
@@ -296,21 +222,27 @@ def list_cover_letters(user_id: str = Depends(_current_user)):
 
 
 @router.get("/cover_letters/download")
-def download_cover_letter(id: str, user_id: str = Depends(_current_user)):
-    _ensure_schema()
+def download_cover_letter(id: str, request: Request, user_id: str = Depends(_current_user)):
     conn = _conn()
     try:
         with conn.cursor() as cur:
-            cur.execute("SELECT letter_blob, letter_mime, filename, letter_text FROM cover_letters WHERE id = %s AND user_id = %s", (id, user_id))
+            cur.execute(
+                """
+                SELECT letter_blob_sha, letter_blob, letter_mime, filename,
+                       CASE WHEN letter_blob_sha IS NULL AND letter_blob IS NULL THEN letter_text END
+                FROM cover_letters WHERE id = %s AND user_id = %s
+                """,
+                (id, user_id),
+            )
             row = cur.fetchone()
             if not row:
                 raise HTTPException(status_code=404, detail="Not found")
-            blob, mime, fname, text = row
-            if blob:
-                from io import BytesIO
-                headers = {"Content-Disposition": f"attachment; filename={fname or 'cover_letter.pdf'}"}
-                return StreamingResponse(BytesIO(blob), media_type=mime or "application/pdf", headers=headers)
-            buffer, headers = _render_text_to_pdf_stream(text or "", filename=fname or "cover_letter.pdf")
-            return StreamingResponse(buffer, media_type="application/pdf", headers=headers)
+            sha, legacy, mime, fname, text = row
+            info = blob_store.stat(cur, sha)
     finally:
         _put_conn(conn)
+    if info is not None or legacy:
+        headers = {"Content-Disposition": f"attachment; filename={fname or 'cover_letter.pdf'}"}
+        return blob_store.blob_response(request.headers.get("range"), info, legacy, mime or "application/pdf", headers)
+    buffer, headers = _render_text_to_pdf_stream(text or "", filename=fname or "cover_letter.pdf")
+    return StreamingResponse(buffer, media_type="application/pdf", headers=headers)
@@ -1,82 +1,159 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
-from typing import Optional, List
-from datetime import datetime
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Iterator, Optional, List
+from datetime import date, datetime, timezone
+import anyio
+import base64
+import codecs
+import csv
+import html
+import io
+import json
 import os
+import threading
+import uuid
 import jwt
 import psycopg2
 import psycopg2.extras
-from psycopg2.pool import SimpleConnectionPool
-from threading import Lock
+
+try:
+    from .. import db, embeddings
+except Exception:
+    import db
+    import embeddings
 
 
 router = APIRouter()
 security = HTTPBearer(auto_error=True)
 
 
-# --- Minimal shared DB helpers (decoupled from app.py to avoid circular imports) ---
-_pool = None
-_pool_lock = Lock()
-
-
-def _db_dsn() -> str:
-    host = os.getenv("PGHOST", "localhost")
-    port = os.getenv("PGPORT", "5432")
-    user = os.getenv("PGUSER", os.getenv("USER", "postgres"))
-    password = os.getenv("PGPASSWORD", "")
-    dbname = os.getenv("PGDATABASE", "applyease")
-    if password:
-        return f"host={host} port={port} dbname={dbname} user={user} password={password}"
-    else:
-        return f"host={host} port={port} dbname={dbname} user={user}"
-
-
+# --- DB helpers over the process-wide pool in db.py ---
 def _conn():
-    global _pool
-    with _pool_lock:
-        if _pool is None:
-            _pool = SimpleConnectionPool(minconn=1, maxconn=5, dsn=_db_dsn())
-    conn = _pool.getconn()
-    conn.autocommit = True
-    return conn
+    return db.getconn()
 
 
 def _put_conn(conn):
-    global _pool
-    if _pool is not None:
-        _pool.putconn(conn)
+    db.putconn(conn)
+
+
+# Everything except jd_embedding, so listing jobs doesn't ship 384 floats per row
+_JOB_COLS = "id, user_id, company, title, location, source, url, status, notes, jd_text, next_action_date, created_at, updated_at"
+
+# Columns /jobs can project (fields=); id and updated_at are always sent (they form the cursor)
+_JOB_FIELDS = (
+    "id", "company", "title", "location", "source", "url", "status", "notes", "jd_text",
+    "next_action_date", "created_at", "updated_at",
+)
+# Large text columns, only sent when asked for
+_JOB_HEAVY_FIELDS = ("notes", "jd_text")
+JOBS_PAGE_DEFAULT = 50
+JOBS_PAGE_MAX = 500
+_Q_JOBS_RANKED = db.prepared(
+    "jobs_ranked",
+    f"""
+    WITH r AS (SELECT embedding FROM resumes WHERE user_id = $1)
+    SELECT {_JOB_COLS},
+           1 - (jd_embedding <=> (SELECT embedding FROM r)) AS score,
+           count(*) OVER () AS total
+    FROM job_applications
+    WHERE user_id = $1 AND jd_embedding IS NOT NULL
+    ORDER BY jd_embedding <=> (SELECT embedding FROM r), id
+    LIMIT $2 OFFSET $3
+    """,
+    3,
+)
+
+# Rollups maintained by the job_applications_rollup trigger (migration 0008)
+_Q_STATUS_COUNTS = db.prepared(
+    "job_status_counts", "SELECT status, n FROM job_status_counts WHERE user_id = $1 AND n > 0", 1
+)
+_Q_WEEKLY_COUNTS = db.prepared(
+    "job_weekly_counts",
+    """
+    SELECT week, status, n FROM job_weekly_counts
+    WHERE user_id = $1 AND n > 0
+      AND week > (date_trunc('week', now() AT TIME ZONE 'UTC') - make_interval(weeks => $2::int))::date
+    ORDER BY week, status
+    """,
+    2,
+)
+FUNNEL_STAGES = ("saved", "applied", "interview", "offer")
+
+# Rows missing an embedding that one backfill query encodes (imports and /jobs/ranked
+# schedule the backfill as a background task)
+RANK_BACKFILL_MAX = int(os.getenv("RANK_BACKFILL_MAX", "256"))
+# Users with a backfill task running, so repeated /jobs/ranked calls don't stack them
+_backfilling = set()
+_backfilling_lock = threading.Lock()
+
+
+def _jd_embedding(jd_text: Optional[str]):
+    """Embedding to store for ``jd_text``; None when empty or the model is still loading (backfilled later)."""
+    if not jd_text or not jd_text.strip():
+        return None
+    try:
+        return embeddings.embed(jd_text).tolist()
+    except embeddings.NotReadyError:
+        return None
+
 
+def _backfill_jd_embeddings(user_id: str) -> int:
+    """Embed up to ``RANK_BACKFILL_MAX`` of the user's jobs missing a JD vector; returns how many.
 
-def _ensure_schema():
+    No pooled connection is held while encoding: the rows are read, the connection goes
+    back, and the vectors are written with a fresh one. A row whose jd_text changed in
+    between keeps the value the edit gave it.
+    """
     conn = _conn()
     try:
         with conn.cursor() as cur:
             cur.execute(
                 """
-                CREATE TABLE IF NOT EXISTS job_applications (
-                    id text PRIMARY KEY,
-                    user_id text NOT NULL,
-                    company text NOT NULL,
-                    title text NOT NULL,
-                    location text,
-                    source text,
-                    url text,
-                    status text NOT NULL DEFAULT 'saved', -- saved|applied|interview|offer|rejected
-                    notes text,
-                    jd_text text,
-                    next_action_date date,
-                    created_at timestamptz NOT NULL DEFAULT now(),
-                    updated_at timestamptz NOT NULL DEFAULT now()
-                );
+                SELECT id, jd_text FROM job_applications
+                WHERE user_id = %s AND jd_embedding IS NULL AND coalesce(btrim(jd_text), '') <> ''
+                LIMIT %s
+                """,
+                (user_id, RANK_BACKFILL_MAX),
+            )
+            rows = cur.fetchall() or []
+    finally:
+        _put_conn(conn)
+    if not rows:
+        return 0
+    vecs = embeddings.embed_many([r[1] for r in rows])
+    conn = _conn()
+    try:
+        with conn.cursor() as cur:
+            psycopg2.extras.execute_values(
+                cur,
                 """
+                UPDATE job_applications AS j SET jd_embedding = v.emb::vector
+                FROM (VALUES %s) AS v(id, jd_text, emb)
+                WHERE j.id = v.id AND j.jd_embedding IS NULL AND j.jd_text = v.jd_text
+                """,
+                [(r[0], r[1], vec.tolist()) for r, vec in zip(rows, vecs)],
             )
-            try:
-                cur.execute("CREATE INDEX IF NOT EXISTS job_applications_user_idx ON job_applications (user_id, updated_at DESC);")
-            except Exception:
-                pass
     finally:
         _put_conn(conn)
+    return len(rows)
+
+
+def _embed_pending_jds(user_id: str):
+    """Backfill every pending JD vector for the user, a batch at a time (a background task)."""
+    with _backfilling_lock:
+        if user_id in _backfilling:
+            return
+        _backfilling.add(user_id)
+    try:
+        while _backfill_jd_embeddings(user_id) >= RANK_BACKFILL_MAX:
+            pass
+    except embeddings.NotReadyError:
+        pass  # the next /jobs/ranked call schedules the rest once the model has loaded
+    finally:
+        with _backfilling_lock:
+            _backfilling.discard(user_id)
 
 
 JWT_KEY = os.getenv("JWT_KEY", "dev-secret")
@@ -121,66 +198,278 @@ class JobOut(JobCreate):
     updated_at: str
 
 
-@router.on_event("startup")
-def _startup():
-    _ensure_schema()
+class RankedJob(JobOut):
+    score: float
+    percent: float
 
 
-@router.get("/jobs", response_model=List[JobOut])
-def list_jobs(user_id: str = Depends(_current_user)):
-    _ensure_schema()
+def _job_fields(r) -> dict:
+    return dict(
+        id=r["id"], company=r["company"], title=r["title"], location=r["location"], source=r["source"],
+        url=r["url"], status=r["status"], notes=r["notes"], jd_text=r["jd_text"],
+        next_action_date=str(r["next_action_date"]) if r["next_action_date"] else None,
+        created_at=str(r["created_at"]), updated_at=str(r["updated_at"])
+    )
+
+
+def _jobs_page_query(cols: List[str], by_status: bool, after: bool) -> db.Prepared:
+    """Prepared keyset query for one projection/filter shape (params: user, [statuses], [cursor], limit).
+
+    Walks ``job_applications_user_keyset_idx``; unless notes/jd_text are requested it is
+    answered from the index alone. The statement selects every light column plus the heavy
+    ones in ``cols`` (callers drop the rest), so a client-chosen ``fields`` list maps onto
+    one of four projections instead of preparing a statement per combination.
+    """
+    heavy = [c for c in _JOB_HEAVY_FIELDS if c in cols]
+    mask = sum(1 << _JOB_HEAVY_FIELDS.index(c) for c in heavy)
+    cols = [c for c in _JOB_FIELDS if c not in _JOB_HEAVY_FIELDS or c in heavy]
+    where, n = ["user_id = $1"], 1
+    if by_status:
+        n += 1
+        where.append(f"status = ANY(${n}::text[])")
+    if after:
+        where.append(f"(updated_at, id) < (${n + 1}::timestamptz, ${n + 2}::text)")
+        n += 2
+    sql = (
+        f"SELECT {', '.join(cols)} FROM job_applications WHERE {' AND '.join(where)} "
+        f"ORDER BY updated_at DESC, id DESC LIMIT ${n + 1}"
+    )
+    return db.prepared(f"jobs_page_{mask:x}_{int(by_status)}{int(after)}", sql, n + 1)
+
+
+def _encode_cursor(updated_at, job_id: str) -> str:
+    raw = json.dumps([updated_at.isoformat(), job_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str):
+    try:
+        updated_at, job_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        datetime.fromisoformat(updated_at)
+        return updated_at, str(job_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/jobs")
+def list_jobs(
+    limit: int = Query(JOBS_PAGE_DEFAULT, ge=1, le=JOBS_PAGE_MAX),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    user_id: str = Depends(_current_user),
+):
+    """One page of the user's jobs, newest update first.
+
+    ``fields`` picks columns (default: all but notes and jd_text), ``status`` is a
+    comma-separated filter, and the ``X-Next-Cursor`` response header is passed back as
+    ``cursor`` for the next page (absent on the last one).
+    """
+    if fields:
+        wanted = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = wanted - set(_JOB_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    else:
+        wanted = set(_JOB_FIELDS) - set(_JOB_HEAVY_FIELDS)
+    cols = [c for c in _JOB_FIELDS if c in wanted or c in ("id", "updated_at")]
+    statuses = [s.strip() for s in (status or "").split(",") if s.strip()]
+    after = _decode_cursor(cursor) if cursor else None
+
+    params: list = [user_id]
+    if statuses:
+        params.append(statuses)
+    if after:
+        params.extend(after)
+    params.append(limit + 1)
+    query = _jobs_page_query(cols, bool(statuses), bool(after))
     conn = _conn()
     try:
         with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-            cur.execute("SELECT * FROM job_applications WHERE user_id = %s ORDER BY updated_at DESC", (user_id,))
+            query.execute(cur, params)
             rows = cur.fetchall() or []
-            out = []
-            for r in rows:
-                out.append(JobOut(
-                    id=r["id"], company=r["company"], title=r["title"], location=r["location"], source=r["source"],
-                    url=r["url"], status=r["status"], notes=r["notes"], jd_text=r["jd_text"],
-                    next_action_date=str(r["next_action_date"]) if r["next_action_date"] else None,
-                    created_at=str(r["created_at"]), updated_at=str(r["updated_at"])
-                ))
-            return out
     finally:
         _put_conn(conn)
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = _encode_cursor(rows[-1]["updated_at"], rows[-1]["id"])
+    # Plain dicts straight to JSON: only the projected keys, no per-row model validation
+    out = []
+    for r in rows:
+        item = {}
+        for c in cols:
+            v = r[c]
+            item[c] = str(v) if v is not None and c in ("next_action_date", "created_at", "updated_at") else v
+        out.append(item)
+    return JSONResponse(out, headers=headers)
+
+
+@router.get("/jobs/ranked")
+def ranked_jobs(
+    background: BackgroundTasks,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    user_id: str = Depends(_current_user),
+):
+    """The user's tracked jobs ordered by cosine similarity of jd_text to their current resume.
+
+    Only rows that already have a JD vector are ranked; the rest are counted as ``pending``
+    and embedded by a background task after the response is sent.
+    """
+    conn = _conn()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+            cur.execute("SELECT embedding IS NOT NULL FROM resumes WHERE user_id = %s", (user_id,))
+            row = cur.fetchone()
+            if not row or not row[0]:
+                raise HTTPException(status_code=404, detail="User resume embedding not found")
+            _Q_JOBS_RANKED.execute(cur, (user_id, limit, offset))
+            rows = cur.fetchall() or []
+            items = [
+                RankedJob(**_job_fields(r), score=float(r["score"]), percent=round(float(r["score"]) * 100.0, 2))
+                for r in rows
+            ]
+            # Rows with jd_text still waiting for a vector (saved while the model loaded, just imported)
+            cur.execute(
+                """
+                SELECT count(*) FILTER (WHERE jd_embedding IS NOT NULL),
+                       count(*) FILTER (WHERE jd_embedding IS NULL AND coalesce(btrim(jd_text), '') <> '')
+                FROM job_applications WHERE user_id = %s
+                """,
+                (user_id,),
+            )
+            scored, pending = cur.fetchone()
+    finally:
+        _put_conn(conn)
+    if pending:
+        background.add_task(_embed_pending_jds, user_id)
+    total = int(rows[0]["total"]) if rows else int(scored)
+    return {"items": items, "total": total, "pending": int(pending), "limit": limit, "offset": offset}
+
+
+# ===== Search =====
+# Page rows are ranked and cut in the inner query; ts_headline (the costly part) only runs
+# on what is returned. $2 = query text, $3 = statuses or NULL.
+_SEARCH_SQL = f"""
+    WITH q AS (SELECT websearch_to_tsquery('english', $2) AS tsq)
+    SELECT p.*,
+           ts_headline('english', concat_ws(' ', p.notes, p.jd_text), q.tsq,
+                       'StartSel=' || chr(2) || ', StopSel=' || chr(3) || ', MaxFragments=2, MaxWords=24, MinWords=8')
+             AS snippet
+    FROM (
+        SELECT {_JOB_COLS}, {{score}} AS score, count(*) OVER () AS total
+        FROM job_applications, q
+        WHERE user_id = $1 AND ($3::text[] IS NULL OR status = ANY($3::text[]))
+          AND (search_tsv @@ q.tsq OR {{fuzzy}})
+        ORDER BY score DESC, updated_at DESC, id
+        LIMIT $4 OFFSET $5
+    ) p, q
+    ORDER BY p.score DESC, p.updated_at DESC, p.id
+"""
+_RANK = "ts_rank_cd(search_tsv, q.tsq, 32)"
+_Q_SEARCH_TRGM = db.prepared(
+    "jobs_search_trgm",
+    _SEARCH_SQL.format(
+        score=f"{_RANK} + 0.5 * word_similarity($2, company || ' ' || title)",
+        fuzzy="$2 <% (company || ' ' || title)",
+    ),
+    5,
+)
+_Q_SEARCH_PLAIN = db.prepared(
+    "jobs_search_plain",
+    _SEARCH_SQL.format(
+        score=_RANK,
+        fuzzy="(company || ' ' || title) ILIKE '%' || replace(replace(replace($2, '\\', '\\\\'), '%', '\\%'), '_', '\\_') || '%'",
+    ),
+    5,
+)
+_trgm: Optional[bool] = None
+
+
+def _search_query(cur) -> db.Prepared:
+    """The pg_trgm variant when the extension is installed (checked once per process)."""
+    global _trgm
+    if _trgm is None:
+        cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        _trgm = cur.fetchone() is not None
+    return _Q_SEARCH_TRGM if _trgm else _Q_SEARCH_PLAIN
+
+
+def _snippet_html(text: Optional[str]) -> str:
+    # Escape the user's text, then turn the ts_headline markers into <mark> tags
+    return html.escape(text or "").replace("\x02", "<mark>").replace("\x03", "</mark>")
+
+
+class SearchHit(JobOut):
+    score: float
+    snippet: str
+
+
+@router.get("/jobs/search")
+def search_jobs(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    status: Optional[str] = None,
+    user_id: str = Depends(_current_user),
+):
+    """Full-text search over company, title, notes and JD, plus fuzzy company/title matching.
+
+    ``q`` takes web-search syntax (quoted phrases, ``-word``, ``or``). ``snippet`` is HTML
+    with matches wrapped in ``<mark>``.
+    """
+    statuses = [s.strip() for s in (status or "").split(",") if s.strip()] or None
+    conn = _conn()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+            _search_query(cur).execute(cur, (user_id, q, statuses, limit, offset))
+            rows = cur.fetchall() or []
+            total = int(rows[0]["total"]) if rows else None
+            if total is None and offset:
+                # Paged past the end: count without the window (rare)
+                _search_query(cur).execute(cur, (user_id, q, statuses, 1, 0))
+                row = cur.fetchone()
+                total = int(row["total"]) if row else 0
+    finally:
+        _put_conn(conn)
+    items = [
+        SearchHit(**_job_fields(r), score=round(float(r["score"]), 4), snippet=_snippet_html(r["snippet"]))
+        for r in rows
+    ]
+    return {"items": items, "total": total or 0, "limit": limit, "offset": offset}
 
 
 @router.post("/jobs", response_model=JobOut)
 def create_job(body: JobCreate, user_id: str = Depends(_current_user)):
-    _ensure_schema()
     import uuid
     jid = str(uuid.uuid4())
+    jd_embedding = _jd_embedding(body.jd_text)
     conn = _conn()
     try:
         with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
             cur.execute(
-                """
-                INSERT INTO job_applications (id, user_id, company, title, location, source, url, status, notes, jd_text, next_action_date)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                RETURNING *
+                f"""
+                INSERT INTO job_applications (id, user_id, company, title, location, source, url, status, notes, jd_text, next_action_date, jd_embedding)
+                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+                RETURNING {_JOB_COLS}
                 """,
                 (
                     jid, user_id, body.company, body.title, body.location, body.source, body.url,
                     body.status or 'saved', body.notes, body.jd_text,
                     body.next_action_date if body.next_action_date else None,
+                    jd_embedding,
                 ),
             )
             r = cur.fetchone()
-            return JobOut(
-                id=r["id"], company=r["company"], title=r["title"], location=r["location"], source=r["source"],
-                url=r["url"], status=r["status"], notes=r["notes"], jd_text=r["jd_text"],
-                next_action_date=str(r["next_action_date"]) if r["next_action_date"] else None,
-                created_at=str(r["created_at"]), updated_at=str(r["updated_at"])
-            )
+            return JobOut(**_job_fields(r))
     finally:
         _put_conn(conn)
 
 
 @router.patch("/jobs/{id}", response_model=JobOut)
 def update_job(id: str, body: JobUpdate, user_id: str = Depends(_current_user)):
-    _ensure_schema()
+    jd_embedding = _jd_embedding(body.jd_text) if body.jd_text is not None else None
     conn = _conn()
     try:
         with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
@@ -197,29 +486,27 @@ def update_job(id: str, body: JobUpdate, user_id: str = Depends(_current_user)):
             if body.next_action_date is not None:
                 set_cols.append("next_action_date = %s")
                 params.append(body.next_action_date or None)
+            if body.jd_text is not None:
+                # Re-embed on change; None clears a stale vector until the backfill catches up
+                set_cols.append("jd_embedding = %s")
+                params.append(jd_embedding)
             if not set_cols:
                 raise HTTPException(status_code=400, detail="No fields to update")
             params.extend([id, user_id])
             cur.execute(
-                f"UPDATE job_applications SET {', '.join(set_cols)}, updated_at = now() WHERE id = %s AND user_id = %s RETURNING *",
+                f"UPDATE job_applications SET {', '.join(set_cols)}, updated_at = now() WHERE id = %s AND user_id = %s RETURNING {_JOB_COLS}",
                 params,
             )
             r = cur.fetchone()
             if not r:
                 raise HTTPException(status_code=404, detail="Not found")
-            return JobOut(
-                id=r["id"], company=r["company"], title=r["title"], location=r["location"], source=r["source"],
-                url=r["url"], status=r["status"], notes=r["notes"], jd_text=r["jd_text"],
-                next_action_date=str(r["next_action_date"]) if r["next_action_date"] else None,
-                created_at=str(r["created_at"]), updated_at=str(r["updated_at"])
-            )
+            return JobOut(**_job_fields(r))
     finally:
         _put_conn(conn)
 
 
 @router.delete("/jobs/{id}")
 def delete_job(id: str, user_id: str = Depends(_current_user)):
-    _ensure_schema()
     conn = _conn()
     try:
         with conn.cursor() as cur:
@@ -231,12 +518,240 @@ def delete_job(id: str, user_id: str = Depends(_current_user)):
 
 @router.get("/jobs/stats")
 def job_stats(user_id: str = Depends(_current_user)):
-    _ensure_schema()
     conn = _conn()
     try:
         with conn.cursor() as cur:
-            cur.execute("SELECT status, COUNT(*) FROM job_applications WHERE user_id = %s GROUP BY status", (user_id,))
+            _Q_STATUS_COUNTS.execute(cur, (user_id,))
             counts = {row[0]: int(row[1]) for row in (cur.fetchall() or [])}
             return {"counts": counts}
     finally:
         _put_conn(conn)
+
+
+@router.get("/jobs/funnel")
+def job_funnel(weeks: int = Query(12, ge=1, le=104), user_id: str = Depends(_current_user)):
+    """Pipeline funnel and weekly additions by status, read from the rollup tables only.
+
+    A job counts toward every stage up to its current one (an ``interview`` has also been
+    ``saved`` and ``applied``). Rejections are reported on their own since the stage they
+    happened at isn't recorded.
+    """
+    conn = _conn()
+    try:
+        with conn.cursor() as cur:
+            _Q_STATUS_COUNTS.execute(cur, (user_id,))
+            counts = {row[0]: int(row[1]) for row in (cur.fetchall() or [])}
+            _Q_WEEKLY_COUNTS.execute(cur, (user_id, weeks))
+            weekly_rows = cur.fetchall() or []
+    finally:
+        _put_conn(conn)
+    stages, prev = [], None
+    for i, st in enumerate(FUNNEL_STAGES):
+        reached = sum(counts.get(s, 0) for s in FUNNEL_STAGES[i:])
+        rate = round(reached / prev, 4) if prev else None
+        stages.append({"status": st, "count": counts.get(st, 0), "reached": reached, "rate": rate})
+        prev = reached
+    by_week: dict = {}
+    for week, st, n in weekly_rows:
+        by_week.setdefault(str(week), {})[st] = int(n)
+    return {
+        "total": sum(counts.values()),
+        "stages": stages,
+        "rejected": counts.get("rejected", 0),
+        "weeks": [{"week": w, "counts": c, "total": sum(c.values())} for w, c in by_week.items()],
+    }
+
+
+# ===== Bulk import / export =====
+# Rows per COPY on import / per server-side cursor fetch on export
+JOBS_IMPORT_BATCH = int(os.getenv("JOBS_IMPORT_BATCH", "1000"))
+JOBS_EXPORT_BATCH = int(os.getenv("JOBS_EXPORT_BATCH", "1000"))
+_IMPORT_FIELDS = ("company", "title", "location", "source", "url", "status", "notes", "jd_text", "next_action_date", "created_at")
+_IMPORT_COPY = (
+    "COPY job_applications (id, user_id, company, title, location, source, url, status, notes, jd_text, "
+    "next_action_date, created_at) FROM STDIN WITH (FORMAT csv)"
+)
+# Errors listed in the import response; the rest are only counted
+_IMPORT_MAX_ERRORS = 100
+
+
+def _body_lines(request: Request) -> Iterator[str]:
+    """Lines of the request body, read from a worker thread as they arrive (keeps the newline)."""
+    chunks = request.stream().__aiter__()
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    while True:
+        try:
+            chunk = anyio.from_thread.run(chunks.__anext__)
+        except StopAsyncIteration:
+            break
+        buf += decoder.decode(chunk)
+        *lines, buf = buf.split("\n")
+        for line in lines:
+            yield line + "\n"
+    buf += decoder.decode(b"", final=True)
+    if buf:
+        yield buf
+
+
+def _import_records(fmt: str, lines: Iterator[str]) -> Iterator[tuple]:
+    """(line number, dict or error string) per record."""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for rec in reader:
+            yield reader.line_num, rec
+        return
+    for n, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            rec = json.loads(line)
+        except ValueError as e:
+            yield n, f"invalid JSON: {e}"
+            continue
+        yield n, rec if isinstance(rec, dict) else "expected a JSON object"
+
+
+def _import_row(rec: dict, default_created: str) -> list:
+    """Validated values in ``_IMPORT_FIELDS`` order; raises ValueError."""
+    vals = {}
+    for f in _IMPORT_FIELDS:
+        v = rec.get(f)
+        if v is not None and not isinstance(v, str):
+            v = str(v)
+        vals[f] = v.strip() if v and v.strip() else None
+    for f in ("company", "title"):
+        if not vals[f]:
+            raise ValueError(f"{f} is required")
+    vals["status"] = (vals["status"] or "saved").lower()
+    if vals["next_action_date"]:
+        vals["next_action_date"] = date.fromisoformat(vals["next_action_date"][:10]).isoformat()
+    if vals["created_at"]:
+        created = datetime.fromisoformat(vals["created_at"])
+        vals["created_at"] = (created if created.tzinfo else created.replace(tzinfo=timezone.utc)).isoformat()
+    else:
+        vals["created_at"] = default_created
+    return [vals[f] for f in _IMPORT_FIELDS]
+
+
+def _csv_field(v) -> str:
+    # Quoted values are literal; an unquoted empty field is NULL in COPY's CSV format
+    return "" if v is None else '"' + str(v).replace('"', '""') + '"'
+
+
+def _copy_batch(user_id: str, rows: List[list]):
+    buf = io.StringIO()
+    for vals in rows:
+        buf.write(",".join(_csv_field(v) for v in [str(uuid.uuid4()), user_id, *vals]) + "\n")
+    buf.seek(0)
+    conn = _conn()
+    try:
+        with conn.cursor() as cur:
+            cur.copy_expert(_IMPORT_COPY, buf)
+    finally:
+        _put_conn(conn)
+
+
+def _run_import(request: Request, fmt: str, user_id: str) -> dict:
+    default_created = datetime.now(timezone.utc).isoformat()
+    inserted, failed, errors, batch = 0, 0, [], []
+    for line, rec in _import_records(fmt, _body_lines(request)):
+        try:
+            if isinstance(rec, str):
+                raise ValueError(rec)
+            batch.append(_import_row(rec, default_created))
+        except ValueError as e:
+            failed += 1
+            if len(errors) < _IMPORT_MAX_ERRORS:
+                errors.append({"line": line, "error": str(e)})
+            continue
+        if len(batch) >= JOBS_IMPORT_BATCH:
+            _copy_batch(user_id, batch)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        _copy_batch(user_id, batch)
+        inserted += len(batch)
+    return {"inserted": inserted, "failed": failed, "errors": errors}
+
+
+def _bulk_format(fmt: Optional[str], content_type: str) -> str:
+    fmt = (fmt or ("csv" if "csv" in content_type else "ndjson")).lower()
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    return fmt
+
+
+@router.post("/jobs/import")
+async def import_jobs(
+    request: Request,
+    background: BackgroundTasks,
+    format: Optional[str] = None,
+    user_id: str = Depends(_current_user),
+):
+    """Bulk-add jobs from an NDJSON or CSV (header row) body, parsed as it streams in.
+
+    Valid rows are written with ``COPY`` every ``JOBS_IMPORT_BATCH`` rows (each batch commits
+    on its own); invalid ones are skipped and reported by line. JD embeddings for the new
+    rows are computed after the response is sent; until then ``/jobs/ranked`` counts them
+    as ``pending``.
+    """
+    fmt = _bulk_format(format, request.headers.get("content-type") or "")
+    result = await anyio.to_thread.run_sync(_run_import, request, fmt, user_id)
+    if result["inserted"]:
+        background.add_task(_embed_pending_jds, user_id)
+    return result
+
+
+def _export_rows(user_id: str, cols: List[str], statuses: List[str], fmt: str) -> Iterator[bytes]:
+    conn = _conn()
+    try:
+        # Named cursors live in a transaction; putconn rolls it back and restores autocommit
+        conn.autocommit = False
+        with conn.cursor(name="jobs_export") as cur:
+            cur.execute(
+                f"SELECT {', '.join(cols)} FROM job_applications WHERE user_id = %s"
+                + (" AND status = ANY(%s)" if statuses else "")
+                + " ORDER BY updated_at DESC, id DESC",
+                (user_id, statuses) if statuses else (user_id,),
+            )
+            if fmt == "csv":
+                yield (",".join(cols) + "\n").encode("utf-8")
+            while True:
+                rows = cur.fetchmany(JOBS_EXPORT_BATCH)
+                if not rows:
+                    break
+                out = io.StringIO()
+                if fmt == "csv":
+                    csv.writer(out, lineterminator="\n").writerows(
+                        ["" if v is None else str(v) for v in r] for r in rows
+                    )
+                else:
+                    for r in rows:
+                        out.write(json.dumps({c: (v if v is None or isinstance(v, str) else str(v)) for c, v in zip(cols, r)}))
+                        out.write("\n")
+                yield out.getvalue().encode("utf-8")
+    finally:
+        _put_conn(conn)
+
+
+@router.get("/jobs/export")
+def export_jobs(
+    format: str = "ndjson",
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    user_id: str = Depends(_current_user),
+):
+    """Stream the user's jobs as NDJSON or CSV from a server-side cursor (all columns by default)."""
+    fmt = _bulk_format(format, "")
+    if fields:
+        cols = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = set(cols) - set(_JOB_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    else:
+        cols = list(_JOB_FIELDS)
+    statuses = [s.strip() for s in (status or "").split(",") if s.strip()]
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f"attachment; filename=jobs.{'csv' if fmt == 'csv' else 'ndjson'}"}
+    return StreamingResponse(_export_rows(user_id, cols, statuses, fmt), media_type=media_type, headers=headers)
@@ -0,0 +1,47 @@
+# test_embed_backends.py
+# Parity of the ONNX Runtime backends with the reference PyTorch model over a fixed corpus.
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("onnxruntime")
+
+import embed_backends  # noqa: E402
+from embeddings import MODEL_NAME  # noqa: E402
+
+CORPUS = [
+    "Software engineer skilled in Python, AWS, and Docker.",
+    "Looking for backend developer experienced in AWS and Python.",
+    "Senior data scientist: PyTorch, pandas, Spark, and experiment design.",
+    "We need a React and TypeScript engineer to own our design system.",
+    "Site reliability engineer with Kubernetes, Terraform and on-call experience.",
+    "Registered nurse with ICU experience and BLS certification.",
+    "Product manager for payments; SQL, A/B testing, stakeholder communication.",
+    "",
+    "Rust",
+    " ".join(["Built distributed Kafka pipelines processing billions of events per day."] * 40),
+]
+
+# Minimum per-text cosine between backend and torch vectors
+THRESHOLDS = {"onnx": 0.999, "onnx-int8": 0.98}
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return embed_backends.create("torch", MODEL_NAME).encode(CORPUS)
+
+
+@pytest.mark.parametrize("backend", sorted(THRESHOLDS))
+def test_backend_matches_torch(reference, backend):
+    got = embed_backends.create(backend, MODEL_NAME).encode(CORPUS)
+    assert got.shape == reference.shape
+    ref = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    cos = np.sum(ref * got, axis=1)
+    assert cos.min() >= THRESHOLDS[backend], f"{backend} min cosine {cos.min():.5f}"
+    # Pairwise rankings (what /match depends on) should agree as well
+    assert np.allclose(ref @ ref.T, got @ got.T, atol=0.03)
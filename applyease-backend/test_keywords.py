@@ -0,0 +1,96 @@
+# test_keywords.py
+# KeywordExtractor against the legacy per-token filter (kept in benchmarks/bench_keywords.py),
+# the packed-bitset round trip and AND / AND-NOT matching, and the vocabulary version that
+# tells the lazy resume backfill a stored bitset is stale.
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+
+pytest.importorskip("sklearn")
+
+import bench_keywords  # noqa: E402
+import keyword_extractor as kx  # noqa: E402
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS  # noqa: E402
+
+STOP = ENGLISH_STOP_WORDS.union(kx._EXTRA_STOP)
+LEGACY_VOCAB = kx._TECH_TERMS | kx._ACRONYMS | kx._SPECIAL_SPELLINGS
+
+RESUME = "Backend engineer: Python, FastAPI, PostgreSQL, Docker and AWS (S3, EC2). Machine learning with PyTorch."
+JD = "We use Python, Kubernetes, Terraform and AWS. Spring Boot a plus; React.js front-end, node js tooling."
+
+
+def test_extractor_matches_legacy_filter():
+    rng = random.Random(7)
+    docs = [bench_keywords.make_jd(rng, size=2000) for _ in range(25)] + [RESUME, JD, "", "C++, C#, .NET and Node.js"]
+    single = kx.KeywordExtractor(LEGACY_VOCAB, STOP)
+    full = kx.default_extractor()
+    for d in docs:
+        legacy = bench_keywords.legacy_keywords(d)
+        assert single.extract(d) == legacy
+        assert legacy <= full.extract(d)  # phrases and aliases only add terms
+
+
+def test_phrases_and_aliases():
+    terms = kx.default_extractor().extract(JD + " " + RESUME)
+    assert {"springboot", "react", "nodejs", "machine learning"} <= terms
+    assert "machine learning" not in kx.default_extractor().extract("machine-learning-free zone")
+
+
+def test_pack_unpack_and_match_bits_round_trip():
+    ext = kx.default_extractor()
+    r_set, j_set = ext.extract(RESUME), ext.extract(JD)
+    r_bits = ext.pack(r_set)
+    assert len(r_bits) == ext.nbytes
+    assert ext.unpack(r_bits) == sorted(r_set)
+    assert ext.unpack(r_bits, limit=2) == sorted(r_set)[:2]
+    assert ext.pack(r_set | {"not-a-term"}) == r_bits  # unknown terms are dropped
+
+    [(matching, missing)] = ext.match_bits(r_bits, np.frombuffer(ext.extract_bits(JD), dtype=np.uint8))
+    assert matching == sorted(r_set & j_set) and missing == sorted(j_set - r_set)
+
+    jds = [JD, "", RESUME]
+    rows = ext.match_bits(r_bits, ext.extract_bits_many(jds), limit=None)
+    for jd, (m, x) in zip(jds, rows):
+        j = ext.extract(jd)
+        assert (m, x) == (sorted(r_set & j), sorted(j - r_set))
+    assert ext.extract_bits_many([]).shape == (0, ext.nbytes)
+
+
+def test_version_tracks_the_vocabulary():
+    a = kx.KeywordExtractor(["python", "aws", "docker"], STOP)
+    assert kx.KeywordExtractor(["docker", "python", "aws"], STOP).version == a.version
+    b = kx.KeywordExtractor(["python", "aws", "docker", "ansible"], STOP)
+    assert b.version != a.version
+    # Same bytes, different terms: why bits stored under another version must be recomputed
+    bits = a.pack({"docker"})
+    assert a.unpack(bits) == ["docker"] and b.unpack(bits) != ["docker"]
+
+
+class _Cursor:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+
+
+def test_resume_bits_are_recomputed_when_the_version_changes():
+    app = pytest.importorskip("app")
+    ext = kx.default_extractor()
+    stored = ext.extract_bits(RESUME)
+
+    cur = _Cursor()
+    assert app._resume_keyword_bits(cur, "u1", stored, ext.version, None) == stored
+    assert cur.executed == []  # current version: used as is
+
+    for bits, vocab in ((stored, "old-vocabulary"), (None, None)):
+        cur = _Cursor()
+        assert app._resume_keyword_bits(cur, "u1", bits, vocab, RESUME) == stored
+        [(sql, params)] = cur.executed
+        assert sql.startswith("UPDATE resumes") and params[1] == ext.version and bytes(params[0].adapted) == stored
@@ -0,0 +1,181 @@
+# test_llm.py
+# Provider paths of the LLM client (Ollama, OpenAI-compatible, off) against the fake server in
+# benchmarks/, plus the completion cache key and the scheduler's queueing rules.
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+
+httpx = pytest.importorskip("httpx")
+
+import fake_llm_server  # noqa: E402
+import llm  # noqa: E402
+import llm_cache  # noqa: E402
+import llm_scheduler  # noqa: E402
+
+PROVIDERS = {
+    "ollama": {"LLM_PROVIDER": "ollama"},
+    "lmstudio": {"LLM_PROVIDER": "lmstudio", "LLM_MODEL": "fake"},
+    "vllm": {"LLM_PROVIDER": "vllm", "LLM_MODEL": "fake"},
+}
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    """A FakeLLM served to llm.client() in-process; the caller picks the provider via env."""
+    server = fake_llm_server.FakeLLM(latency_ms=0, tokens_per_s=0, tokens=12)
+    transport = httpx.ASGITransport(app=fake_llm_server.make_app(server))
+    monkeypatch.setattr(llm, "_client", httpx.AsyncClient(transport=transport, timeout=5))
+    monkeypatch.setattr(llm, "_backoff", lambda attempt, response=None: 0)
+    for name in ("LLM_PROVIDER", "LLM_MODEL"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("OLLAMA_HOST", "http://fake-llm")
+    monkeypatch.setenv("LLM_BASE_URL", "http://fake-llm/v1")
+    return server
+
+
+def _use(monkeypatch, name):
+    for key, value in PROVIDERS[name].items():
+        monkeypatch.setenv(key, value)
+
+
+def test_provider_selection(monkeypatch):
+    monkeypatch.delenv("LLM_MODEL", raising=False)
+    monkeypatch.setenv("LLM_PROVIDER", "ollama")
+    assert llm.provider().kind == "ollama" and llm.provider().model == "llama3.1:8b"
+    monkeypatch.setenv("LLM_PROVIDER", "lmstudio")
+    with pytest.raises(llm.LLMError):
+        llm.provider()  # OpenAI-compatible servers need LLM_MODEL
+    assert llm.provider(default_model=llm.DEFAULT_MODEL).model == llm.DEFAULT_MODEL  # unless the caller has a default
+    monkeypatch.setenv("LLM_MODEL", "qwen2.5")
+    p = llm.provider()
+    assert p.kind == "openai" and p.url.endswith("/chat/completions") and p.model == "qwen2.5"
+    monkeypatch.setenv("LLM_PROVIDER", "off")
+    assert llm.provider() is None
+    monkeypatch.setenv("LLM_PROVIDER", "gpt-remote")
+    with pytest.raises(llm.LLMError):
+        llm.provider()
+
+
+def test_payload_options(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "ollama")
+    assert llm.payload(llm.provider(), "hi", {"num_ctx": 8192, "temperature": 0.2}, False)["options"]["num_ctx"] == 8192
+    monkeypatch.setenv("LLM_PROVIDER", "lmstudio")
+    monkeypatch.setenv("LLM_MODEL", "m")
+    body = llm.payload(llm.provider(), "hi", {"num_ctx": 8192, "temperature": 0.2}, True)
+    assert "temperature" not in body and "options" not in body and body["stream"] is True
+
+
+@pytest.mark.parametrize("name", sorted(PROVIDERS))
+def test_complete_and_stream(fake, monkeypatch, name):
+    _use(monkeypatch, name)
+    expected = "".join(fake.words(fake.tokens))
+    assert asyncio.run(llm.complete("Write a cover letter")) == expected
+
+    async def collect():
+        return [chunk async for chunk in llm.stream("Write a cover letter")]
+
+    chunks = asyncio.run(collect())
+    assert len(chunks) == fake.tokens and "".join(chunks) == expected
+
+
+@pytest.mark.parametrize("name", sorted(PROVIDERS))
+def test_errors_are_retried_then_raised(fake, monkeypatch, name):
+    _use(monkeypatch, name)
+    fake.error_rate = 1.0
+    before = llm.stats()["retries"]
+    with pytest.raises(llm.LLMError):
+        asyncio.run(llm.complete("hi"))
+    assert fake.counters["requests"] == llm.RETRIES + 1
+    assert llm.stats()["retries"] - before == llm.RETRIES
+
+
+def test_provider_off_generates_nothing(fake, monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "off")
+    assert asyncio.run(llm.complete("hi")) == ""
+    assert fake.counters["requests"] == 0
+
+
+def test_cache_key_ignores_option_order(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "ollama")
+    p = llm.provider()
+    key = llm_cache.CompletionCache.key
+    assert key(p, {"a": 1, "b": 2}, "prompt") == key(p, {"b": 2, "a": 1}, "prompt")
+    assert key(p, {"a": 1}, "prompt") != key(p, {"a": 2}, "prompt")
+    assert key(p, None, "prompt") != key(p._replace(model="other"), None, "prompt")
+
+
+def test_scheduler_priorities_dedup_and_queue_limit():
+    async def scenario():
+        s = llm_scheduler.LLMScheduler(max_concurrency=1, max_queue=3)
+        order, gate = [], asyncio.Event()
+
+        async def work(tag):
+            if tag == "hold":
+                await gate.wait()
+            order.append(tag)
+            return tag
+
+        hold = asyncio.ensure_future(s.run(None, llm_scheduler.BATCH, lambda: work("hold")))
+        await asyncio.sleep(0)
+        batch = asyncio.ensure_future(s.run(None, llm_scheduler.BATCH, lambda: work("batch")))
+        first = asyncio.ensure_future(s.run("same", llm_scheduler.INTERACTIVE, lambda: work("interactive")))
+        await asyncio.sleep(0)
+        twin = asyncio.ensure_future(s.run("same", llm_scheduler.INTERACTIVE, lambda: work("twin")))
+        await asyncio.sleep(0)
+        extra = asyncio.ensure_future(s.run(None, llm_scheduler.STANDARD, lambda: work("standard")))
+        await asyncio.sleep(0)
+        with pytest.raises(llm_scheduler.QueueFullError):
+            await s.run(None, llm_scheduler.STANDARD, lambda: work("rejected"))
+        gate.set()
+        results = await asyncio.gather(hold, batch, first, twin, extra)
+        return order, results, s.stats()
+
+    order, results, stats = asyncio.run(scenario())
+    assert order == ["hold", "interactive", "standard", "batch"]
+    assert results[2] == results[3] == "interactive"  # the twin shared the first request
+    assert stats["deduplicated"] == 1 and stats["rejected"] == 1
+    assert stats["active"] == 0 and stats["waiting"] == 0
+
+
+def test_scheduler_job_cancelled_before_it_starts_gives_back_its_admission():
+    async def scenario():
+        s = llm_scheduler.LLMScheduler(max_concurrency=1, max_queue=3)
+
+        async def work():
+            return "done"
+
+        # Took the free slot, then cancelled before the job's first step
+        caller = asyncio.ensure_future(s.run("a", llm_scheduler.STANDARD, work))
+        await asyncio.sleep(0)
+        s._inflight["a"].cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        assert s.stats()["active"] == 0
+
+        # Same while queued behind another job
+        gate = asyncio.Event()
+
+        async def hold():
+            await gate.wait()
+
+        holder = asyncio.ensure_future(s.run(None, llm_scheduler.STANDARD, hold))
+        await asyncio.sleep(0)
+        caller = asyncio.ensure_future(s.run("b", llm_scheduler.STANDARD, work))
+        await asyncio.sleep(0)
+        assert s.stats()["waiting"] == 1
+        s._inflight["b"].cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        assert s.stats()["waiting"] == 0
+        gate.set()
+        await holder
+        assert s.stats()["active"] == 0
+        # The slot still works afterwards
+        assert await s.run(None, llm_scheduler.STANDARD, work) == "done"
+
+    asyncio.run(scenario())
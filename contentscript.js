@@ -7,37 +7,45 @@ const getToken = () =>
     chrome.storage.local.get("token", (d) => resolve(d?.token || null))
   );
 
+const base64ToBlob = (b64, type) => {
+  const bin = atob(b64);
+  const bytes = new Uint8Array(bin.length);
+  for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+  return new Blob([bytes], { type });
+};
+
 const fetchUserDetails = async (token) => {
   const headers = { Authorization: `Bearer ${token}` };
-  const resUser = await fetch(`${API_BASE}/user`, { headers });
-  if (!resUser.ok) throw new Error("Unauthorized or failed user fetch");
-  const data = await resUser.json();
-  const user = (data && data.user) ? data.user : data;
+  // One round trip: profile, resume metadata/text and the stored file (inline when small)
+  const res = await fetch(`${API_BASE}/bootstrap?fields=profile,resume,text,file`, { headers });
+  if (!res.ok) throw new Error("Unauthorized or failed user fetch");
+  const data = await res.json();
+  const user = data.user;
   // Prefer stored file; fallback to generated PDF; then raw text
-  const resFile = await fetch(`${API_BASE}/resume_file`, { headers });
-  if (resFile.ok) {
-    const blob = await resFile.blob();
-    const type = resFile.headers.get("Content-Type") || blob.type || "application/pdf";
-    const disp = resFile.headers.get("Content-Disposition") || "";
-    const fnameMatch = /filename=([^;]+)/i.exec(disp || "");
-    const fname = fnameMatch ? fnameMatch[1].replace(/"/g, "").trim() : "resume.pdf";
-    const file = new File([blob], fname, { type });
-    return { ...user, resume: file };
+  const stored = data.file;
+  if (stored && stored.base64) {
+    const blob = base64ToBlob(stored.base64, stored.mime);
+    return { ...user, resume: new File([blob], stored.filename, { type: stored.mime }) };
+  }
+  if (stored && stored.url) {
+    const resFile = await fetch(`${API_BASE}${stored.url}`, { headers });
+    if (resFile.ok) {
+      const blob = await resFile.blob();
+      return { ...user, resume: new File([blob], stored.filename, { type: stored.mime }) };
+    }
   }
-  const resPdf = await fetch(`${API_BASE}/resume_pdf`, { headers });
   let file = null;
-  if (resPdf.ok) {
-    const blob = await resPdf.blob();
-    file = new File([blob], "resume.pdf", { type: "application/pdf" });
-  } else {
-    // Fallback: fetch raw text and upload as .txt (many ATS accept txt)
-    const resText = await fetch(`${API_BASE}/resume`, { headers });
-    if (resText.ok) {
-      const json = await resText.json();
-      const text = (json && (json.resume_text || json.resume || "")) || "";
-      if (text) file = new File([text], "resume.txt", { type: "text/plain" });
+  if (data.resume) {
+    const resPdf = await fetch(`${API_BASE}/resume_pdf`, { headers });
+    if (resPdf.ok) {
+      const blob = await resPdf.blob();
+      file = new File([blob], "resume.pdf", { type: "application/pdf" });
     }
   }
+  if (!file && data.resume_text) {
+    // Fallback: upload raw text as .txt (many ATS accept txt)
+    file = new File([data.resume_text], "resume.txt", { type: "text/plain" });
+  }
   return { ...user, resume: file };
 };
 
@@ -226,14 +234,39 @@ const getMatch = async (jd, token) => {
   return await res.json();
 };
 
-const getCustomAnswer = async (jd, question, token) => {
-  const res = await fetch(`${API_BASE}/custom-answer`, {
+// Streams the answer (Server-Sent Events); onText receives the text so far as tokens arrive
+const getCustomAnswer = async (jd, question, token, onText) => {
+  const res = await fetch(`${API_BASE}/custom-answer/stream`, {
     method: "POST",
     headers: { "Content-Type": "application/json", Authorization: `Bearer ${token}` },
     body: JSON.stringify({ jobDescription: jd, applicationQuestion: question }),
   });
-  if (!res.ok) return "";
-  return (await res.json())?.answer || "";
+  if (!res.ok || !res.body) return "";
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = "";
+  let text = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, { stream: true });
+    let sep;
+    while ((sep = buf.indexOf("\n\n")) >= 0) {
+      const frame = buf.slice(0, sep);
+      buf = buf.slice(sep + 2);
+      const event = (/^event: (.*)$/m.exec(frame) || [])[1];
+      const data = JSON.parse((/^data: (.*)$/m.exec(frame) || [])[1] || "{}");
+      if (event === "token") {
+        text += data.text || "";
+        if (onText) onText(text);
+      } else if (event === "done") {
+        return data.answer || text;
+      } else if (event === "error") {
+        return text;
+      }
+    }
+  }
+  return text;
 };
 
 // ------- Autofill -------
@@ -252,7 +285,7 @@ const addFillButtonsForTextareas = () => {
       const token = await getToken();
       const jd = await getJobDescription();
       const labelText = closestLabelText(ta) || "";
-      const answer = await getCustomAnswer(jd, labelText || "Application question", token);
+      const answer = await getCustomAnswer(jd, labelText || "Application question", token, (partial) => { ta.value = partial; });
       setValue(ta, answer);
       btn.textContent = "Filled";
       setTimeout(() => (btn.textContent = "Fill", (btn.disabled = false)), 1200);
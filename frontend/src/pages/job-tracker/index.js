@@ -20,7 +20,19 @@ const JobTracker = () => {
 
   const load = async () => {
     setLoading(true); setErr("");
-    try { const r = await axiosInstance.get("/jobs"); setJobs(r.data || []); } catch (e) { setErr("Failed to load jobs"); }
+    try {
+      // /jobs is paginated: follow X-Next-Cursor until the last page
+      const all = [];
+      let cursor = null;
+      do {
+        const params = { limit: 200, fields: "company,title,location,source,url,status,notes,next_action_date,created_at" };
+        if (cursor) params.cursor = cursor;
+        const r = await axiosInstance.get("/jobs", { params });
+        all.push(...(r.data || []));
+        cursor = r.headers["x-next-cursor"];
+      } while (cursor);
+      setJobs(all);
+    } catch (e) { setErr("Failed to load jobs"); }
     setLoading(false);
   };
   useEffect(() => { load(); }, []);